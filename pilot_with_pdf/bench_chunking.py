@@ -0,0 +1,73 @@
+import sys
+import argparse
+from pathlib import Path
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.pdf_pages import iter_pages, pdf_page_count
+from src.streaming import iter_chunks
+from src.chunking import count_tokens, iter_structured_chunks
+from src.downloader import latest_pdf
+
+# Compare the original fixed-width chunk_text windows against the
+# structure-aware chunker on the same pages: chunk count (= LLM calls),
+# total tokens sent, and how much of the page text each one covers.
+#
+#   python pilot_with_pdf/bench_chunking.py [--pdf PATH] [--skip 8] [--pages 15]
+
+FEWSHOT_OVERHEAD_TOKENS = 450  # approx. size of the fixed prompt prefix sent with every chunk
+
+
+def report(name: str, chunk_texts: list[str], source_chars: int) -> dict:
+    tokens = [count_tokens(t) for t in chunk_texts]
+    covered = sum(len("".join(t.split())) for t in chunk_texts)
+    row = {
+        "chunker": name,
+        "chunks": len(chunk_texts),
+        "chunk_tokens": sum(tokens),
+        "max_chunk_tokens": max(tokens, default=0),
+        "prompt_tokens": sum(tokens) + FEWSHOT_OVERHEAD_TOKENS * len(chunk_texts),
+        # >1.0 means text is sent more than once (overlap)
+        "coverage_ratio": round(covered / source_chars, 3) if source_chars else 0.0,
+    }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", type=Path, default=None)
+    parser.add_argument("--skip", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=15)
+    parser.add_argument("--max-chars", type=int, default=4000)
+    parser.add_argument("--overlap", type=int, default=300)
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    args = parser.parse_args()
+
+    pdf_path = args.pdf or latest_pdf()
+    if pdf_path is None:
+        sys.exit("No PDF found under pilot_with_pdf/data/pdf; pass --pdf")
+    total = pdf_page_count(pdf_path)
+    start, end = args.skip, min(args.skip + args.pages, total)
+    pages = list(iter_pages(pdf_path, start, end))
+    source_chars = sum(len("".join(text.split())) for _, text in pages)
+
+    chars = list(iter_chunks((text for _, text in pages), args.max_chars, args.overlap))
+    structured = [c.text for c in iter_structured_chunks(pages, args.max_tokens)]
+
+    rows = [
+        report(f"chars({args.max_chars}/{args.overlap})", chars, source_chars),
+        report(f"structure({args.max_tokens} tok)", structured, source_chars),
+    ]
+
+    print(f"{pdf_path.name}: pages {start}-{end - 1}, {source_chars} non-space chars")
+    cols = list(rows[0])
+    print("  ".join(f"{c:>20}" for c in cols))
+    for r in rows:
+        print("  ".join(f"{str(r[c]):>20}" for c in cols))
+
+    saved = 1 - rows[1]["prompt_tokens"] / rows[0]["prompt_tokens"] if rows[0]["prompt_tokens"] else 0.0
+    print(f"\nPrompt tokens saved by structure chunker: {saved:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+# Import-time benchmark: how long `import X` takes in a fresh interpreter, and
+# which heavy dependencies it drags in. Everything a command needs before it
+# does any work is paid on every invocation, so the scripts and src modules
+# should import without loading the OpenAI SDK, pandas, pdfplumber, tqdm or
+# requests (those load on first use; see src/clients.py and src/cli.py).
+#
+#   python pilot_with_pdf/bench_imports.py [--repeat 7] [--fail-over-ms 300]
+#
+# Each target is imported REPEAT times in a new process; the median is reported.
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+TARGETS = [
+    "src.classify",
+    "src.extract",
+    "src.batch_pipeline",
+    "src.pdf_pipeline",
+    "src.corpus",
+    "src.cli",
+    "run_pdf_analysis",
+    "run_pdf_extract_naive",
+    "run_pdf_extract_after_analysis",
+    "run_corpus",
+]
+HEAVY_MODULES = ["openai", "pandas", "pdfplumber", "tqdm", "requests", "pyarrow", "dotenv"]
+
+PROBE = """
+import sys, time, json
+sys.path[:0] = [{src!r}, {scripts!r}]
+t0 = time.perf_counter()
+import {target}
+seconds = time.perf_counter() - t0
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(target: str, repeat: int) -> dict:
+    code = PROBE.format(
+        src=str(REPO_ROOT / "pilot_without_pdf"),
+        scripts=str(REPO_ROOT / "pilot_with_pdf"),
+        target=target,
+        heavy=HEAVY_MODULES,
+    )
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_ROOT)
+        if out.returncode != 0:
+            return {"target": target, "error": out.stderr.strip().splitlines()[-1] if out.stderr else "failed"}
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "target": target,
+        "median_ms": round(statistics.median(r["seconds"] for r in runs) * 1000, 1),
+        "min_ms": round(min(r["seconds"] for r in runs) * 1000, 1),
+        "loaded": runs[-1]["loaded"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--targets", nargs="*", default=TARGETS)
+    parser.add_argument("--fail-over-ms", type=float, default=None,
+                        help="exit 1 if any target's median import time exceeds this")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = [measure(t, args.repeat) for t in args.targets]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'target':<34} {'median ms':>10} {'min ms':>8}  heavy modules loaded")
+        for r in results:
+            if "error" in r:
+                print(f"{r['target']:<34} {'error':>10}  {r['error']}")
+                continue
+            print(f"{r['target']:<34} {r['median_ms']:>10} {r['min_ms']:>8}  {', '.join(r['loaded']) or '-'}")
+
+    failed = [r for r in results if "error" in r]
+    if args.fail_over_ms is not None:
+        failed += [r for r in results if r.get("median_ms", 0) > args.fail_over_ms]
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Offline benchmark: the real pipelines against a fake LLM (no API key, no cost).
+#
+#   python pilot_with_pdf/bench_pipeline.py [--pages 300] [--docs 2] [--snippets 200]
+#       [--latency-ms 50] [--error-rate 0.01] [--malformed-rate 0.02]
+#       [--only pdf_naive,run_batch_packed] [--fail-on-regression 20]
+#
+# Scenarios:
+#   pdf_naive / pdf_after_analysis  run_pdf_extract_*.py on synthetic multi-hundred-page PDFs
+#   run_batch_async / run_batch_packed / classify_packed
+#                                   batch_pipeline.run_batch and classify.classify_policy_texts
+#   classify_single / extract_fields
+#                                   classify_policy_text / extract_instrument_fields, one call each
+# Each scenario runs in its own process and an empty working directory (so the
+# page cache starts cold and peak RSS is per scenario), with the scripts' own
+# client stack minus the disk cache and the OpenAI client replaced by
+# src/fake_llm.py. Results (throughput, peak RSS incl. page-parsing workers,
+# LLM calls per document) are appended to data/bench/history.jsonl and compared
+# with the last run that used the same parameters.
+# tests/test_bench.py runs pdf_naive and run_batch_packed at a tiny size under pytest.
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT / "pilot_without_pdf"))
+
+# The scripts' clients are lazy proxies that are swapped for the fake before first use;
+# the key and cache mode only matter if something slips through to a real client
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ["LLM_CACHE_MODE"] = "off"
+
+from src.fake_llm import AsyncFakeOpenAI, FakeBackend, FakeLLMConfig, FakeOpenAI
+from src.clients import build_client
+from src.rate_limit import AdaptiveLimiter
+from src.synthetic_pdf import synthetic_snippets, write_synthetic_pdf
+
+HISTORY_PATH = REPO_ROOT / "pilot_with_pdf" / "data" / "bench" / "history.jsonl"
+PDF_DIR = REPO_ROOT / "pilot_with_pdf" / "data" / "bench" / "pdf"
+
+SCENARIOS = [
+    "pdf_naive", "pdf_after_analysis",
+    "run_batch_async", "run_batch_packed",
+    "classify_single", "classify_packed", "extract_fields",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300, help="pages per synthetic PDF")
+    parser.add_argument("--docs", type=int, default=2, help="synthetic PDFs per PDF scenario")
+    parser.add_argument("--snippets", type=int, default=200, help="texts for the batch/classify scenarios")
+    parser.add_argument("--single-calls", type=int, default=40, help="texts for the one-call-per-text sync scenarios")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="share of attempts failing with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of attempts failing with a 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.02, help="share of replies truncated mid-JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="comma-separated subset of scenarios")
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH)
+    parser.add_argument("--pdf-dir", type=Path, default=PDF_DIR, help="where the synthetic PDFs are written")
+    parser.add_argument("--label", default="", help="free text stored with the results")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="PCT",
+                        help="exit 1 if throughput drops, or calls/doc or peak RSS grow, by more than PCT%% vs the last comparable run")
+    parser.add_argument("--run-one", default=None, help=argparse.SUPPRESS)  # internal: child process
+    return parser.parse_args()
+
+
+# ---------- fake clients ----------
+def fake_clients(backend: FakeBackend):
+    """(sync, async) clients layered like the scripts' own, minus the disk cache."""
+    limiter = AdaptiveLimiter()
+    return (
+        build_client(FakeOpenAI(backend), limiter=limiter, cache=False),
+        build_client(AsyncFakeOpenAI(backend), limiter=limiter, cache=False),
+    )
+
+
+@contextmanager
+def fresh_workdir():
+    """Run in an empty directory: relative data/ paths (page cache, outputs) start empty."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(cwd)
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS; children = page-parsing process pools
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak * scale / 2**20, 1)
+
+
+def measure(fn, backend: FakeBackend) -> dict:
+    t0 = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - t0
+    return {**out, "seconds": round(seconds, 3), "peak_rss_mb": peak_rss_mb(), "fake_llm": backend.snapshot()}
+
+
+# ---------- scenarios ----------
+def bench_pdf(script_name: str, args, backend: FakeBackend) -> dict:
+    script = importlib.import_module(script_name)
+    from src.pdf_pipeline import run_pdf_extraction
+    from src.prefilter import KeywordPrefilter
+    from src.dedup import ChunkDeduper
+
+    script.client, script.aclient = fake_clients(backend)
+    pdfs = [write_synthetic_pdf(args.pdf_dir / f"synthetic_{args.pages}p_seed{args.seed + i}.pdf", args.pages, args.seed + i)
+            for i in range(args.docs)]
+
+    def run():
+        chunks = 0
+        dedup = ChunkDeduper(script.DEDUP_THRESHOLD) if script.DEDUP_THRESHOLD is not None else None
+        with fresh_workdir() as tmp:
+            for i, pdf in enumerate(pdfs):
+                manifest = run_pdf_extraction(
+                    pdf,
+                    tmp / f"doc{i}.csv",
+                    script.extract_fields_async,
+                    script.prompt_hash(),
+                    skip_first=0,
+                    max_pages=args.pages,
+                    chunker=script.CHUNKER,
+                    max_tokens=script.CHUNK_MAX_TOKENS,
+                    max_chars=4000,
+                    overlap=300,
+                    fresh=True,
+                    concurrency=script.CONCURRENCY,
+                    prefilter=KeywordPrefilter(script.PREFILTER_THRESHOLD) if script.PREFILTER_THRESHOLD is not None else None,
+                    skipped_row=script.SKIPPED_ROW,
+                    dedup=dedup,
+                    verbose=False,
+                    desc=f"{script_name} doc {i}",
+                )
+                summary = manifest.summary()
+                chunks += summary["completed"] + summary["failed"]
+        out = {"documents": len(pdfs), "pages": len(pdfs) * args.pages, "items": chunks}
+        if dedup is not None:
+            out["dedup"] = dedup.report()
+        return out
+
+    return measure(run, backend)
+
+
+def bench_batch(mode: str, args, backend: FakeBackend) -> dict:
+    from src import batch_pipeline
+
+    batch_pipeline.client, batch_pipeline.aclient = fake_clients(backend)
+    snippets = synthetic_snippets(args.snippets, args.seed)
+
+    def run():
+        df = batch_pipeline.run_batch(snippets, concurrency=8, mode=mode)
+        return {"documents": 1, "items": len(df), "errors": int(df["error"].notna().sum()) if "error" in df else 0}
+
+    return measure(run, backend)
+
+
+def bench_classify(packed: bool, args, backend: FakeBackend) -> dict:
+    from src import classify
+
+    classify.client, _ = fake_clients(backend)
+    snippets = synthetic_snippets(args.snippets if packed else args.single_calls, args.seed)
+
+    def run():
+        if packed:
+            results = classify.classify_policy_texts(snippets)
+        else:
+            results = [classify.classify_policy_text(s) for s in snippets]
+        return {"documents": 1, "items": len(results)}
+
+    return measure(run, backend)
+
+
+def bench_extract(args, backend: FakeBackend) -> dict:
+    from src import extract
+
+    extract.client, _ = fake_clients(backend)
+    snippets = synthetic_snippets(args.single_calls, args.seed)
+
+    def run():
+        results = [extract.extract_instrument_fields(s) for s in snippets]
+        return {"documents": 1, "items": len(results)}
+
+    return measure(run, backend)
+
+
+def run_scenario(name: str, args) -> dict:
+    """Run one scenario in a child process (isolated memory peak, imports and caches)."""
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), *sys.argv[1:], "--run-one", name],
+        stdout=subprocess.PIPE, text=True,
+    )
+    marker = "BENCH_RESULT "
+    lines = [l for l in proc.stdout.splitlines() if l.startswith(marker)]
+    if proc.returncode != 0 or not lines:
+        sys.exit(f"Scenario {name} failed (exit {proc.returncode}):\n{proc.stdout[-2000:]}")
+    return json.loads(lines[-1][len(marker):])
+
+
+def run_one(name: str, args) -> dict:
+    backend = FakeBackend(FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    ))
+    if name == "pdf_naive":
+        result = bench_pdf("run_pdf_extract_naive", args, backend)
+    elif name == "pdf_after_analysis":
+        result = bench_pdf("run_pdf_extract_after_analysis", args, backend)
+    elif name in ("run_batch_async", "run_batch_packed"):
+        result = bench_batch(name.rsplit("_", 1)[1], args, backend)
+    elif name in ("classify_single", "classify_packed"):
+        result = bench_classify(name == "classify_packed", args, backend)
+    elif name == "extract_fields":
+        result = bench_extract(args, backend)
+    else:
+        raise ValueError(f"Unknown scenario: {name!r}")
+
+    calls = result["fake_llm"].get("calls", 0)
+    result["items_per_sec"] = round(result["items"] / max(result["seconds"], 1e-9), 2)
+    result["calls_per_doc"] = round(calls / max(result["documents"], 1), 2)
+    result["calls_per_item"] = round(calls / max(result["items"], 1), 3)
+    return result
+
+
+# ---------- history ----------
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_params(args) -> dict:
+    keys = ["pages", "docs", "snippets", "single_calls", "latency_ms", "jitter_ms",
+            "error_rate", "rate_limit_rate", "malformed_rate", "seed"]
+    return {k: getattr(args, k) for k in keys}
+
+
+def last_comparable(history: Path, params: dict) -> dict | None:
+    if not history.exists():
+        return None
+    last = None
+    with history.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("params") == params:
+                    last = entry
+    return last
+
+
+def regressions(current: dict, previous: dict, pct: float) -> list[str]:
+    found = []
+    for name, now in current.items():
+        before = previous.get("results", {}).get(name)
+        if not before:
+            continue
+        checks = [
+            ("items_per_sec", now["items_per_sec"] < before["items_per_sec"] * (1 - pct / 100)),
+            ("calls_per_doc", now["calls_per_doc"] > before["calls_per_doc"] * (1 + pct / 100)),
+            ("peak_rss_mb", (now.get("peak_rss_mb") or 0) > (before.get("peak_rss_mb") or float("inf")) * (1 + pct / 100)),
+        ]
+        for metric, worse in checks:
+            if worse:
+                found.append(f"{name}.{metric}: {before[metric]} -> {now[metric]}")
+    return found
+
+
+def main():
+    args = parse_args()
+    if args.run_one:
+        print("BENCH_RESULT " + json.dumps(run_one(args.run_one, args)))
+        return
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = sorted(set(names) - set(SCENARIOS))
+    if unknown:
+        sys.exit(f"Unknown scenario(s): {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+
+    results = {}
+    for name in names:
+        print(f"== {name}")
+        results[name] = run_scenario(name, args)
+        r = results[name]
+        print(f"   {r['items']} items in {r['seconds']}s ({r['items_per_sec']}/s), "
+              f"{r['calls_per_doc']} calls/doc, peak RSS {r['peak_rss_mb']} MB, fake LLM: {r['fake_llm']}")
+
+    params = bench_params(args)
+    previous = last_comparable(args.history, params)
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label,
+        "params": params,
+        "results": results,
+    }
+    args.history.parent.mkdir(parents=True, exist_ok=True)
+    with args.history.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"Appended results to {args.history}")
+
+    if previous is None:
+        print("No earlier run with the same parameters to compare against.")
+        return
+    pct = args.fail_on_regression if args.fail_on_regression is not None else 20.0
+    found = regressions(results, previous, pct)
+    print(f"Compared with {previous['commit'] or '?'} ({previous['timestamp']}): "
+          f"{'no regressions' if not found else f'{len(found)} regression(s) over {pct:g}%'}")
+    for line in found:
+        print("  ", line)
+    if found and args.fail_on_regression is not None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.consolidate import consolidate_files
+
+# Merge per-chunk extraction rows into one record per instrument.
+#
+# Inputs are extraction CSVs/JSONLs (a corpus run's <out-dir>/*/extraction.jsonl)
+# or Parquet dataset directories. Rows are matched by normalised instrument /
+# policy name, overlapping evidence spans and, for nearby chunks, the same
+# funding amount (see src/consolidate.py); only rows from the same document
+# are merged unless --across-docs is given.
+#
+#   python pilot_with_pdf/consolidate_instruments.py pilot_with_pdf/data/extract_naive/*.csv
+#   python pilot_with_pdf/consolidate_instruments.py pilot_with_pdf/data/corpus/naive_20260301/parquet
+
+# ---------- Config ----------
+WINDOW = 2           # max chunk distance for rows matched only by funding amount
+SPAN_OVERLAP = 0.5   # shared evidence shingles / shingles of the smaller row
+OUT_DIR = Path("pilot_with_pdf/data/instruments")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", type=Path, nargs="+", help="extraction CSV/JSONL files or Parquet dataset dirs")
+    parser.add_argument("--out", type=Path, default=None, help="default: pilot_with_pdf/data/instruments/instruments_<timestamp>.csv")
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--span-overlap", type=float, default=SPAN_OVERLAP)
+    parser.add_argument("--across-docs", action="store_true", help="also merge matching rows from different documents")
+    args = parser.parse_args()
+
+    out_csv = args.out or OUT_DIR / f"instruments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    report = consolidate_files(
+        args.inputs,
+        out_csv,
+        scope=None if args.across_docs else "doc_id",
+        window=args.window,
+        span_overlap=args.span_overlap,
+    )
+    print(json.dumps(report, indent=2))
+    print(f"Wrote {out_csv.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
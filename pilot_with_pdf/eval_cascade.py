@@ -0,0 +1,89 @@
+import sys
+import csv
+import json
+import argparse
+import importlib
+from pathlib import Path
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.pdf_pipeline import iter_pdf_chunks
+from src.pdf_pages import pdf_page_count
+from src.llm_engine import run_ordered
+from src.instrumentation import RECORDER
+from src.downloader import latest_pdf
+from src.cascade import ModelCascade
+
+# Evaluation of the model cascade (src/cascade.py) against saved extraction outputs.
+#
+# The saved CSVs were produced by MODEL alone with 4000-char / 300-overlap
+# windows over pages 8-22, so the same chunks are rebuilt from the PDF and sent
+# to the cheap model only (--cheap-model, default the script's CHEAP_MODEL or
+# DEFAULT_CHEAP_MODEL while the cascade is off). The cascade's routing rule is then replayed
+# over those answers: how many chunks it would escalate (and why), how often
+# the answers it keeps agree with the saved label, and how many of the cheap
+# model's disagreements it catches. Escalated chunks are assumed to get the
+# saved answer, which is what MODEL returned for them.
+#
+#   python pilot_with_pdf/eval_cascade.py [--prompt naive|after_analysis] [--pdf PATH]
+
+SAVED_OUTPUTS = {
+    "naive": Path("pilot_with_pdf/data_saved/extract_naive/hk_it_blueprint_extraction_naive_20260225.csv"),
+    "after_analysis": Path("pilot_with_pdf/data_saved/extract_analysis/hk_it_blueprint_extraction_20260225.csv"),
+}
+PROMPT_SCRIPTS = {
+    "naive": "run_pdf_extract_naive",
+    "after_analysis": "run_pdf_extract_after_analysis",
+}
+LABELS = {"naive": "instrument_type", "after_analysis": "category"}
+DEFAULT_CHEAP_MODEL = "gpt-4.1-nano"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompt", choices=sorted(PROMPT_SCRIPTS), default="naive")
+    parser.add_argument("--pdf", type=Path, default=None)
+    parser.add_argument("--saved", type=Path, default=None, help="default: the saved CSV for --prompt")
+    parser.add_argument("--skip", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=15)
+    parser.add_argument("--threshold", type=float, default=None, help="override the script's ESCALATE_BELOW")
+    parser.add_argument("--cheap-model", default=None, help=f"default: the script's CHEAP_MODEL, else {DEFAULT_CHEAP_MODEL}")
+    args = parser.parse_args()
+
+    script = importlib.import_module(PROMPT_SCRIPTS[args.prompt])
+    cascade = script.CASCADE
+    if cascade is None or args.cheap_model:
+        cheap_model = args.cheap_model or script.CHEAP_MODEL or DEFAULT_CHEAP_MODEL
+        cascade = ModelCascade([cheap_model, script.MODEL], threshold=script.ESCALATE_BELOW)
+    if args.threshold is not None:
+        cascade.threshold = args.threshold
+    cheap = cascade.models[0]
+
+    saved = args.saved or SAVED_OUTPUTS[args.prompt]
+    with saved.open(encoding="utf-8") as f:
+        references = {int(r["chunk_id"]): r for r in csv.DictReader(f) if not r.get("error")}
+
+    pdf_path = args.pdf or latest_pdf()
+    if pdf_path is None:
+        sys.exit("No PDF found under pilot_with_pdf/data/pdf; pass --pdf")
+    end = min(args.skip + args.pages, pdf_page_count(pdf_path))
+    chunks = list(iter_pdf_chunks(pdf_path, args.skip, end, chunker="chars", max_chars=4000, overlap=300))
+    ids = [i for i in range(len(chunks)) if i in references]
+    print(f"{len(chunks)} chunks; {len(ids)} with a saved answer in {saved.name}")
+
+    async def first_tier(i: int) -> dict:
+        return await script.extract_fields_async(chunks[i], model=cheap)
+
+    answers = run_ordered(ids, first_tier, concurrency=script.CONCURRENCY, desc=f"{cheap} answers")
+    result = cascade.evaluate(answers, (references[i] for i in ids), label=LABELS[args.prompt])
+    result["first_tier_cost_usd"] = round(RECORDER.report()["llm"].get(cheap, {}).get("cost_usd", 0.0), 6)
+    print(json.dumps(result, indent=2))
+
+    for i, out in zip(ids, answers):
+        reason = cascade.escalation_reason(out)
+        label = out.get(LABELS[args.prompt]) if isinstance(out, dict) else repr(out)
+        print(f"chunk {i:>3}: saved={references[i].get(LABELS[args.prompt])!r:<40} {cheap}={label!r:<40} {reason or 'kept'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import sys
+import csv
+import argparse
+from pathlib import Path
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.pdf_pipeline import iter_pdf_chunks
+from src.pdf_pages import pdf_page_count
+from src.prefilter import KeywordPrefilter
+from src.downloader import latest_pdf
+
+# Recall check for the keyword prefilter against saved extraction outputs.
+#
+# The saved CSVs were produced with 4000-char / 300-overlap windows over
+# pages 8-22, so the same chunks are rebuilt from the PDF, scored, and every
+# saved row that carried instrument signal is checked against each threshold.
+#
+#   python pilot_with_pdf/eval_prefilter.py [--pdf PATH]
+
+SAVED_OUTPUTS = [
+    Path("pilot_with_pdf/data_saved/extract_naive/hk_it_blueprint_extraction_naive_20260225.csv"),
+    Path("pilot_with_pdf/data_saved/extract_analysis/hk_it_blueprint_extraction_20260225.csv"),
+]
+THRESHOLDS = [0.0, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0]
+
+EMPTY = {"", "[]", "None", "null", "other"}
+
+
+def has_signal(row: dict) -> bool:
+    """A row is a positive if the LLM found a concrete instrument attribute."""
+    if row.get("error"):
+        return False
+    for field in ("instrument_type", "funding_amount_or_cap", "eligibility_rules", "policy_name", "funding_amount"):
+        if (row.get(field) or "").strip() not in EMPTY:
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", type=Path, default=None)
+    parser.add_argument("--skip", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=15)
+    args = parser.parse_args()
+
+    pdf_path = args.pdf or latest_pdf()
+    if pdf_path is None:
+        sys.exit("No PDF found under pilot_with_pdf/data/pdf; pass --pdf")
+    end = min(args.skip + args.pages, pdf_page_count(pdf_path))
+    chunks = list(iter_pdf_chunks(pdf_path, args.skip, end, chunker="chars", max_chars=4000, overlap=300))
+    scorer = KeywordPrefilter()
+    scores = [scorer.score(ch) for ch in chunks]
+    print(f"{len(chunks)} chunks; keyword scores: {scores}")
+
+    for path in SAVED_OUTPUTS:
+        with path.open(encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        positives = {int(r["chunk_id"]) for r in rows if has_signal(r)}
+        print(f"\n{path.name}: {len(rows)} rows, {len(positives)} with instrument signal")
+        print(f"{'threshold':>10} {'skipped':>8} {'skip_ratio':>10} {'recall':>8}")
+        for t in THRESHOLDS:
+            sent = {i for i, s in enumerate(scores) if s >= t}
+            skipped = len(chunks) - len(sent)
+            recall = len(positives & sent) / len(positives) if positives else 1.0
+            print(f"{t:>10} {skipped:>8} {skipped / len(chunks):>10.2f} {recall:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
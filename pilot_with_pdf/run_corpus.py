@@ -0,0 +1,100 @@
+import sys
+import json
+import argparse
+import importlib
+from pathlib import Path
+from datetime import datetime
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.corpus import CorpusRunner, load_manifest
+from src.consolidate import consolidate_files
+
+# Run the extraction over many PDFs listed in a manifest.
+# The prompt, model (cascade) and client come from one of the single-PDF scripts:
+#   --prompt naive           -> run_pdf_extract_naive.py
+#   --prompt after_analysis  -> run_pdf_extract_after_analysis.py
+# Output: <out-dir>/<doc_id>/extraction.{jsonl,csv}, <out-dir>/corpus_report.json
+# (throughput), <out-dir>/run_report.json (stage latencies, tokens, cost per document)
+# <out-dir>/parquet/doc_id=<doc_id>/run_date=<date>/*.parquet (typed rows, all documents)
+# and <out-dir>/instruments.csv (chunk rows merged into one record per instrument)
+
+# ---------- Config ----------
+DOWNLOAD_WORKERS = 4   # concurrent downloads
+PARSE_WORKERS = 2      # documents parsed at once
+PAGE_WORKERS = None    # processes per parsed document (None = one per CPU)
+EXTRACT_WORKERS = 2    # documents extracted at once (they share RPM/TPM)
+
+PROMPT_SCRIPTS = {
+    "naive": "run_pdf_extract_naive",
+    "after_analysis": "run_pdf_extract_after_analysis",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("manifest", type=Path, help="CSV (source[,doc_id,skip_first,max_pages]), JSONL, or one URL/path per line")
+    parser.add_argument("--prompt", choices=sorted(PROMPT_SCRIPTS), default="naive")
+    parser.add_argument("--out-dir", type=Path, default=None, help="default: pilot_with_pdf/data/corpus/<prompt>_<YYYYMMDD>")
+    parser.add_argument("--pdf-dir", type=Path, default=Path("pilot_with_pdf/data/pdf"))
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS)
+    parser.add_argument("--page-workers", type=int, default=PAGE_WORKERS)
+    parser.add_argument("--extract-workers", type=int, default=EXTRACT_WORKERS)
+    parser.add_argument("--retry-errors", action="store_true", help="re-run chunks whose rows have error/raw_output or unverified evidence")
+    parser.add_argument("--fresh", action="store_true", help="ignore any checkpoint and start new runs")
+    parser.add_argument("--no-parquet", action="store_true", help="skip the <out-dir>/parquet dataset (CSV/JSONL only)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    script = importlib.import_module(PROMPT_SCRIPTS[args.prompt])
+    out_dir = args.out_dir or Path(f"pilot_with_pdf/data/corpus/{args.prompt}_{datetime.now().strftime('%Y%m%d')}")
+
+    docs = load_manifest(args.manifest)
+    print(f"{len(docs)} documents in {args.manifest}")
+
+    runner = CorpusRunner(
+        script.extract_chunk_async,
+        script.prompt_hash(),
+        out_dir,
+        args.pdf_dir,
+        download_workers=args.download_workers,
+        parse_workers=args.parse_workers,
+        page_workers=args.page_workers,
+        extract_workers=args.extract_workers,
+        # RPM/TPM are enforced by the script's rate-limited client, shared by all documents
+        concurrency=script.CONCURRENCY,
+        prefilter_threshold=script.PREFILTER_THRESHOLD,
+        dedup_threshold=script.DEDUP_THRESHOLD,
+        cascade=script.CASCADE,
+        # after_analysis: carry rows over from the previous taxonomy plan's run
+        plan=getattr(script, "PLAN_TRACKER", None),
+        evidence_min_score=script.EVIDENCE_MIN_SCORE,
+        skipped_row=script.SKIPPED_ROW,
+        retry_errors=args.retry_errors,
+        fresh=args.fresh,
+        parquet=not args.no_parquet,
+        chunker=script.CHUNKER,
+        max_tokens=script.CHUNK_MAX_TOKENS,
+        max_chars=4000,
+        overlap=300,
+    )
+    report = runner.run(docs)
+    instruments = consolidate_files(sorted(out_dir.glob("*/extraction.jsonl")), out_dir / "instruments.csv")
+
+    summary = {k: v for k, v in report.items() if k != "per_document"}
+    print(json.dumps(summary, indent=2))
+    print(f"Report: {(out_dir / 'corpus_report.json').resolve()}")
+    print(f"Stage timings / tokens / cost: {(out_dir / 'run_report.json').resolve()}")
+    if not args.no_parquet:
+        print(f"Parquet dataset: {(out_dir / 'parquet').resolve()}")
+    print(f"Instruments: {(out_dir / 'instruments.csv').resolve()} {instruments}")
+    print("LLM cache:", script.aclient.cache.stats() if hasattr(script.aclient, "cache") else "off")
+    print("Prompt cache:", script.PROMPT_CACHE.report())
+    print("API:", script.aclient.metrics.snapshot())
+
+
+if __name__ == "__main__":
+    main()
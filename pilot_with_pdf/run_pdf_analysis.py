@@ -1,15 +1,21 @@
 import re
+import sys
 import json
-import time
-import requests
-import pdfplumber
-from tqdm import tqdm
-from dotenv import load_dotenv
-from openai import OpenAI
 from pathlib import Path
 from datetime import datetime
 from collections import Counter
 
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.clients import lazy_client
+from src.instrumentation import RECORDER
+from src.pdf_pages import iter_pages, pdf_page_count, pdf_to_text_limited
+from src.chunking import iter_structured_chunks
+from src.sampling import RepresentativeSampler, pack_groups
+from src.prefilter import KEYWORD_SCAN
+from src.llm_engine import run_ordered
+from src.llm_json import acall_json, call_json, parse_stats
+
 # =========================
 # Config
 # =========================
@@ -22,59 +28,39 @@ MAX_PAGES_AFTER_SKIP = 15
 CHUNK_MAX_CHARS = 3500
 CHUNK_OVERLAP = 300
 
-KEYWORD_SCAN = [
-    "grant", "fund", "funding", "scheme",
-    "subsidy", "loan", "tax", "incentive",
-    "standard", "procurement", "regulation",
-    "eligible", "million", "HK$"
-]
+# Representative sampling (src/sampling.py). With SAMPLE_BUDGET_TOKENS set, the
+# typology and taxonomy steps read a sample of the whole document after
+# SKIP_FIRST_PAGES (MAX_PAGES_AFTER_SKIP is ignored) instead of the first 7,000
+# characters / 4 chunks of 15 pages. Chunks are stratified by keyword density
+# and picked for lexical diversity, up to the budget. The sample is split into
+# groups of SAMPLE_GROUP_TOKENS that are analysed in parallel, and one reduce
+# call per step merges the partial answers. The token cost is set by the
+# budget, not by the document length. None keeps the original single calls.
+SAMPLE_BUDGET_TOKENS = 12000
+SAMPLE_GROUP_TOKENS = 4000
+SAMPLE_CHUNK_TOKENS = 800
+SAMPLE_STRATA = 3
+CONCURRENCY = 4
 
 # =========================
 # Setup
 # =========================
 
-load_dotenv()
-client = OpenAI()
+# shared client (cached, rate-limited, recorded for the run report); the SDK is
+# imported and .env read on the first call, not when this module is imported
+client = lazy_client()
+aclient = lazy_client(async_=True)
 
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-timestamp_ymd = datetime.now().strftime("%Y%m%d")
 
 BASE_DIR = Path("pilot_with_pdf")
-PDF_PATH = BASE_DIR / "data" / "pdf" / f"hk_it_blueprint_{timestamp_ymd}.pdf"
-PDF_PATH.parent.mkdir(parents=True, exist_ok=True)
 OUT_DIR = BASE_DIR / "data" / "raw"
 
 # =========================
 # Utility functions
 # =========================
 
-def download_pdf(url: str, out_path: Path):
-    headers = {"User-Agent": "Mozilla/5.0"}
-    with requests.get(url, headers=headers, stream=True, timeout=60) as r:
-        r.raise_for_status()
-        with out_path.open("wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    f.write(chunk)
-
-
-def pdf_to_text_limited(path: Path, skip_first: int, max_pages: int) -> str:
-    pages = []
-    with pdfplumber.open(path) as pdf:
-        total_pages = len(pdf.pages)
-        start = skip_first
-        end = min(skip_first + max_pages, total_pages)
-
-        print(f"Total pages in PDF: {total_pages}")
-        print(f"Using pages {start} to {end - 1}")
-
-        for i in range(start, end):
-            text = pdf.pages[i].extract_text() or ""
-            pages.append(text)
-
-    return "\n".join(pages)
-
-
+@RECORDER.timed("chunk_text")
 def chunk_text(text: str, max_chars: int, overlap: int) -> list[str]:
     text = re.sub(r"\n{3,}", "\n\n", text).strip()
     chunks = []
@@ -85,31 +71,28 @@ def chunk_text(text: str, max_chars: int, overlap: int) -> list[str]:
     return chunks
 
 
+@RECORDER.timed("call_llm_json")
 def call_llm_json(prompt: str, max_output_tokens: int = 600):
-    for attempt in range(3):
-        try:
-            r = client.responses.create(
-                model=MODEL,
-                input=prompt,
-                temperature=0,
-                max_output_tokens=max_output_tokens,
-            )
-            raw = r.output_text
-            break
-        except Exception:
-            if attempt < 2:
-                time.sleep(2 ** attempt)
-            else:
-                raise
-
-    clean = raw.strip()
-    clean = re.sub(r"^```(?:json)?\s*", "", clean, flags=re.IGNORECASE)
-    clean = re.sub(r"\s*```$", "", clean)
-
-    try:
-        return json.loads(clean)
-    except json.JSONDecodeError:
-        return {"error": "Invalid JSON", "raw_output": clean[:1500]}
+    # Free-form JSON (json_object mode): the analysis/taxonomy shapes are open-ended.
+    # 429/5xx/timeouts are retried inside the client.
+    return call_json(
+        client,
+        model=MODEL,
+        input=prompt,
+        temperature=0,
+        max_output_tokens=max_output_tokens,
+    )
+
+
+@RECORDER.timed("call_llm_json")
+async def acall_llm_json(prompt: str, max_output_tokens: int = 600):
+    return await acall_json(
+        aclient,
+        model=MODEL,
+        input=prompt,
+        temperature=0,
+        max_output_tokens=max_output_tokens,
+    )
 
 
 # =========================
@@ -181,31 +164,170 @@ TEXT:
     return call_llm_json(prompt, max_output_tokens=800)
 
 
+# =========================
+# Steps 2-3 on a representative sample (map-reduce)
+# =========================
+
+TYPOLOGY_KEYS = """- doc_type
+- instrument_density
+- extraction_feasibility
+- likely_instrument_types
+- recommended_next_step
+- notes"""
+
+TAXONOMY_KEYS = """- taxonomy: list of {"category": ..., "definition": ...}
+- minimal_extraction_schema_fields: list of field names
+- coding_decision_rules: list of strings"""
+
+
+def typology_map_prompt(excerpts: str) -> str:
+    return f"""
+You are helping build a dataset from a government PDF.
+Below are excerpts sampled from across the whole document (page numbers in brackets).
+
+Return ONLY JSON with:
+{TYPOLOGY_KEYS}
+
+Describe what these excerpts show; another step combines several such answers.
+Be conservative and analytical.
+No policy advice.
+
+TEXT:
+{excerpts}
+"""
+
+
+def taxonomy_map_prompt(excerpts: str) -> str:
+    return f"""
+Based on the excerpts below, sampled from across the whole document (page numbers in brackets):
+
+1) Propose a taxonomy (8-12 categories) for coding industrial policy instruments.
+2) Provide short definitions.
+3) Suggest minimal extraction schema fields.
+4) Provide 5 coding decision rules.
+
+Return ONLY JSON with:
+{TAXONOMY_KEYS}
+
+TEXT:
+{excerpts}
+"""
+
+
+def typology_reduce_prompt(partials: list) -> str:
+    return f"""
+Each JSON object below analyses a different sample of excerpts from the same government PDF.
+Combine them into one analysis of the whole document: weigh every sample, do not just copy one.
+
+Return ONLY JSON with:
+{TYPOLOGY_KEYS}
+
+Be conservative and analytical.
+No policy advice.
+
+ANALYSES:
+{json.dumps(partials, ensure_ascii=False, indent=1)}
+"""
+
+
+def taxonomy_reduce_prompt(partials: list) -> str:
+    return f"""
+Each JSON object below is a taxonomy proposed from a different sample of excerpts from the same government PDF.
+Merge them into one taxonomy (8-12 categories) for coding industrial policy instruments across the whole document:
+merge categories that mean the same thing, keep distinct ones, and write one short definition each.
+Also give the merged minimal extraction schema fields and 5 coding decision rules.
+
+Return ONLY JSON with:
+{TAXONOMY_KEYS}
+
+PROPOSALS:
+{json.dumps(partials, ensure_ascii=False, indent=1)}
+"""
+
+
+def excerpt_block(chunks: list, group: list[int]) -> str:
+    return "\n\n".join(f"[p. {chunks[i].page_start + 1}]\n{chunks[i].text}" for i in group)
+
+
+def analyze_sample(chunks: list, groups: list[list[int]]) -> tuple[dict, dict]:
+    """Typology and taxonomy map calls for every group in parallel, then one reduce call per step."""
+    steps = {
+        "typology": (typology_map_prompt, typology_reduce_prompt, 500),
+        "taxonomy": (taxonomy_map_prompt, taxonomy_reduce_prompt, 800),
+    }
+    jobs = [(step, excerpt_block(chunks, group)) for step in steps for group in groups]
+
+    async def map_call(job):
+        step, excerpts = job
+        map_prompt, _, max_tokens = steps[step]
+        return await acall_llm_json(map_prompt(excerpts), max_output_tokens=max_tokens)
+
+    answers = run_ordered(jobs, map_call, concurrency=CONCURRENCY, desc="Sample analysis")
+    partials = {step: [] for step in steps}
+    for (step, _), out in zip(jobs, answers):
+        if isinstance(out, dict) and "error" not in out:
+            partials[step].append(out)
+    if not partials["typology"] or not partials["taxonomy"]:
+        failed = [a for a in answers if not isinstance(a, dict) or "error" in a]
+        raise RuntimeError(f"Sample analysis failed: {failed[:1]!r}")
+
+    async def reduce_call(step):
+        _, reduce_prompt, max_tokens = steps[step]
+        if len(partials[step]) == 1:
+            return partials[step][0]
+        return await acall_llm_json(reduce_prompt(partials[step]), max_output_tokens=max_tokens)
+
+    analysis, taxonomy = run_ordered(list(steps), reduce_call)
+    return analysis, taxonomy
+
+
 # =========================
 # Main
 # =========================
 
 def main():
+    # imported here so `import run_pdf_analysis` (e.g. from the CLI) stays cheap
+    from src.downloader import fetch_pdf
 
     print("Downloading PDF...")
-    download_pdf(PDF_URL, PDF_PATH)
+    pdf_path = fetch_pdf(PDF_URL)
+    RECORDER.set_document(pdf_path.name)
 
     print("Extracting text...")
-    text = pdf_to_text_limited(PDF_PATH, SKIP_FIRST_PAGES, MAX_PAGES_AFTER_SKIP)
+    sampler = None
+    with RECORDER.span("pdf_text"):
+        if SAMPLE_BUDGET_TOKENS is None:
+            text = pdf_to_text_limited(pdf_path, SKIP_FIRST_PAGES, MAX_PAGES_AFTER_SKIP)
+        else:
+            total_pages = pdf_page_count(pdf_path)
+            print(f"Total pages in PDF: {total_pages}")
+            print(f"Using pages {SKIP_FIRST_PAGES} to {total_pages - 1}")
+            pages = list(iter_pages(pdf_path, SKIP_FIRST_PAGES, total_pages))
+            text = "\n".join(t for _, t in pages)
 
     print(f"\nExtracted text length: {len(text)} characters")
 
     # Step 1: Cheap diagnostics
     keyword_scan(text)
 
-    chunks = chunk_text(text, CHUNK_MAX_CHARS, CHUNK_OVERLAP)
+    if SAMPLE_BUDGET_TOKENS is None:
+        chunks = chunk_text(text, CHUNK_MAX_CHARS, CHUNK_OVERLAP)
+    else:
+        chunks = list(RECORDER.timed_iter("chunk", iter_structured_chunks(pages, SAMPLE_CHUNK_TOKENS)))
+        sampler = RepresentativeSampler(SAMPLE_BUDGET_TOKENS, strata=SAMPLE_STRATA)
+        with RECORDER.span("sample"):
+            groups = pack_groups(chunks, sampler.sample(chunks), SAMPLE_GROUP_TOKENS)
+        print(f"Sample: {sampler.report()}; {len(groups)} groups")
     print(f"\nNumber of chunks: {len(chunks)}")
 
     # Step 2: AI Document Analysis
     print("\n==============================")
     print("STEP 2: DOCUMENT ANALYSIS")
     print("==============================")
-    analysis = analyze_document(text)
+    if sampler is None:
+        analysis = analyze_document(text)
+    else:
+        analysis, taxonomy = analyze_sample(chunks, groups)
     print(json.dumps(analysis, indent=2))
 
     # ✅ Save analysis (optional but useful)
@@ -217,7 +339,8 @@ def main():
     print("\n==============================")
     print("STEP 3: TAXONOMY PROPOSAL")
     print("==============================")
-    taxonomy = propose_taxonomy(chunks)
+    if sampler is None:
+        taxonomy = propose_taxonomy(chunks)
     print(json.dumps(taxonomy, indent=2))
 
     # ✅ Save taxonomy
@@ -227,6 +350,24 @@ def main():
     taxonomy_path_recent.write_text(json.dumps(taxonomy, indent=2), encoding="utf-8")
     print(f"\nSaved taxonomy to: {taxonomy_path.resolve()}")
 
+    # the sampled analysis goes through the async client
+    used = client if sampler is None else aclient
+    print("LLM cache:", used.cache.stats() if hasattr(used, "cache") else "off")
+    print("JSON parsing:", parse_stats())
+    print("API:", used.metrics.snapshot())
+
+    report_path = RECORDER.write_report(
+        OUT_DIR / f"run_report_analysis_{timestamp}.json",
+        script=Path(__file__).name,
+        model=MODEL,
+        pdf=str(pdf_path),
+        chunks=len(chunks),
+        sampling=sampler.report() if sampler is not None else None,
+        llm_cache=used.cache.stats() if hasattr(used, "cache") else None,
+        json_parsing=parse_stats(),
+        api=used.metrics.snapshot(),
+    )
+    print(f"Run report: {report_path.resolve()}")
     print("\nDone.")
 
 
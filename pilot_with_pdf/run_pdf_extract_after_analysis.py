@@ -1,27 +1,83 @@
-import re
 import json
-import requests
 import glob
 import os
-import time
-import pdfplumber
-import pandas as pd
-from tqdm import tqdm
-from dotenv import load_dotenv
-from openai import OpenAI
+import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from dataclasses import dataclass
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.clients import lazy_client
+from src.instrumentation import RECORDER, report_path
+from src.checkpoint import text_sha256
+from src.pdf_pipeline import run_pdf_extraction
+from src.prefilter import KeywordPrefilter
+from src.dedup import ChunkDeduper
+from src.evidence import EvidenceVerifier
+from src.cascade import ModelCascade
+from src.incremental import PlanTracker
+from src.prompt_prefix import PromptCacheStats, PromptPrefix, stable_list
+from src.llm_json import acall_json, call_json, parse_stats, schema_from_fields
 
 # ---------- Config ----------
 PDF_URL = "https://www.itib.gov.hk/en/publications/I%26T%20Blueprint%20Book_EN_single_Digital.pdf"
 MODEL = "gpt-4.1-mini"
+MAX_OUTPUT_TOKENS = 500
+
+# Model cascade (src/cascade.py), off by default: None sends every chunk to
+# MODEL. With a CHEAP_MODEL (e.g. "gpt-4.1-nano") it answers every chunk first
+# and only answers that failed, broke the schema or named an instrument without
+# evidence_spans are re-sent to MODEL (ESCALATE_BELOW applies to answers that
+# carry a confidence; this prompt does not ask for one). Check agreement with
+# pilot_with_pdf/eval_cascade.py before setting it.
+CHEAP_MODEL = None
+ESCALATE_BELOW = 0.7
+
+# Concurrency for the async engine; rate budgets (tier-1 gpt-4.1-mini limits) seed the
+# client's token buckets until the API's x-ratelimit headers report the real ones
+CONCURRENCY = 8
+RPM_LIMIT = 500
+TPM_LIMIT = 200_000
+
+# "structure": paragraph/heading-aware chunks under a token budget (no overlap)
+# "chars": the original 4000-char windows with 300-char overlap
+CHUNKER = "structure"
+CHUNK_MAX_TOKENS = 1000
+
+# Chunks with fewer instrument keywords than this (hits per 1,000 chars) are
+# labelled "other" locally without an API call; None (the default) sends every
+# chunk. Measure recall with pilot_with_pdf/eval_prefilter.py before setting it.
+PREFILTER_THRESHOLD = None
+
+# Chunks whose word 5-gram overlap (MinHash estimate of Jaccard) with an
+# already-sent chunk reaches this reuse that chunk's result instead of a call;
+# rows record dedup_of / dedup_similarity. None sends every chunk.
+DEDUP_THRESHOLD = 0.85
+
+# Evidence spans are looked up in the page text after the run (src/evidence.py):
+# spans found verbatim or with at least this share of their words in order pass;
+# rows with any other span get reextract=True and are re-sent by --retry-errors.
+# None skips the check.
+EVIDENCE_MIN_SCORE = 0.8
+
+# Typed copy of the rows (list columns, categorical instrument_type), partitioned
+# by document and run date; read back with src.columnar.read_dataset(PARQUET_DIR)
+PARQUET_DIR = Path("pilot_with_pdf/data/parquet/extract_analysis")
 
 # ---------- Setup ----------
-load_dotenv()
-client = OpenAI()
+# Shared clients (src/clients.py): retries (429/5xx/timeouts only) and throttling on one
+# budget, the response cache and run-report recording. Nothing is built, and no SDK
+# is imported, until the first call.
+client = lazy_client(rpm=RPM_LIMIT, tpm=TPM_LIMIT)
+aclient = lazy_client(async_=True)
+CASCADE = ModelCascade([CHEAP_MODEL, MODEL], threshold=ESCALATE_BELOW) if CHEAP_MODEL else None
 
 # ---------- Few-shot block ----------
 TAXONOMY = ["subsidy","tax_credit","grant","loan","export_control","local_content","procurement","standard","other"]
+DEFAULT_SCHEMA_FIELDS = ["policy_name", "category", "description", "implementing_body", "target_sector", "funding_amount"]
 
 
 def load_latest_taxonomy(raw_dir: str = "pilot_with_pdf/data/raw") -> dict:
@@ -35,14 +91,7 @@ def load_latest_taxonomy(raw_dir: str = "pilot_with_pdf/data/raw") -> dict:
     if not files:
         return {
             "taxonomy": [{"category": c, "definition": ""} for c in TAXONOMY],
-            "schema_fields": [
-                "policy_name",
-                "category",
-                "description",
-                "implementing_body",
-                "target_sector",
-                "funding_amount",
-            ],
+            "schema_fields": list(DEFAULT_SCHEMA_FIELDS),
         }
 
     latest = sorted(files)[-1]
@@ -53,28 +102,22 @@ def load_latest_taxonomy(raw_dir: str = "pilot_with_pdf/data/raw") -> dict:
     except Exception:
         return {
             "taxonomy": [{"category": c, "definition": ""} for c in TAXONOMY],
-            "schema_fields": [
-                "policy_name",
-                "category",
-                "description",
-                "implementing_body",
-                "target_sector",
-                "funding_amount",
-            ],
+            "schema_fields": list(DEFAULT_SCHEMA_FIELDS),
         }
 
 
-TAXONOMY_PLAN = load_latest_taxonomy()
-TAXONOMY_CATEGORIES = [t.get("category") for t in TAXONOMY_PLAN.get("taxonomy", [])]
-SCHEMA_FIELDS = TAXONOMY_PLAN.get("schema_fields", ["policy_name", "category", "description", "implementing_body", "target_sector", "funding_amount"])[:-0]
-
-FEWSHOT_BLOCK = f"""
+# The prompt around the taxonomy plan. Its hash (template_hash) plus the plan's
+# fingerprint (src/incremental.py) decide which chunks a plan change re-runs.
+FEWSHOT_TEMPLATE = """
 You are building a structured dataset of industrial policy and regulatory instruments.
 
-Use the following category choices exactly as provided: {TAXONOMY_CATEGORIES}
+Use the following category choices exactly as provided: {categories}
+
+Category definitions:
+{definitions}
 
 Return ONLY valid JSON with the following keys (use null or empty list when missing):
-{SCHEMA_FIELDS}
+{schema_fields}
 
 Rules:
 - Do NOT invent details.
@@ -86,47 +129,93 @@ Text: "Eligible firms may receive matching grants up to HKD 10 million for autom
 JSON: {{"policy_name": null, "category": "grant", "description": "matching grants for automation equipment upgrades", "implementing_body": null, "target_sector": "manufacturing", "funding_amount": "up to HKD 10 million", "evidence_spans": ["matching grants up to HKD 10 million"]}}
 """.strip()
 
-# ---------- 1) Download PDF ----------
-def download_pdf(url: str, out_path: Path, timeout: int = 60) -> None:
-    headers = {"User-Agent": "Mozilla/5.0"}
-    with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
-        r.raise_for_status()
-        with out_path.open("wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    f.write(chunk)
-
-# ---------- 2) PDF -> text ----------
-def pdf_to_text_limited(path: Path, skip_first: int = 8, max_pages: int = 5) -> str:
-    pages = []
-    with pdfplumber.open(path) as pdf:
-        total_pages = len(pdf.pages)
-        print(f"Total pages in PDF: {total_pages}")
-
-        start = skip_first
-        end = min(skip_first + max_pages, total_pages)
-
-        print(f"Processing pages {start} to {end - 1}")
-
-        for i in range(start, end):
-            text = pdf.pages[i].extract_text() or ""
-            pages.append(text)
-
-    return "\n".join(pages)
-
-# ---------- 3) Chunking ----------
-def chunk_text(text: str, max_chars: int = 5000, overlap: int = 500) -> list[str]:
-    text = re.sub(r"\n{3,}", "\n\n", text).strip()
-    chunks = []
-    i = 0
-    while i < len(text):
-        chunks.append(text[i:i + max_chars])
-        i += max_chars - overlap
-    return chunks
-
-# ---------- 4) LLM extraction (few-shot + retries + robust JSON parsing) ----------
-def extract_fields(chunk: str) -> dict:
-    prompt = FEWSHOT_BLOCK + f"""
+
+@dataclass(frozen=True)
+class ExtractionPrompt:
+    taxonomy_plan: dict
+    categories: list
+    schema_fields: list
+    fewshot_block: str
+    prefix: PromptPrefix
+    cache_stats: PromptCacheStats
+    schema: dict
+    plan_tracker: PlanTracker
+
+
+def with_other(categories: list) -> list:
+    if any(str(c).strip().lower() == "other" for c in categories if c):
+        return categories
+    return categories + ["other"]
+
+
+@lru_cache(maxsize=None)
+def extraction_prompt() -> ExtractionPrompt:
+    """Everything derived from the taxonomy plan, read from disk on first use (not at import)."""
+    plan = load_latest_taxonomy()
+    categories = [t.get("category") for t in plan.get("taxonomy", [])]
+    schema_fields = plan.get("schema_fields", DEFAULT_SCHEMA_FIELDS)
+
+    definitions = "\n".join(
+        f"- {t.get('category')}: {t.get('definition')}" if t.get("definition") else f"- {t.get('category')}"
+        for t in plan.get("taxonomy", [])
+        if t.get("category")
+    )
+    fewshot_block = FEWSHOT_TEMPLATE.format(
+        categories=stable_list(categories),
+        definitions=definitions,
+        schema_fields=stable_list(schema_fields),
+    )
+
+    # Everything ahead of the chunk is identical for every request in a run, so the
+    # provider can serve it from its prompt cache; cache_stats tallies the cached
+    # input tokens reported back in each response's usage.
+    prefix = PromptPrefix(fewshot_block)
+    return ExtractionPrompt(
+        taxonomy_plan=plan,
+        categories=categories,
+        schema_fields=schema_fields,
+        fewshot_block=fewshot_block,
+        prefix=prefix,
+        cache_stats=PromptCacheStats(prefix),
+        # Typed version of schema_fields (+ evidence_spans, as in the example), sent as a
+        # strict json_schema; `category` is restricted to the taxonomy when there is one,
+        # plus "other" (as in SKIPPED_ROW) so chunks without an instrument need no label
+        schema=schema_from_fields(
+            schema_fields + ["evidence_spans"],
+            enums={"category": with_other(categories)} if any(categories) else None,
+        ),
+        plan_tracker=PlanTracker(plan.get("taxonomy", []), schema_fields, template_hash()),
+    )
+
+
+# The old module-level names, resolved on first access (run_corpus.py reads PROMPT_CACHE)
+_PROMPT_ATTRS = {
+    "TAXONOMY_PLAN": "taxonomy_plan",
+    "TAXONOMY_CATEGORIES": "categories",
+    "SCHEMA_FIELDS": "schema_fields",
+    "FEWSHOT_BLOCK": "fewshot_block",
+    "PROMPT_PREFIX": "prefix",
+    "PROMPT_CACHE": "cache_stats",
+    "EXTRACTION_SCHEMA": "schema",
+    "PLAN_TRACKER": "plan_tracker",
+}
+
+
+def __getattr__(name: str):
+    if name in _PROMPT_ATTRS:
+        return getattr(extraction_prompt(), _PROMPT_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ---------- 1) Download PDF: src/downloader.py (conditional GET, resumable) ----------
+
+# ---------- 2) PDF -> pages, 3) pages -> chunks: src/pdf_pipeline.py ----------
+
+# ---------- 4) LLM extraction (few-shot + retries + src/llm_json.py parsing) ----------
+def build_prompt(chunk: str) -> str:
+    return extraction_prompt().prefix.render(chunk_block(chunk))
+
+def chunk_block(chunk: str) -> str:
+    return f"""
 
 Now process the next text.
 
@@ -135,87 +224,135 @@ Text:
 
 Return ONLY JSON:
 """
-    attempts = 3
-    r = None
-    for attempt in range(attempts):
-        try:
-            r = client.responses.create(
-                model=MODEL,
-                input=prompt,
-                temperature=0,
-                max_output_tokens=500,  # cost + consistency
-            )
-            break
-        except Exception:
-            if attempt < attempts - 1:
-                time.sleep(2 ** attempt)
-                continue
-            else:
-                raise
-
-    raw = getattr(r, "output_text", None)
-    if not raw:
-        try:
-            raw = r.output[0].content[0].text
-        except Exception:
-            raw = str(r)
-
-    clean = raw.strip()
-    clean = re.sub(r"^```(?:json)?\s*", "", clean, flags=re.IGNORECASE)
-    clean = re.sub(r"\s*```$", "", clean)
 
-    try:
-        return json.loads(clean)
-    except json.JSONDecodeError:
-        m = re.search(r"\{.*\}", clean, flags=re.DOTALL)
-        if m:
-            try:
-                return json.loads(m.group(0))
-            except json.JSONDecodeError:
-                pass
-
-    return {"error": "Invalid JSON", "raw_output": clean[:1000]}
+@RECORDER.timed("extract_fields")
+def extract_fields(chunk: str, model: str = MODEL) -> dict:
+    # structured output against the taxonomy's schema; local repair, then one re-ask.
+    # Transient API errors are retried inside the client (src/rate_limit.py).
+    prompt = extraction_prompt()
+    return call_json(
+        client,
+        schema=prompt.schema,
+        schema_name="policy_instrument",
+        on_response=prompt.cache_stats.record,
+        model=model,
+        input=build_prompt(chunk),
+        temperature=0,
+        max_output_tokens=MAX_OUTPUT_TOKENS,  # cost + consistency
+        prompt_cache_key=prompt.prefix.cache_key,
+    )
+
+@RECORDER.timed("extract_fields")
+async def extract_fields_async(chunk: str, model: str = MODEL) -> dict:
+    prompt = extraction_prompt()
+    return await acall_json(
+        aclient,
+        schema=prompt.schema,
+        schema_name="policy_instrument",
+        on_response=prompt.cache_stats.record,
+        model=model,
+        input=build_prompt(chunk),
+        temperature=0,
+        max_output_tokens=MAX_OUTPUT_TOKENS,
+        prompt_cache_key=prompt.prefix.cache_key,
+    )
+
+# What the pipeline calls per chunk: through CASCADE when there is one
+extract_chunk_async = CASCADE.wrap(extract_fields_async) if CASCADE is not None else extract_fields_async
+
+# Row written for chunks the keyword prefilter skips
+SKIPPED_ROW = {"category": "other", "evidence_spans": []}
+
+def prompt_hash() -> str:
+    # Changing the model(s), output cap or prompt template starts a new run instead of resuming
+    schema = json.dumps(extraction_prompt().schema, sort_keys=True)
+    cascade = json.dumps(CASCADE.settings()) if CASCADE is not None else ""
+    return text_sha256(f"{MODEL}|{MAX_OUTPUT_TOKENS}|{build_prompt('{chunk}')}|{schema}|{cascade}")
+
+def template_hash() -> str:
+    # Everything in prompt_hash except the taxonomy plan: runs that share it can reuse
+    # each other's rows for the categories and fields a plan change leaves alone
+    cascade = json.dumps(CASCADE.settings()) if CASCADE is not None else ""
+    return text_sha256(f"{MODEL}|{MAX_OUTPUT_TOKENS}|{FEWSHOT_TEMPLATE}|{chunk_block('{chunk}')}|{cascade}")
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--retry-errors", action="store_true", help="re-run chunks whose rows have error/raw_output or unverified evidence")
+    parser.add_argument("--fresh", action="store_true", help="ignore any checkpoint and start a new run")
+    return parser.parse_args()
 
 def main():
+    # imported here so importing the script (CLI, run_corpus, benchmarks) stays cheap
+    from src.downloader import fetch_pdf
+    from src.corpus import make_doc_id
+
+    args = parse_args()
     timestamp_ymd = datetime.now().strftime("%Y%m%d")
 
-    pdf_dir = Path("pilot_with_pdf/data/pdf")
     raw_dir = Path("pilot_with_pdf/data/raw")
-    pdf_dir.mkdir(parents=True, exist_ok=True)
     raw_dir.mkdir(parents=True, exist_ok=True)
 
     out_csv = Path(f"pilot_with_pdf/data/extract_analysis/hk_it_blueprint_extraction_{timestamp_ymd}.csv")
     out_csv.parent.mkdir(parents=True, exist_ok=True)
 
-    # Prefer an existing downloaded PDF if available
-    candidates = list(pdf_dir.glob("hk_it_blueprint_*.pdf")) + list(raw_dir.glob("hk_it_blueprint_*.pdf"))
-    if candidates:
-        pdf_path = sorted(candidates)[-1]
-        print(f"Using existing PDF: {pdf_path.resolve()}")
-    else:
-        pdf_path = pdf_dir / f"hk_it_blueprint_{timestamp_ymd}.pdf"
-        print("Downloading PDF...")
-        download_pdf(PDF_URL, pdf_path)
-        print(f"Saved to {pdf_path.resolve()}")
+    # Re-validated with a conditional GET; only downloaded again if the PDF changed
+    print("Downloading PDF...")
+    pdf_path = fetch_pdf(PDF_URL)
 
     print("Extracting text...")
-    text = pdf_to_text_limited(pdf_path, skip_first=8, max_pages=15)
-    chunks = chunk_text(text, max_chars=4000, overlap=300)
-
-    print("Number of chunks:", len(chunks))
-
-    rows = []
-    for idx, ch in enumerate(tqdm(chunks, desc="LLM extracting")):
-        try:
-            out = extract_fields(ch)
-            out["chunk_id"] = idx
-            rows.append(out)
-        except Exception as e:
-            rows.append({"chunk_id": idx, "error": str(e)})
-
-    df = pd.DataFrame(rows)
-    df.to_csv(out_csv, index=False)
-    print(f"Done. Wrote {out_csv.resolve()}")
+    dedup = ChunkDeduper(DEDUP_THRESHOLD) if DEDUP_THRESHOLD is not None else None
+    verifier = EvidenceVerifier(EVIDENCE_MIN_SCORE) if EVIDENCE_MIN_SCORE is not None else None
+    with RECORDER.document(pdf_path.name):
+        manifest = run_pdf_extraction(
+            pdf_path,
+            out_csv,
+            extract_chunk_async,
+            prompt_hash(),
+            skip_first=8,
+            max_pages=15,
+            chunker=CHUNKER,
+            max_tokens=CHUNK_MAX_TOKENS,
+            max_chars=4000,
+            overlap=300,
+            retry_errors=args.retry_errors,
+            fresh=args.fresh,
+            concurrency=CONCURRENCY,
+            prefilter=KeywordPrefilter(PREFILTER_THRESHOLD) if PREFILTER_THRESHOLD is not None else None,
+            skipped_row=SKIPPED_ROW,
+            dedup=dedup,
+            verifier=verifier,
+            plan=extraction_prompt().plan_tracker,
+            parquet_dir=PARQUET_DIR,
+            doc_id=make_doc_id(PDF_URL),
+            desc="LLM extracting",
+        )
+    print(f"Done. Wrote {manifest.out_csv.resolve()}")
+    print("LLM cache:", aclient.cache.stats() if hasattr(aclient, "cache") else "off")
+    print("Prompt cache:", extraction_prompt().cache_stats.report())
+    print("Dedup:", dedup.report() if dedup is not None else "off")
+    print("Evidence:", verifier.report() if verifier is not None else "off")
+    print("Cascade:", CASCADE.report() if CASCADE is not None else "off")
+    print("Incremental:", manifest.meta.get("incremental", "resumed run"))
+    print("JSON parsing:", parse_stats())
+    print("API:", aclient.metrics.snapshot())
+
+    report = RECORDER.write_report(
+        report_path("extract_after_analysis"),
+        script=Path(__file__).name,
+        model=MODEL,
+        pdf=str(pdf_path),
+        out_csv=str(manifest.out_csv),
+        chunks=manifest.summary(),
+        llm_cache=aclient.cache.stats() if hasattr(aclient, "cache") else None,
+        prompt_cache=extraction_prompt().cache_stats.report(),
+        dedup=dedup.report() if dedup is not None else None,
+        evidence=verifier.report() if verifier is not None else None,
+        cascade=CASCADE.report() if CASCADE is not None else None,
+        incremental=manifest.meta.get("incremental"),
+        json_parsing=parse_stats(),
+        api=aclient.metrics.snapshot(),
+    )
+    print(f"Run report: {report.resolve()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
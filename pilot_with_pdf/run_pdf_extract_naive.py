@@ -1,22 +1,74 @@
-import re
 import json
-import requests
-import time
-import pdfplumber
-import pandas as pd
-from tqdm import tqdm
-from dotenv import load_dotenv
-from openai import OpenAI
+import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
 
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.clients import lazy_client
+from src.instrumentation import RECORDER, report_path
+from src.checkpoint import text_sha256
+from src.pdf_pipeline import run_pdf_extraction
+from src.prefilter import KeywordPrefilter
+from src.dedup import ChunkDeduper
+from src.evidence import EvidenceVerifier
+from src.cascade import ModelCascade
+from src.prompt_prefix import PromptCacheStats, PromptPrefix, stable_list
+from src.llm_json import acall_json, call_json, parse_stats, schema_from_fields
+
 # ---------- Config ----------
 PDF_URL = "https://www.itib.gov.hk/en/publications/I%26T%20Blueprint%20Book_EN_single_Digital.pdf"
 MODEL = "gpt-4.1-mini"
+MAX_OUTPUT_TOKENS = 500
+
+# Model cascade (src/cascade.py), off by default: None sends every chunk to
+# MODEL. With a CHEAP_MODEL (e.g. "gpt-4.1-nano") it answers every chunk first
+# and only answers that failed, broke the schema or named an instrument without
+# evidence_spans are re-sent to MODEL (ESCALATE_BELOW applies to answers that
+# carry a confidence; this prompt does not ask for one). Check agreement with
+# pilot_with_pdf/eval_cascade.py before setting it.
+CHEAP_MODEL = None
+ESCALATE_BELOW = 0.7
+
+# Concurrency for the async engine; rate budgets (tier-1 gpt-4.1-mini limits) seed the
+# client's token buckets until the API's x-ratelimit headers report the real ones
+CONCURRENCY = 8
+RPM_LIMIT = 500
+TPM_LIMIT = 200_000
+
+# "structure": paragraph/heading-aware chunks under a token budget (no overlap)
+# "chars": the original 4000-char windows with 300-char overlap
+CHUNKER = "structure"
+CHUNK_MAX_TOKENS = 1000
+
+# Chunks with fewer instrument keywords than this (hits per 1,000 chars) are
+# labelled "other" locally without an API call; None (the default) sends every
+# chunk. Measure recall with pilot_with_pdf/eval_prefilter.py before setting it.
+PREFILTER_THRESHOLD = None
+
+# Chunks whose word 5-gram overlap (MinHash estimate of Jaccard) with an
+# already-sent chunk reaches this reuse that chunk's result instead of a call;
+# rows record dedup_of / dedup_similarity. None sends every chunk.
+DEDUP_THRESHOLD = 0.85
+
+# Evidence spans are looked up in the page text after the run (src/evidence.py):
+# spans found verbatim or with at least this share of their words in order pass;
+# rows with any other span get reextract=True and are re-sent by --retry-errors.
+# None skips the check.
+EVIDENCE_MIN_SCORE = 0.8
+
+# Typed copy of the rows (list columns, categorical instrument_type), partitioned
+# by document and run date; read back with src.columnar.read_dataset(PARQUET_DIR)
+PARQUET_DIR = Path("pilot_with_pdf/data/parquet/extract_naive")
 
 # ---------- Setup ----------
-load_dotenv()
-client = OpenAI()
+# Shared clients (src/clients.py): retries (429/5xx/timeouts only) and throttling on one
+# budget, the response cache and run-report recording. Nothing is built, and no SDK
+# is imported, until the first call.
+client = lazy_client(rpm=RPM_LIMIT, tpm=TPM_LIMIT)
+aclient = lazy_client(async_=True)
+CASCADE = ModelCascade([CHEAP_MODEL, MODEL], threshold=ESCALATE_BELOW) if CHEAP_MODEL else None
 
 # ---------- Few-shot block ----------
 TAXONOMY = ["subsidy","tax_credit","grant","loan","export_control","local_content","procurement","standard","other"]
@@ -36,7 +88,7 @@ A "policy instrument" is a concrete, actionable measure such as:
 If the text is only strategy/vision/narrative without a concrete instrument, use instrument_type="other".
 
 Return ONLY valid JSON with keys:
-- instrument_type: one of {TAXONOMY}
+- instrument_type: one of {stable_list(TAXONOMY)}
 - target_sector: string|null
 - funding_amount_or_cap: string|null
 - eligibility_rules: list[string]
@@ -59,47 +111,25 @@ Text: "Exports of dual-use advanced chips require an export license before shipm
 JSON: {{"instrument_type":"export_control","target_sector":"semiconductors","funding_amount_or_cap":null,"eligibility_rules":["export license required"],"evidence_spans":["require an export license"]}}
 """.strip()
 
-# ---------- 1) Download PDF ----------
-def download_pdf(url: str, out_path: Path, timeout: int = 60) -> None:
-    headers = {"User-Agent": "Mozilla/5.0"}
-    with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
-        r.raise_for_status()
-        with out_path.open("wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    f.write(chunk)
-
-# ---------- 2) PDF -> text ----------
-def pdf_to_text_limited(path: Path, skip_first: int = 8, max_pages: int = 5) -> str:
-    pages = []
-    with pdfplumber.open(path) as pdf:
-        total_pages = len(pdf.pages)
-        print(f"Total pages in PDF: {total_pages}")
-
-        start = skip_first
-        end = min(skip_first + max_pages, total_pages)
-
-        print(f"Processing pages {start} to {end - 1}")
-
-        for i in range(start, end):
-            text = pdf.pages[i].extract_text() or ""
-            pages.append(text)
-
-    return "\n".join(pages)
-
-# ---------- 3) Chunking ----------
-def chunk_text(text: str, max_chars: int = 5000, overlap: int = 500) -> list[str]:
-    text = re.sub(r"\n{3,}", "\n\n", text).strip()
-    chunks = []
-    i = 0
-    while i < len(text):
-        chunks.append(text[i:i + max_chars])
-        i += max_chars - overlap
-    return chunks
-
-# ---------- 4) LLM extraction (few-shot + retries + robust JSON parsing) ----------
-def extract_fields(chunk: str) -> dict:
-    prompt = FEWSHOT_BLOCK + f"""
+# Everything ahead of the chunk is identical for every request in a run, so the
+# provider can serve it from its prompt cache; PROMPT_CACHE tallies the cached
+# input tokens reported back in each response's usage.
+PROMPT_PREFIX = PromptPrefix(FEWSHOT_BLOCK)
+PROMPT_CACHE = PromptCacheStats(PROMPT_PREFIX)
+
+# Typed version of the keys listed in FEWSHOT_BLOCK, sent as a strict json_schema
+EXTRACTION_SCHEMA = schema_from_fields(
+    ["instrument_type", "target_sector", "funding_amount_or_cap", "eligibility_rules", "evidence_spans"],
+    enums={"instrument_type": TAXONOMY},
+)
+
+# ---------- 1) Download PDF: src/downloader.py (conditional GET, resumable) ----------
+
+# ---------- 2) PDF -> pages, 3) pages -> chunks: src/pdf_pipeline.py ----------
+
+# ---------- 4) LLM extraction (few-shot + retries + src/llm_json.py parsing) ----------
+def build_prompt(chunk: str) -> str:
+    return PROMPT_PREFIX.render(f"""
 
 Now process the next text.
 
@@ -107,79 +137,127 @@ Text:
 {chunk}
 
 Return ONLY JSON:
-"""
-    attempts = 3
-    r = None
-    for attempt in range(attempts):
-        try:
-            r = client.responses.create(
-                model=MODEL,
-                input=prompt,
-                temperature=0,
-                max_output_tokens=500,  # cost + consistency
-            )
-            break
-        except Exception:
-            if attempt < attempts - 1:
-                time.sleep(2 ** attempt)
-                continue
-            else:
-                raise
-
-    raw = getattr(r, "output_text", None)
-    if not raw:
-        try:
-            raw = r.output[0].content[0].text
-        except Exception:
-            raw = str(r)
-
-    clean = raw.strip()
-    clean = re.sub(r"^```(?:json)?\s*", "", clean, flags=re.IGNORECASE)
-    clean = re.sub(r"\s*```$", "", clean)
-
-    try:
-        return json.loads(clean)
-    except json.JSONDecodeError:
-        m = re.search(r"\{.*\}", clean, flags=re.DOTALL)
-        if m:
-            try:
-                return json.loads(m.group(0))
-            except json.JSONDecodeError:
-                pass
-
-    return {"error": "Invalid JSON", "raw_output": clean[:1000]}
+""")
+
+@RECORDER.timed("extract_fields")
+def extract_fields(chunk: str, model: str = MODEL) -> dict:
+    # structured output against EXTRACTION_SCHEMA; local repair, then one re-ask.
+    # Transient API errors are retried inside the client (src/rate_limit.py).
+    return call_json(
+        client,
+        schema=EXTRACTION_SCHEMA,
+        schema_name="policy_instrument",
+        on_response=PROMPT_CACHE.record,
+        model=model,
+        input=build_prompt(chunk),
+        temperature=0,
+        max_output_tokens=MAX_OUTPUT_TOKENS,  # cost + consistency
+        prompt_cache_key=PROMPT_PREFIX.cache_key,
+    )
+
+@RECORDER.timed("extract_fields")
+async def extract_fields_async(chunk: str, model: str = MODEL) -> dict:
+    return await acall_json(
+        aclient,
+        schema=EXTRACTION_SCHEMA,
+        schema_name="policy_instrument",
+        on_response=PROMPT_CACHE.record,
+        model=model,
+        input=build_prompt(chunk),
+        temperature=0,
+        max_output_tokens=MAX_OUTPUT_TOKENS,
+        prompt_cache_key=PROMPT_PREFIX.cache_key,
+    )
+
+# What the pipeline calls per chunk: through CASCADE when there is one
+extract_chunk_async = CASCADE.wrap(extract_fields_async) if CASCADE is not None else extract_fields_async
+
+# Row written for chunks the keyword prefilter skips
+SKIPPED_ROW = {
+    "instrument_type": "other",
+    "target_sector": None,
+    "funding_amount_or_cap": None,
+    "eligibility_rules": [],
+    "evidence_spans": [],
+}
+
+def prompt_hash() -> str:
+    # Changing the model(s), output cap or prompt template starts a new run instead of resuming
+    schema = json.dumps(EXTRACTION_SCHEMA, sort_keys=True)
+    cascade = json.dumps(CASCADE.settings()) if CASCADE is not None else ""
+    return text_sha256(f"{MODEL}|{MAX_OUTPUT_TOKENS}|{build_prompt('{chunk}')}|{schema}|{cascade}")
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--retry-errors", action="store_true", help="re-run chunks whose rows have error/raw_output or unverified evidence")
+    parser.add_argument("--fresh", action="store_true", help="ignore any checkpoint and start a new run")
+    return parser.parse_args()
 
 def main():
-    timestamp = datetime.now().strftime("%Y%m%d")
+    # imported here so importing the script (CLI, run_corpus, benchmarks) stays cheap
+    from src.downloader import fetch_pdf
+    from src.corpus import make_doc_id
 
-    pdf_path = Path(f"pilot_with_pdf/data/pdf/hk_it_blueprint_{timestamp}.pdf")
-    pdf_path.parent.mkdir(parents=True, exist_ok=True)
+    args = parse_args()
+    timestamp = datetime.now().strftime("%Y%m%d")
 
     out_csv = Path(f"pilot_with_pdf/data/extract_naive/hk_it_blueprint_extraction_naive_{timestamp}.csv")
     out_csv.parent.mkdir(parents=True, exist_ok=True)
 
     print("Downloading PDF...")
-    download_pdf(PDF_URL, pdf_path)
-    print(f"Saved to {pdf_path.resolve()}")
+    pdf_path = fetch_pdf(PDF_URL)
 
     print("Extracting text...")
-    text = pdf_to_text_limited(pdf_path, skip_first=8, max_pages=15)
-    chunks = chunk_text(text, max_chars=4000, overlap=300)
-
-    print("Number of chunks:", len(chunks))
-
-    rows = []
-    for idx, ch in enumerate(tqdm(chunks, desc="LLM extracting")):
-        try:
-            out = extract_fields(ch)
-            out["chunk_id"] = idx
-            rows.append(out)
-        except Exception as e:
-            rows.append({"chunk_id": idx, "error": str(e)})
-
-    df = pd.DataFrame(rows)
-    df.to_csv(out_csv, index=False)
-    print(f"Done. Wrote {out_csv.resolve()}")
+    dedup = ChunkDeduper(DEDUP_THRESHOLD) if DEDUP_THRESHOLD is not None else None
+    verifier = EvidenceVerifier(EVIDENCE_MIN_SCORE) if EVIDENCE_MIN_SCORE is not None else None
+    with RECORDER.document(pdf_path.name):
+        manifest = run_pdf_extraction(
+            pdf_path,
+            out_csv,
+            extract_chunk_async,
+            prompt_hash(),
+            skip_first=8,
+            max_pages=15,
+            chunker=CHUNKER,
+            max_tokens=CHUNK_MAX_TOKENS,
+            max_chars=4000,
+            overlap=300,
+            retry_errors=args.retry_errors,
+            fresh=args.fresh,
+            concurrency=CONCURRENCY,
+            prefilter=KeywordPrefilter(PREFILTER_THRESHOLD) if PREFILTER_THRESHOLD is not None else None,
+            skipped_row=SKIPPED_ROW,
+            dedup=dedup,
+            verifier=verifier,
+            parquet_dir=PARQUET_DIR,
+            doc_id=make_doc_id(PDF_URL),
+            desc="LLM extracting",
+        )
+    print(f"Done. Wrote {manifest.out_csv.resolve()}")
+    print("LLM cache:", aclient.cache.stats() if hasattr(aclient, "cache") else "off")
+    print("Prompt cache:", PROMPT_CACHE.report())
+    print("Dedup:", dedup.report() if dedup is not None else "off")
+    print("Evidence:", verifier.report() if verifier is not None else "off")
+    print("Cascade:", CASCADE.report() if CASCADE is not None else "off")
+    print("JSON parsing:", parse_stats())
+    print("API:", aclient.metrics.snapshot())
+
+    report = RECORDER.write_report(
+        report_path("extract_naive"),
+        script=Path(__file__).name,
+        model=MODEL,
+        pdf=str(pdf_path),
+        out_csv=str(manifest.out_csv),
+        chunks=manifest.summary(),
+        llm_cache=aclient.cache.stats() if hasattr(aclient, "cache") else None,
+        prompt_cache=PROMPT_CACHE.report(),
+        dedup=dedup.report() if dedup is not None else None,
+        evidence=verifier.report() if verifier is not None else None,
+        cascade=CASCADE.report() if CASCADE is not None else None,
+        json_parsing=parse_stats(),
+        api=aclient.metrics.snapshot(),
+    )
+    print(f"Run report: {report.resolve()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
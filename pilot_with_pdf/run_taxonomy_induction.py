@@ -0,0 +1,218 @@
+import sys
+import json
+import math
+import argparse
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.corpus import CorpusDoc, load_manifest
+from src.pdf_pages import iter_pages, pdf_page_count
+from src.chunking import count_tokens, iter_structured_chunks
+from src.sampling import RepresentativeSampler
+from src.taxonomy import TaxonomyStore, merge_proposals
+from src.llm_engine import run_ordered
+from src.llm_json import parse_stats
+from src.instrumentation import RECORDER
+import run_pdf_analysis as analysis
+
+# One frozen taxonomy for a corpus of PDFs (map-reduce).
+#
+#   sample     every document is parsed (page cache, process pool) and reduced
+#              to a DOC_SAMPLE_TOKENS sample of its chunks (src/sampling.py)
+#   select     the document samples are sampled again: at most
+#              PROPOSALS_PER_SQRT_DOC * sqrt(documents) representatives, spread
+#              over keyword-density bands and lexically different documents;
+#              every other document counts towards its most similar one
+#   map        one taxonomy proposal per representative (run_pdf_analysis's
+#              prompt), CONCURRENCY calls at once
+#   merge      categories aligned locally by name and definition (src/taxonomy.py)
+#   reconcile  one LLM call over the MAX_CANDIDATES best-supported candidates
+#
+# LLM calls, tokens and the reconcile input grow with sqrt(documents), not with
+# the corpus; repeated runs reuse cached pages and responses. The result is
+# pilot_with_pdf/data/taxonomy/taxonomy_v<N>.json (a new N only when the
+# taxonomy changes). --install also writes it to taxonomy_plan_recent.json for
+# run_pdf_extract_after_analysis.py.
+#
+#   python pilot_with_pdf/run_taxonomy_induction.py pilot_with_pdf/corpus_manifest.example.csv --install
+
+# ---------- Config ----------
+DOC_SAMPLE_TOKENS = 3000      # per-document sample, sent whole in its proposal call
+PROPOSALS_PER_SQRT_DOC = 3    # proposal calls: min(documents, ceil(3 * sqrt(documents)))
+MAX_CANDIDATES = 60           # merged candidates shown to the reconciliation call
+DEF_SIMILARITY = 0.35         # definition word overlap that merges candidates sharing a name word
+DOWNLOAD_WORKERS = 4
+PARSE_WORKERS = 2
+CONCURRENCY = 8
+TAXONOMY_DIR = Path("pilot_with_pdf/data/taxonomy")
+
+
+def reconcile_prompt(merged: dict, n_docs: int) -> str:
+    candidates = [
+        {k: c[k] for k in ("name", "definition", "support", "aliases")}
+        for c in merged["candidates"][:MAX_CANDIDATES]
+    ]
+    fields = [f["field"] for f in merged["schema_fields"][:30]]
+    return f"""
+Below are candidate categories for coding industrial policy instruments, merged from taxonomies
+proposed for {n_docs} government documents. `support` is the number of documents behind each candidate;
+`aliases` are other names it was proposed under.
+
+1) Reconcile them into ONE taxonomy (8-12 categories) that covers the whole corpus:
+   merge overlapping candidates, keep well-supported distinct ones, drop one-off noise.
+   List for each category the candidate names it covers in `merged_from`.
+2) Provide short definitions.
+3) Choose the minimal extraction schema fields from the proposed fields.
+4) Provide 5 coding decision rules.
+
+Return ONLY JSON with:
+- taxonomy: list of {{"category": ..., "definition": ..., "merged_from": [...]}}
+- minimal_extraction_schema_fields: list of field names
+- coding_decision_rules: list of strings
+
+CANDIDATES:
+{json.dumps(candidates, ensure_ascii=False, indent=1)}
+
+PROPOSED SCHEMA FIELDS (most supported first):
+{json.dumps(fields)}
+
+PROPOSED RULES:
+{json.dumps(merged["coding_decision_rules"][:20], ensure_ascii=False, indent=1)}
+"""
+
+
+def resolve_paths(docs: list[CorpusDoc], pdf_dir: Path) -> None:
+    from src.downloader import Downloader  # imported on use: requests is not needed to import the script
+
+    urls = [d.source for d in docs if d.is_url]
+    if urls:
+        downloader = Downloader(pdf_dir, pool_size=DOWNLOAD_WORKERS)
+        results = dict(zip(urls, downloader.fetch_many(urls, workers=DOWNLOAD_WORKERS)))
+        downloader.close()
+    for doc in docs:
+        if not doc.is_url:
+            doc.path = doc.source if Path(doc.source).exists() else None
+            doc.error = None if doc.path else f"not found: {doc.source}"
+        else:
+            result = results[doc.source]
+            doc.path = str(result.path) if result.path else None
+            doc.download, doc.error = result.status, result.error
+
+
+def document_sample(doc: CorpusDoc) -> str:
+    """Page-tagged excerpts of a DOC_SAMPLE_TOKENS sample of the document."""
+    path = Path(doc.path)
+    total = pdf_page_count(path)
+    end = total if doc.max_pages is None else min(doc.skip_first + doc.max_pages, total)
+    pages = list(RECORDER.timed_iter("pdf_pages", iter_pages(path, min(doc.skip_first, end), end)))
+    doc.pages = len(pages)
+    chunks = list(iter_structured_chunks(pages, analysis.SAMPLE_CHUNK_TOKENS))
+    doc.chunks = len(chunks)
+    return analysis.excerpt_block(chunks, RepresentativeSampler(DOC_SAMPLE_TOKENS).sample(chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("manifest", type=Path, help="CSV (source[,doc_id,skip_first,max_pages]), JSONL, or one URL/path per line")
+    parser.add_argument("--pdf-dir", type=Path, default=Path("pilot_with_pdf/data/pdf"))
+    parser.add_argument("--max-proposals", type=int, default=None, help="default: ceil(PROPOSALS_PER_SQRT_DOC * sqrt(documents))")
+    parser.add_argument("--install", action="store_true", help="also write the taxonomy to data/raw/taxonomy_plan_recent.json")
+    args = parser.parse_args()
+
+    docs = load_manifest(args.manifest)
+    print(f"{len(docs)} documents in {args.manifest}")
+    resolve_paths(docs, args.pdf_dir)
+
+    samples: dict[int, str] = {}
+    with RECORDER.span("sample"), ThreadPoolExecutor(PARSE_WORKERS, thread_name_prefix="parse") as pool:
+        futures = {i: pool.submit(document_sample, d) for i, d in enumerate(docs) if d.path}
+        for i, fut in futures.items():
+            try:
+                samples[i] = fut.result()
+            except Exception as e:
+                docs[i].error = f"parse: {type(e).__name__}: {e}"
+    ids = [i for i in samples if samples[i].strip()]
+    for d in docs:
+        d.status = "failed" if d.error else "sampled"
+    if not ids:
+        sys.exit("No document could be read")
+
+    n_proposals = args.max_proposals or math.ceil(PROPOSALS_PER_SQRT_DOC * math.sqrt(len(ids)))
+    texts = [samples[i] for i in ids]
+    # a token budget worth n_proposals average document samples
+    mean_tokens = sum(count_tokens(t) for t in texts) / len(texts)
+    selector = RepresentativeSampler(int(mean_tokens * min(n_proposals, len(ids))))
+    reps = selector.sample(texts)
+    represented = Counter(a for a in selector.assignment if a is not None)
+    print(f"{len(ids)} documents sampled; proposals from {len(reps)} representatives")
+
+    async def propose(k: int) -> dict:
+        RECORDER.set_document(docs[ids[k]].doc_id)
+        return await analysis.acall_llm_json(analysis.taxonomy_map_prompt(texts[k]), max_output_tokens=800)
+
+    answers = run_ordered(reps, propose, concurrency=CONCURRENCY, desc="Taxonomy proposals")
+    ok = [(k, a) for k, a in zip(reps, answers) if isinstance(a, dict) and "error" not in a]
+    if not ok:
+        sys.exit(f"Every proposal failed: {answers[:1]!r}")
+
+    with RECORDER.span("merge"):
+        merged = merge_proposals(
+            [a for _, a in ok],
+            [docs[ids[k]].doc_id for k, _ in ok],
+            weights=[represented[k] for k, _ in ok],
+            def_similarity=DEF_SIMILARITY,
+        )
+    print(f"{merged['categories_in']} proposed categories -> {len(merged['candidates'])} candidates")
+
+    plan = analysis.call_llm_json(reconcile_prompt(merged, len(ids)), max_output_tokens=1500)
+    if not isinstance(plan, dict) or "error" in plan or not plan.get("taxonomy"):
+        sys.exit(f"Reconciliation failed: {plan!r}")
+
+    llm = RECORDER.report()["llm"]
+    induction = {
+        "manifest": str(args.manifest),
+        "model": analysis.MODEL,
+        "documents": len(docs),
+        "documents_sampled": len(ids),
+        "proposals": len(ok),
+        "failed_proposals": len(reps) - len(ok),
+        "representatives": {docs[ids[k]].doc_id: represented[k] for k, _ in ok},
+        "categories_in": merged["categories_in"],
+        "candidates": merged["candidates"][:MAX_CANDIDATES],
+        "schema_fields": merged["schema_fields"],
+        "cost_usd_est": round(sum(m.get("cost_usd", 0.0) for m in llm.values()), 6),
+    }
+    store = TaxonomyStore(TAXONOMY_DIR)
+    path, artefact, created = store.save(plan, induction)
+    print(json.dumps({k: artefact[k] for k in ("version", "taxonomy_hash", "taxonomy")}, indent=2, ensure_ascii=False))
+    print(f"{'Saved new' if created else 'Unchanged:'} taxonomy version {artefact['version']}: {path.resolve()}")
+    if args.install:
+        recent = analysis.OUT_DIR / "taxonomy_plan_recent.json"
+        recent.parent.mkdir(parents=True, exist_ok=True)
+        recent.write_text(json.dumps({k: artefact[k] for k in ("taxonomy", "minimal_extraction_schema_fields",
+                                                                "coding_decision_rules")}, indent=2), encoding="utf-8")
+        print(f"Installed as {recent.resolve()}")
+
+    print("JSON parsing:", parse_stats())
+    print("API:", analysis.aclient.metrics.snapshot())
+    report = RECORDER.write_report(
+        TAXONOMY_DIR / f"run_report_induction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        script=Path(__file__).name,
+        model=analysis.MODEL,
+        taxonomy=str(path),
+        version=artefact["version"],
+        created=created,
+        documents={d.doc_id: {"pages": d.pages, "chunks": d.chunks, "error": d.error} for d in docs},
+        selection=selector.report(),
+        json_parsing=parse_stats(),
+        api=analysis.aclient.metrics.snapshot(),
+    )
+    print(f"Run report: {report.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
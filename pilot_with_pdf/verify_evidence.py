@@ -0,0 +1,79 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Shared modules live in pilot_without_pdf/src
+sys.path.append(str(Path(__file__).resolve().parents[1] / "pilot_without_pdf"))
+from src.checkpoint import RUNS_DIR, RunManifest
+from src.evidence import EvidenceVerifier, PageIndex
+from src.pdf_pages import iter_pages, pdf_page_count
+from src.streaming import jsonl_to_csv
+
+# Check the evidence spans of existing extraction outputs against their PDF
+# (src/evidence.py), without any API call. The JSONL gains evidence_status /
+# evidence_score / evidence_matches / reextract and its CSV is rewritten. Runs
+# that wrote the file are marked so --retry-errors re-sends the flagged chunks.
+#
+#   python pilot_with_pdf/verify_evidence.py --corpus pilot_with_pdf/data/corpus/naive_20260301
+#   python pilot_with_pdf/verify_evidence.py --jsonl pilot_with_pdf/data/extract_naive/X.jsonl --pdf X.pdf
+
+# ---------- Config ----------
+MIN_SCORE = 0.8
+
+
+def documents(args) -> list[tuple[Path, Path, int, int | None]]:
+    """(jsonl, pdf, skip_first, max_pages) for every output to check."""
+    if args.corpus is None:
+        return [(args.jsonl, args.pdf, args.skip, args.pages)]
+    report = json.loads((args.corpus / "corpus_report.json").read_text(encoding="utf-8"))
+    docs = []
+    for doc in report["per_document"]:
+        jsonl = args.corpus / doc["doc_id"] / "extraction.jsonl"
+        if doc.get("path") and jsonl.exists():
+            docs.append((jsonl, Path(doc["path"]), doc["skip_first"], doc["max_pages"]))
+    return docs
+
+
+def flag_runs(jsonl: Path, chunk_ids: list, runs_dir: Path = RUNS_DIR) -> int:
+    """Mark the flagged chunks failed in every run whose output is `jsonl`."""
+    n = 0
+    for path in Path(runs_dir).glob("*/manifest.json"):
+        meta = json.loads(path.read_text(encoding="utf-8"))
+        if Path(meta.get("out_jsonl", "")).resolve() != jsonl.resolve():
+            continue
+        manifest = RunManifest(path.parent, meta)
+        manifest.close()
+        manifest.flag(chunk_ids)
+        n += 1
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path, default=None, help="a run_corpus.py output directory")
+    parser.add_argument("--jsonl", type=Path, default=None, help="one extraction JSONL (with --pdf)")
+    parser.add_argument("--pdf", type=Path, default=None)
+    parser.add_argument("--skip", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=15)
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    parser.add_argument("--no-flag", action="store_true", help="do not mark flagged chunks in the run checkpoints")
+    args = parser.parse_args()
+    if args.corpus is None and (args.jsonl is None or args.pdf is None):
+        parser.error("pass --corpus, or --jsonl with --pdf")
+
+    verifier = EvidenceVerifier(args.min_score)
+    for jsonl, pdf, skip_first, max_pages in documents(args):
+        total = pdf_page_count(pdf)
+        end = total if max_pages is None else min(skip_first + max_pages, total)
+        index = PageIndex(iter_pages(pdf, min(skip_first, end), end))
+        flagged = verifier.verify_jsonl(jsonl, index)
+        jsonl_to_csv(jsonl, jsonl.with_suffix(".csv"))
+        runs = 0 if args.no_flag or not flagged else flag_runs(jsonl, flagged)
+        print(f"{jsonl}: {len(flagged)} rows flagged for re-extraction"
+              f"{f' (marked in {runs} run checkpoints)' if runs else ''}")
+    print(json.dumps(verifier.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+# `python -m pilot_without_pdf <command>` from the repository root (see src/cli.py).
+# The shared modules are imported as `src.*`, the same as the pilot_with_pdf scripts
+# do, so a command that runs a script shares one copy of every module with it.
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from src.cli import main
+
+main()
@@ -1,8 +1,19 @@
+import argparse
+
 from pilot_without_pdf.src.batch_config import SNIPPETS
 from pilot_without_pdf.src.batch_pipeline import run_batch
+from pilot_without_pdf.src.columnar import dataframe_to_parquet
 
 if __name__ == "__main__":
-    df = run_batch(SNIPPETS)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["async", "packed", "batch"], default="async")
+    parser.add_argument("--batch-id", default=None, help="resume a previously submitted batch")
+    args = parser.parse_args()
+
+    df = run_batch(SNIPPETS, mode=args.mode, batch_id=args.batch_id)
     print(df[["id", "instrument_type", "confidence", "target_sector", "funding_amount_or_cap"]])
     df.to_csv("pilot_without_pdf/data/batch_fewshot_output.csv", index=False)
-    print("\nSaved: batch_fewshot_output.csv")
\ No newline at end of file
+    # one named part per mode, so a re-run replaces it like the CSV instead of adding a copy
+    parquet_path = dataframe_to_parquet(df, "pilot_without_pdf/data/parquet", doc_id=f"batch_fewshot_{args.mode}",
+                                        part="run_batch_demo")
+    print(f"\nSaved: batch_fewshot_output.csv and {parquet_path}")
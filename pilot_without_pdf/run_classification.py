@@ -1,7 +1,8 @@
 #Example 1 — Classification pipeline (document → label)
 
 import pandas as pd
-from pilot_without_pdf.src.classify import classify_policy_text
+from pilot_without_pdf.src.classify import classify_policy_texts
+from pilot_without_pdf.src.columnar import dataframe_to_parquet
 
 # Example policy paragraphs (you can replace these later)
 paragraphs = [
@@ -13,10 +14,11 @@ paragraphs = [
 
 rows = []
 
-for i, paragraph in enumerate(paragraphs):
-    print(f"Processing paragraph {i}...")
-    
-    result = classify_policy_text(paragraph)
+# Paragraphs are packed several per request; any the model skips are re-sent one by one
+print(f"Processing {len(paragraphs)} paragraphs...")
+results = classify_policy_texts(paragraphs)
+
+for i, (paragraph, result) in enumerate(zip(paragraphs, results)):
     result["text"] = paragraph
     result["id"] = i
     
@@ -26,6 +28,9 @@ df = pd.DataFrame(rows)
 
 # Save results
 df.to_csv("pilot_without_pdf/data/test_classification.csv", index=False)
+# typed copy (list columns stay lists): pilot_without_pdf/data/parquet/doc_id=test_classification/...
+# one named part, so a re-run replaces it like the CSV instead of adding a copy
+dataframe_to_parquet(df, "pilot_without_pdf/data/parquet", doc_id="test_classification", part="run_classification")
 
 print("\nFinal results:")
 print(df)
\ No newline at end of file
@@ -1,6 +1,7 @@
 # Example 2 — Structured extraction (text → dataset row)
 import pandas as pd
 from pilot_without_pdf.src.extract import extract_instrument_fields
+from pilot_without_pdf.src.columnar import dataframe_to_parquet
 
 # Example real-style policy text
 paragraphs = [
@@ -32,6 +33,9 @@ pd.set_option("display.max_columns", None)
 df = pd.DataFrame(rows)
 
 df.to_csv("pilot_without_pdf/data/test_extraction.csv", index=False)
+# typed copy (list columns stay lists): pilot_without_pdf/data/parquet/doc_id=test_extraction/...
+# one named part, so a re-run replaces it like the CSV instead of adding a copy
+dataframe_to_parquet(df, "pilot_without_pdf/data/parquet", doc_id="test_extraction", part="run_extraction")
 
 print("\nFinal output:")
 print(df)
\ No newline at end of file
@@ -0,0 +1,89 @@
+import json
+import time
+from pathlib import Path
+
+# Thin helpers around the OpenAI Batch API (/v1/batches) for overnight runs:
+# write one JSONL line per request, upload + submit, poll, then read the
+# output file back into {custom_id: result}. Half-finished batches are resumed
+# by passing the batch id to wait_for_batch()/collect_batch_output().
+
+BATCH_ENDPOINT = "/v1/responses"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_batch_file(requests: dict[str, dict], path: Path) -> Path:
+    """requests maps custom_id -> responses.create body (model, input, ...)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for custom_id, body in requests.items():
+            line = {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return path
+
+
+def submit_batch(client, path: Path, metadata: dict | None = None):
+    with path.open("rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    return client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata=metadata or {},
+    )
+
+
+def wait_for_batch(client, batch_id: str, poll_seconds: float = 30, timeout: float | None = None):
+    start = time.monotonic()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        if counts is not None:
+            print(f"Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)")
+        else:
+            print(f"Batch {batch_id}: {batch.status}")
+
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout}s")
+        time.sleep(poll_seconds)
+
+
+def response_body_text(body: dict) -> str:
+    """Equivalent of Response.output_text for a raw JSON response body."""
+    parts = []
+    for item in body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content", []):
+            if content.get("type") == "output_text":
+                parts.append(content.get("text", ""))
+    return "".join(parts)
+
+
+def _read_jsonl(client, file_id: str | None) -> list[dict]:
+    if not file_id:
+        return []
+    text = client.files.content(file_id).text
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def collect_batch_output(client, batch) -> dict[str, dict]:
+    """Map custom_id -> {"output_text": str} or {"error": str}.
+
+    Expired or cancelled batches still return whatever requests did finish.
+    """
+    results: dict[str, dict] = {}
+    for line in _read_jsonl(client, getattr(batch, "output_file_id", None)):
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code", 200) >= 400:
+            err = line.get("error") or response.get("body", {}).get("error")
+            results[line["custom_id"]] = {"error": json.dumps(err) if not isinstance(err, str) else err}
+        else:
+            results[line["custom_id"]] = {"output_text": response_body_text(response.get("body", {}))}
+
+    for line in _read_jsonl(client, getattr(batch, "error_file_id", None)):
+        err = line.get("error") or (line.get("response") or {}).get("body", {}).get("error")
+        results.setdefault(line["custom_id"], {"error": json.dumps(err) if not isinstance(err, str) else err})
+
+    return results
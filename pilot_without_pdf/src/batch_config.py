@@ -1,5 +1,10 @@
 MODEL = "gpt-4.1-mini"
 
+# Cheap first pass for run_batch(cascade=...): answers below ESCALATE_BELOW
+# confidence, failing the schema or without an evidence_span go to MODEL
+CHEAP_MODEL = "gpt-4.1-nano"
+ESCALATE_BELOW = 0.7
+
 TAXONOMY = [
     "subsidy", "tax_credit", "grant", "loan",
     "export_control", "local_content", "procurement", "standard", "other"
@@ -1,33 +1,182 @@
 import json
-import time
-import pandas as pd
-from tqdm import tqdm
-from dotenv import load_dotenv
-from openai import OpenAI
+import warnings
+from pathlib import Path
+from datetime import datetime
+from typing import TYPE_CHECKING
 
-from src.batch_config import MODEL
-from src.batch_prompt import FEWSHOT_BLOCK
+from .batch_config import MODEL
+from .batch_prompt import EXTRACT_SCHEMA, FEWSHOT_BLOCK
+from .llm_engine import estimate_tokens, run_ordered
+from .llm_cache import cache_key
+from .clients import lazy_client
+from .batch_api import collect_batch_output, submit_batch, wait_for_batch, write_batch_file
+from .cascade import ModelCascade
+from .packing import build_packed_prompt, parse_packed_output, plan_packs
+from .llm_json import acall_json, call_json, parse_reply, structured_format
 
-load_dotenv()
-client = OpenAI()
+if TYPE_CHECKING:
+    import pandas as pd
 
-def call_llm_extract(text: str) -> dict:
-    prompt = FEWSHOT_BLOCK + f"\n\nNow process this text:\nText: {text}\nJSON:"
-    r = client.responses.create(
-        model=MODEL,
-        input=prompt,
-    )
-    return json.loads(r.output_text)
+# 429/5xx/timeouts are retried with backoff inside the shared clients (one budget,
+# limits from response headers); nothing is built until the first call
+client = lazy_client()
+aclient = lazy_client(async_=True)
+
+BATCH_DIR = Path("pilot_without_pdf/data/batches")
+
+def build_prompt(text: str) -> str:
+    return FEWSHOT_BLOCK + f"\n\nNow process this text:\nText: {text}\nJSON:"
+
+def request_body(text: str, model: str = MODEL) -> dict:
+    # Shared by the sync/async calls and the Batch API file so all three hit the same cache key
+    return {
+        "model": model,
+        "input": build_prompt(text),
+        "text": structured_format(EXTRACT_SCHEMA, "policy_instrument"),
+    }
+
+def call_llm_extract(text: str, model: str = MODEL) -> dict:
+    return call_json(client, schema=EXTRACT_SCHEMA, **request_body(text, model))
+
+async def call_llm_extract_async(text: str, model: str = MODEL) -> dict:
+    return await acall_json(aclient, schema=EXTRACT_SCHEMA, **request_body(text, model))
+
+def _to_dataframe(snippets: list[str], results: list) -> "pd.DataFrame":
+    import pandas as pd
 
-def run_batch(snippets: list[str], sleep_seconds: float = 0.3) -> pd.DataFrame:
     rows = []
-    for i, s in enumerate(tqdm(snippets, desc="Batch extracting")):
+    for i, (s, out) in enumerate(zip(snippets, results)):
         try:
-            out = call_llm_extract(s)
+            if isinstance(out, Exception):
+                raise out
             out["id"] = i
             out["text"] = s
             rows.append(out)
         except Exception as e:
             rows.append({"id": i, "text": s, "error": str(e)})
-            time.sleep(sleep_seconds)
-    return pd.DataFrame(rows)
\ No newline at end of file
+    return pd.DataFrame(rows)
+
+def run_batch(
+    snippets: list[str],
+    sleep_seconds: float | None = None,
+    concurrency: int = 4,
+    rpm: int | None = None,
+    tpm: int | None = None,
+    mode: str = "async",
+    batch_id: str | None = None,
+    batch_dir: Path = BATCH_DIR,
+    poll_seconds: float = 30,
+    token_budget: int = 6000,
+    cascade: ModelCascade | None = None,
+) -> "pd.DataFrame":
+    """mode="async" calls the Responses API concurrently, one snippet per request
+    (through `cascade`, cheap model first, when one is given);
+    mode="packed" puts several snippets in each request (up to token_budget);
+    mode="batch" goes through the Batch API (pass batch_id to resume a submitted batch).
+    sleep_seconds is accepted for old callers and ignored: rpm/tpm and the
+    clients' retry backoff do the pacing now."""
+    if sleep_seconds is not None:
+        warnings.warn("run_batch(sleep_seconds=...) is ignored; use rpm/tpm to limit the request rate",
+                      DeprecationWarning, stacklevel=2)
+    if mode == "batch":
+        return run_batch_api(snippets, batch_id=batch_id, batch_dir=batch_dir, poll_seconds=poll_seconds)
+    if mode == "packed":
+        return run_batch_packed(snippets, token_budget=token_budget, concurrency=concurrency, rpm=rpm, tpm=tpm)
+
+    results = run_ordered(
+        snippets,
+        cascade.wrap(call_llm_extract_async) if cascade is not None else call_llm_extract_async,
+        concurrency=concurrency,
+        rpm=rpm,
+        tpm=tpm,
+        tokens_for=lambda s: estimate_tokens(build_prompt(s)),
+        desc="Batch extracting",
+    )
+    return _to_dataframe(snippets, results)
+
+async def call_llm_packed_async(prompt: str) -> str:
+    r = await aclient.responses.create(
+        model=MODEL,
+        input=prompt,
+    )
+    return r.output_text
+
+def run_batch_packed(
+    snippets: list[str],
+    token_budget: int = 6000,
+    concurrency: int = 4,
+    rpm: int | None = None,
+    tpm: int | None = None,
+) -> "pd.DataFrame":
+    packs = plan_packs(snippets, FEWSHOT_BLOCK, token_budget)
+    prompts = [build_packed_prompt(FEWSHOT_BLOCK, snippets, pack) for pack in packs]
+    raws = run_ordered(
+        prompts,
+        call_llm_packed_async,
+        concurrency=concurrency,
+        rpm=rpm,
+        tpm=tpm,
+        tokens_for=estimate_tokens,
+        desc=f"Packed extracting ({len(snippets)} snippets / {len(packs)} requests)",
+    )
+
+    results: list = [None] * len(snippets)
+    retry: list[int] = []
+    for pack, raw in zip(packs, raws):
+        if isinstance(raw, Exception):
+            retry.extend(pack)
+            continue
+        got, missing = parse_packed_output(raw, pack, schema=EXTRACT_SCHEMA)
+        for i, out in got.items():
+            results[i] = out
+        retry.extend(missing)
+
+    if retry:
+        # ids the model dropped, mangled or answered off-schema: fall back to one request each
+        singles = run_ordered(
+            [snippets[i] for i in retry],
+            call_llm_extract_async,
+            concurrency=concurrency,
+            rpm=rpm,
+            tpm=tpm,
+            tokens_for=lambda s: estimate_tokens(build_prompt(s)),
+            desc="Re-splitting failed snippets",
+        )
+        for i, out in zip(retry, singles):
+            results[i] = out
+    return _to_dataframe(snippets, results)
+
+def run_batch_api(
+    snippets: list[str],
+    batch_id: str | None = None,
+    batch_dir: Path = BATCH_DIR,
+    poll_seconds: float = 30,
+) -> "pd.DataFrame":
+    bodies = {f"snippet-{i}": request_body(s) for i, s in enumerate(snippets)}
+
+    if batch_id is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = write_batch_file(bodies, batch_dir / f"batch_input_{stamp}.jsonl")
+        batch = submit_batch(client, path, metadata={"source": "run_batch"})
+        batch_id = batch.id
+        (batch_dir / "last_batch.json").write_text(
+            json.dumps({"batch_id": batch_id, "input_file": str(path)}, indent=2), encoding="utf-8"
+        )
+        print(f"Submitted batch {batch_id} ({len(bodies)} requests). Resume with batch_id={batch_id!r}")
+
+    batch = wait_for_batch(client, batch_id, poll_seconds=poll_seconds)
+    output = collect_batch_output(client, batch)
+
+    results = []
+    for custom_id, body in bodies.items():
+        got = output.get(custom_id)
+        if got is None:
+            results.append(RuntimeError(f"No result in batch {batch_id} (status: {batch.status})"))
+        elif "error" in got:
+            results.append(RuntimeError(got["error"]))
+        else:
+            # Same cache entry a synchronous call would have produced
+            if hasattr(client, "cache"):
+                client.cache.put(cache_key(**body), got["output_text"], MODEL)
+            results.append(parse_reply(got["output_text"], EXTRACT_SCHEMA))
+    return _to_dataframe(snippets, results)
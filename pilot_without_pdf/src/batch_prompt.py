@@ -1,4 +1,5 @@
-from src.batch_config import TAXONOMY
+from .batch_config import TAXONOMY
+from .llm_json import enum_of, nullable_string, object_schema, string_list
 
 FEWSHOT_BLOCK = f"""
 You are building a dataset of industrial policy and regulatory instruments.
@@ -36,4 +37,14 @@ JSON: {{"instrument_type":"export_control","confidence":0.9,"target_sector":"sem
 
 Text: "Firms must meet 60% domestic content to qualify for incentives."
 JSON: {{"instrument_type":"local_content","confidence":0.9,"target_sector":null,"funding_amount_or_cap":null,"eligibility_rules":["60% domestic content"],"evidence_span":"60% domestic content"}}
-""".strip()
\ No newline at end of file
+""".strip()
+
+# Same keys as FEWSHOT_BLOCK, sent as a strict json_schema
+EXTRACT_SCHEMA = object_schema({
+    "instrument_type": enum_of(TAXONOMY),
+    "confidence": {"type": "number"},
+    "target_sector": nullable_string(),
+    "funding_amount_or_cap": nullable_string(),
+    "eligibility_rules": string_list(),
+    "evidence_span": nullable_string(),
+})
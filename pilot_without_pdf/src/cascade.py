@@ -0,0 +1,244 @@
+import time
+import inspect
+import functools
+import threading
+from collections import Counter
+from typing import Any, Iterable, Sequence
+
+from .instrumentation import RECORDER, Recorder, summarize
+
+# Model cascade for the extraction calls: a cheap model answers every chunk
+# first and only doubtful answers are sent again to the stronger model.
+#
+#   cascade = ModelCascade(["gpt-4.1-nano", "gpt-4.1-mini"], threshold=0.7)
+#   call = cascade.wrap(extract_fields_async)   # extract_fields_async(text, model=...)
+#
+# An answer is escalated to the next model when
+#   "error"           the call raised, or the reply was not valid JSON
+#   "schema"          it still had schema_errors after local repair / re-ask
+#   "low_confidence"  its `confidence` is missing or below `threshold`
+#                     (only checked when the prompt asks for one, e.g. batch_prompt.py)
+#   "no_evidence"     it names an instrument but quotes no evidence_spans /
+#                     evidence_span; "other" answers without quotes are kept,
+#                     since narrative chunks have nothing to quote
+# The last model's answer is always kept. Rows record the model that answered
+# (`model`) and, for escalated chunks, why the cheaper answer was rejected
+# (`escalation`).
+#
+# report() gives per tier: calls, kept / escalated counts by reason, latency of
+# the wrapped call (parsing and re-asks included), and tokens / cost as recorded
+# for the tier's model in RECORDER since the cascade was built (so a tier model
+# should not also serve another stage running at the same time).
+#
+# evaluate() replays the escalation rule over cheap-tier answers for chunks that
+# already have saved (strong-model) outputs: how many would be escalated, how
+# often the kept answers agree with the saved label, and how many of the
+# disagreements the rule catches (see pilot_with_pdf/eval_cascade.py).
+
+LABEL_FIELDS = ("instrument_type", "category")
+EVIDENCE_FIELDS = ("evidence_spans", "evidence_span")
+ABSTAIN_LABELS = {"", "other", "none", "null"}
+
+
+def _label(out: dict, fields: Sequence[str] = LABEL_FIELDS) -> str | None:
+    for f in fields:
+        if f in out:
+            value = out[f]
+            return str(value).strip().lower() if value is not None else None
+    return None
+
+
+def _empty(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip() in ("", "[]")
+    if isinstance(value, (list, tuple)):
+        return not any(str(v).strip() for v in value)
+    return False
+
+
+class ModelCascade:
+    def __init__(
+        self,
+        models: Sequence[str],
+        threshold: float | None = 0.7,
+        label_fields: Sequence[str] = LABEL_FIELDS,
+        evidence_fields: Sequence[str] = EVIDENCE_FIELDS,
+        recorder: Recorder = RECORDER,
+    ):
+        if not models:
+            raise ValueError("ModelCascade needs at least one model")
+        self.models = list(models)
+        self.threshold = threshold
+        self.label_fields = tuple(label_fields)
+        self.evidence_fields = tuple(evidence_fields)
+        self.recorder = recorder
+        self._lock = threading.Lock()
+        self.items = 0
+        self.calls = Counter()
+        self.kept = Counter()
+        self.escalated: dict[str, Counter] = {m: Counter() for m in self.models}
+        self.latencies: dict[str, list[float]] = {m: [] for m in self.models}
+        # RECORDER totals are per process; the report counts from here
+        self._baseline = {m: self._spend(m) for m in self.models}
+
+    def settings(self) -> dict:
+        """What decides the routing (part of the scripts' prompt hash)."""
+        return {"models": self.models, "threshold": self.threshold}
+
+    # ---------- routing rule ----------
+    def escalation_reason(self, out: Any) -> str | None:
+        """Why `out` should go to the next model, or None to keep it."""
+        if isinstance(out, BaseException) or not isinstance(out, dict) or "error" in out:
+            return "error"
+        if out.get("schema_errors"):
+            return "schema"
+        if self.threshold is not None and "confidence" in out:
+            conf = out["confidence"]
+            if not isinstance(conf, (int, float)) or isinstance(conf, bool) or conf < self.threshold:
+                return "low_confidence"
+        evidence = [f for f in self.evidence_fields if f in out]
+        if evidence and all(_empty(out[f]) for f in evidence):
+            if _label(out, self.label_fields) not in ABSTAIN_LABELS:
+                return "no_evidence"
+        return None
+
+    # ---------- calls ----------
+    def _record(self, model: str, seconds: float, reason: str | None, last: bool) -> None:
+        with self._lock:
+            self.calls[model] += 1
+            self.latencies[model].append(seconds)
+            if reason is None or last:
+                self.kept[model] += 1
+            else:
+                self.escalated[model][reason] += 1
+
+    @staticmethod
+    def _annotate(out: Any, model: str, escalation: str | None) -> Any:
+        if isinstance(out, dict):
+            out["model"] = model
+            if escalation is not None:
+                out["escalation"] = escalation
+        return out
+
+    def wrap(self, call):
+        """call(item, model=...) -> call(item) routed through the tiers (sync or async)."""
+        last = len(self.models) - 1
+
+        if inspect.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def async_routed(item, *args, **kwargs):
+                with self._lock:
+                    self.items += 1
+                escalation = None
+                for tier, model in enumerate(self.models):
+                    t0 = time.perf_counter()
+                    try:
+                        out = await call(item, *args, model=model, **kwargs)
+                    except Exception:
+                        self._record(model, time.perf_counter() - t0, "error", tier == last)
+                        if tier == last:
+                            raise
+                        escalation = "error"
+                        continue
+                    reason = self.escalation_reason(out)
+                    self._record(model, time.perf_counter() - t0, reason, tier == last)
+                    if reason is None or tier == last:
+                        return self._annotate(out, model, escalation)
+                    escalation = reason
+            return async_routed
+
+        @functools.wraps(call)
+        def routed(item, *args, **kwargs):
+            with self._lock:
+                self.items += 1
+            escalation = None
+            for tier, model in enumerate(self.models):
+                t0 = time.perf_counter()
+                try:
+                    out = call(item, *args, model=model, **kwargs)
+                except Exception:
+                    self._record(model, time.perf_counter() - t0, "error", tier == last)
+                    if tier == last:
+                        raise
+                    escalation = "error"
+                    continue
+                reason = self.escalation_reason(out)
+                self._record(model, time.perf_counter() - t0, reason, tier == last)
+                if reason is None or tier == last:
+                    return self._annotate(out, model, escalation)
+                escalation = reason
+        return routed
+
+    # ---------- reporting ----------
+    def _spend(self, model: str) -> dict:
+        with self.recorder._lock:
+            b = dict(self.recorder.llm.get(model, {}))
+        return {k: b.get(k, 0) for k in ("calls", "input_tokens", "cached_tokens", "output_tokens", "cost_usd")}
+
+    def report(self) -> dict:
+        tiers = {}
+        total_cost = 0.0
+        with self._lock:
+            items = self.items
+            for model in self.models:
+                now, base = self._spend(model), self._baseline[model]
+                spend = {k: now[k] - base[k] for k in now}
+                total_cost += spend["cost_usd"]
+                tiers[model] = {
+                    "calls": self.calls[model],
+                    "kept": self.kept[model],
+                    "escalated": dict(self.escalated[model]),
+                    "latency": summarize(self.latencies[model]),
+                    "api_calls": spend["calls"],
+                    "input_tokens": spend["input_tokens"],
+                    "output_tokens": spend["output_tokens"],
+                    "cost_usd": round(spend["cost_usd"], 6),
+                }
+        strong = tiers[self.models[-1]]
+        out = {
+            **self.settings(),
+            "items": items,
+            "escalation_rate": round(1 - tiers[self.models[0]]["kept"] / items, 4) if items else 0.0,
+            "tiers": tiers,
+            "cost_usd": round(total_cost, 6),
+        }
+        if len(self.models) > 1 and strong["api_calls"]:
+            # what sending every item straight to the last model would have cost, at its observed mean
+            out["last_model_only_cost_usd_est"] = round(strong["cost_usd"] / strong["api_calls"] * items, 6)
+        return out
+
+    # ---------- evaluation against saved outputs ----------
+    def evaluate(self, answers: Iterable[Any], references: Iterable[dict], label: str | None = None) -> dict:
+        """Replay the routing rule over first-tier `answers` paired with saved `references`.
+
+        Escalated answers are assumed to end up with the reference answer, so
+        `agreement` is the label agreement the cascade would reach overall.
+        """
+        fields = (label,) if label else self.label_fields
+        n = kept = kept_agree = disagree = caught = 0
+        reasons = Counter()
+        for out, ref in zip(answers, references):
+            n += 1
+            reason = self.escalation_reason(out)
+            same = isinstance(out, dict) and "error" not in out and _label(out, fields) == _label(ref, fields)
+            if not same:
+                disagree += 1
+            if reason is None:
+                kept += 1
+                kept_agree += int(same)
+            else:
+                reasons[reason] += 1
+                caught += int(not same)
+        return {
+            **self.settings(),
+            "items": n,
+            "escalated": n - kept,
+            "escalation_rate": round((n - kept) / n, 4) if n else 0.0,
+            "escalated_by_reason": dict(reasons),
+            "kept_agreement": round(kept_agree / kept, 4) if kept else None,
+            "agreement": round((kept_agree + n - kept) / n, 4) if n else None,
+            "first_tier_disagreements": disagree,
+            "disagreements_escalated": caught,
+        }
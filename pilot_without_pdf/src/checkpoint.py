@@ -0,0 +1,153 @@
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Iterable
+
+from .streaming import iter_jsonl
+
+# Run manifests for resumable extraction.
+#
+# A run is identified by the PDF's sha256, the chunking parameters, a hash of
+# the prompt template and the output file, so re-invoking a script with the
+# same inputs picks up the same run directory. The same PDF written somewhere
+# else (e.g. by the corpus runner after a single-document run) is a separate
+# run, so its rows are never appended to another run's output. Each finished chunk is appended to progress.jsonl;
+# on the next invocation completed chunk_ids are skipped (and, optionally,
+# failed ones retried) while rows keep being appended to the original output.
+
+RUNS_DIR = Path("pilot_with_pdf/data/runs")
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def run_key(pdf_sha256: str, chunk_params: dict, prompt_hash: str, out_jsonl: Path | None = None) -> str:
+    payload = json.dumps(
+        {
+            "pdf": pdf_sha256,
+            "chunking": chunk_params,
+            "prompt": prompt_hash,
+            "out": str(Path(out_jsonl).resolve()) if out_jsonl is not None else None,
+        },
+        sort_keys=True,
+    )
+    return text_sha256(payload)[:16]
+
+
+def is_failed(row: dict) -> bool:
+    # reextract: evidence spans not found in the source text (src/evidence.py)
+    return bool(row.get("error")) or bool(row.get("raw_output")) or bool(row.get("reextract"))
+
+
+class RunManifest:
+    def __init__(self, run_dir: Path, meta: dict):
+        self.dir = run_dir
+        self.meta = meta
+        self.progress_path = run_dir / "progress.jsonl"
+        self.completed: dict[int, bool] = {}  # chunk_id -> ok
+        if self.progress_path.exists():
+            for rec in iter_jsonl(self.progress_path):
+                self.completed[rec["chunk_id"]] = rec["ok"]
+        self._progress = self.progress_path.open("a", encoding="utf-8")
+
+    @classmethod
+    def open(
+        cls,
+        pdf_sha256: str,
+        chunk_params: dict,
+        prompt_hash: str,
+        out_jsonl: Path,
+        out_csv: Path,
+        runs_dir: Path = RUNS_DIR,
+        fresh: bool = False,
+        extra: dict | None = None,
+    ) -> "RunManifest":
+        key = run_key(pdf_sha256, chunk_params, prompt_hash, out_jsonl)
+        run_dir = runs_dir / key
+        manifest_path = run_dir / "manifest.json"
+
+        if manifest_path.exists() and not fresh:
+            meta = json.loads(manifest_path.read_text(encoding="utf-8"))
+            meta["resumed_at"] = datetime.now().isoformat(timespec="seconds")
+        else:
+            run_dir.mkdir(parents=True, exist_ok=True)
+            (run_dir / "progress.jsonl").unlink(missing_ok=True)
+            meta = {
+                "run_key": key,
+                "pdf_sha256": pdf_sha256,
+                "chunking": chunk_params,
+                "prompt_hash": prompt_hash,
+                "out_jsonl": str(out_jsonl),
+                "out_csv": str(out_csv),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                **(extra or {}),
+            }
+        manifest_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        return cls(run_dir, meta)
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.completed)
+
+    @property
+    def out_jsonl(self) -> Path:
+        return Path(self.meta["out_jsonl"])
+
+    @property
+    def out_csv(self) -> Path:
+        return Path(self.meta["out_csv"])
+
+    def update_meta(self, **fields) -> None:
+        self.meta.update(fields)
+        (self.dir / "manifest.json").write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+
+    def should_skip(self, chunk_id: int, retry_errors: bool = False) -> bool:
+        ok = self.completed.get(chunk_id)
+        if ok is None:
+            return False
+        return ok or not retry_errors
+
+    def record(self, row: dict) -> None:
+        ok = not is_failed(row)
+        self.completed[row["chunk_id"]] = ok
+        self._progress.write(json.dumps({"chunk_id": row["chunk_id"], "ok": ok}) + "\n")
+        self._progress.flush()
+
+    def flag(self, chunk_ids: Iterable[int]) -> None:
+        """Mark finished chunks as failed after the fact, so --retry-errors re-runs them."""
+        with self.progress_path.open("a", encoding="utf-8") as f:
+            for chunk_id in chunk_ids:
+                self.completed[chunk_id] = False
+                f.write(json.dumps({"chunk_id": chunk_id, "ok": False}) + "\n")
+
+    def summary(self) -> dict:
+        failed = sum(1 for ok in self.completed.values() if not ok)
+        return {"completed": len(self.completed) - failed, "failed": failed}
+
+    def close(self) -> None:
+        self._progress.close()
+
+
+def compact_jsonl(path: Path, id_field: str = "chunk_id") -> int:
+    """Keep only the last row written for each id, sorted by id.
+
+    Only byte offsets are held in memory, so this stays cheap on large outputs.
+    """
+    last: dict = {}
+    with path.open("rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                last[json.loads(line)[id_field]] = offset
+            offset += len(line)
+
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with path.open("rb") as src, tmp.open("wb") as dst:
+        for key in sorted(last):
+            src.seek(last[key])
+            line = src.readline()
+            dst.write(line if line.endswith(b"\n") else line + b"\n")
+    tmp.replace(path)
+    return len(last)
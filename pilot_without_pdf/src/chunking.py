@@ -0,0 +1,237 @@
+import re
+from functools import lru_cache
+from dataclasses import dataclass, asdict
+from typing import Iterable, Iterator
+
+# Structure-aware chunking: pages are split into paragraph / heading / bullet
+# blocks, which are packed into chunks under a token budget. Blocks are
+# verbatim slices of the page text (so evidence quotes still match), and each
+# chunk records where it came from (page + character offsets).
+
+TOKEN_ENCODING = "o200k_base"  # gpt-4.1 family
+
+_TERMINAL = (".", "?", "!", ":", ";", "。")
+_BULLET = re.compile(r"^\s*(?:[•▪●◦■\-–*]|\(?[a-z0-9]{1,3}[.)])\s+", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    # tiktoken is optional and needs its BPE file cached locally (TIKTOKEN_CACHE_DIR)
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # Offline approximation of a BPE tokenizer: one token per punctuation mark,
+    # one per ~4 characters of each word
+    return sum((len(t) + 3) // 4 for t in _APPROX_TOKEN.findall(text))
+
+
+@dataclass
+class Chunk:
+    text: str
+    page_start: int
+    page_end: int
+    char_start: int  # offset into page_start's text
+    char_end: int  # offset into page_end's text
+    n_tokens: int
+
+    def provenance(self) -> dict:
+        d = asdict(self)
+        del d["text"]
+        return d
+
+
+@dataclass
+class _Block:
+    page: int
+    start: int
+    end: int
+    text: str
+    heading: bool
+    n_tokens: int
+
+
+def _is_heading(line: str) -> bool:
+    s = line.strip()
+    if not s or len(s) > 80 or s.endswith(_TERMINAL) or s.endswith(","):
+        return False
+    words = s.split()
+    if len(words) > 12:
+        return False
+    if re.match(r"^(?:\d+(?:\.\d+)*|[IVX]+\.|chapter|part|section)\b", s, re.IGNORECASE):
+        return True
+    capitalised = sum(1 for w in words if w[:1].isupper() or not w[:1].isalpha())
+    return capitalised / len(words) >= 0.6
+
+
+def iter_blocks(page_index: int, text: str) -> Iterator[_Block]:
+    """Split one page into paragraph-like blocks with character offsets.
+
+    pdfplumber rarely emits blank lines between paragraphs, so a paragraph also
+    ends at a line that finishes a sentence and stops well short of the page's
+    typical line width; headings and bullets always start a new block.
+    """
+    lines = []
+    pos = 0
+    for raw in text.split("\n"):
+        lines.append((pos, pos + len(raw), raw))
+        pos += len(raw) + 1
+    widths = sorted(len(l[2].strip()) for l in lines if l[2].strip())
+    typical = widths[int(len(widths) * 0.8)] if widths else 0
+
+    cur: list[tuple[int, int, str]] = []
+
+    def flush(heading: bool = False):
+        if cur:
+            start, end = cur[0][0], cur[-1][1]
+            chunk = text[start:end]
+            # trim surrounding whitespace but keep offsets exact
+            lead = len(chunk) - len(chunk.lstrip())
+            start, end = start + lead, start + len(chunk.rstrip())
+            if end > start:
+                body = text[start:end]
+                yield _Block(page_index, start, end, body, heading, count_tokens(body))
+            cur.clear()
+
+    for start, end, line in lines:
+        s = line.strip()
+        if not s:
+            yield from flush()
+            continue
+        if _is_heading(s):
+            yield from flush()
+            cur.append((start, end, line))
+            yield from flush(heading=True)
+            continue
+        if _BULLET.match(line):
+            yield from flush()
+        cur.append((start, end, line))
+        if s.endswith(_TERMINAL) and len(s) < 0.8 * typical:
+            yield from flush()
+    yield from flush()
+
+
+def _split_block(block: _Block, max_tokens: int) -> Iterator[_Block]:
+    """Break an over-budget block at sentence boundaries (then word boundaries)."""
+    sentences = []
+    pos = 0
+    for m in _SENTENCE_END.finditer(block.text):
+        sentences.append((pos, m.start()))
+        pos = m.end()
+    sentences.append((pos, len(block.text)))
+
+    units = []  # (start, end, tokens) relative to block.text
+    for s, e in sentences:
+        n = count_tokens(block.text[s:e])
+        if n <= max_tokens:
+            units.append((s, e, n))
+            continue
+        # a single huge "sentence" (tables, lists without punctuation): split on whitespace
+        ws, running = s, 0
+        for m in re.finditer(r"\S+", block.text[s:e]):
+            t = count_tokens(m.group())
+            if running and running + t > max_tokens:
+                units.append((ws, s + m.start(), running))
+                ws, running = s + m.start(), 0
+            running += t
+        units.append((ws, e, running))
+
+    def make(start: int, end: int) -> _Block:
+        raw = block.text[start:end]
+        lead = len(raw) - len(raw.lstrip())
+        body = raw.strip()
+        return _Block(block.page, block.start + start + lead, block.start + start + lead + len(body),
+                      body, False, count_tokens(body))
+
+    cur_s = cur_e = None
+    cur_n = 0
+    for s, e, n in units:
+        if cur_s is not None and cur_n + n > max_tokens:
+            yield make(cur_s, cur_e)
+            cur_s = None
+        if cur_s is None:
+            cur_s, cur_n = s, 0
+        cur_e = e
+        cur_n += n
+    if cur_s is not None:
+        yield make(cur_s, cur_e)
+
+
+def _remainder(block: _Block, at: int) -> _Block | None:
+    """The part of `block` after page offset `at`, or None when only whitespace is left."""
+    raw = block.text[at - block.start:]
+    lead = len(raw) - len(raw.lstrip())
+    body = raw.strip()
+    if not body:
+        return None
+    return _Block(block.page, at + lead, at + lead + len(body), body, False, count_tokens(body))
+
+
+def iter_structured_chunks(
+    pages: Iterable[tuple[int, str]],
+    max_tokens: int = 1000,
+    overlap_tokens: int = 0,
+) -> Iterator[Chunk]:
+    """Pack page blocks into chunks of at most `max_tokens` tokens.
+
+    `pages` yields (page_index, text), e.g. from pdf_pages.iter_pages. Chunks
+    break at block boundaries, a heading is never left dangling at the end of
+    a chunk, and `overlap_tokens` (default 0) repeats trailing blocks of the
+    previous chunk when some context carry-over is wanted.
+    """
+    buf: list[_Block] = []
+    buf_tokens = 0
+
+    def emit(blocks: list[_Block]) -> Chunk:
+        text = "\n".join(b.text for b in blocks)
+        return Chunk(text, blocks[0].page, blocks[-1].page, blocks[0].start, blocks[-1].end, count_tokens(text))
+
+    def size(blocks: list[_Block]) -> int:
+        return sum(b.n_tokens for b in blocks) + sep * max(len(blocks) - 1, 0)
+
+    sep = count_tokens("\n")  # tokens added per joined block (0 with the approximation)
+    for page_index, text in pages:
+        for block in iter_blocks(page_index, text):
+            parts = [block] if block.n_tokens <= max_tokens else list(_split_block(block, max_tokens))
+            while parts:
+                b = parts.pop(0)
+                if buf and buf_tokens + sep + b.n_tokens > max_tokens:
+                    # keep a trailing heading with the content that follows it
+                    carry = [buf.pop()] if buf[-1].heading and len(buf) > 1 else []
+                    yield emit(buf)
+                    tail = []
+                    if overlap_tokens:
+                        for prev in reversed(buf):
+                            if size(tail) + prev.n_tokens > overlap_tokens:
+                                break
+                            tail.insert(0, prev)
+                    # what is carried over must leave room for b: drop overlap
+                    # first, then split b so its first part fits under the heading
+                    while tail and size(tail + carry + [b]) > max_tokens:
+                        tail.pop(0)
+                    buf = tail + carry
+                    buf_tokens = size(buf)
+                    if buf and buf_tokens + sep + b.n_tokens > max_tokens:
+                        room = max_tokens - buf_tokens - sep
+                        head = next(_split_block(b, room), None) if room > 0 else None
+                        if head is None or head.n_tokens > room:
+                            yield emit(buf)  # not even a sentence or word fits: the heading stands alone
+                            buf = []
+                        else:
+                            rest = _remainder(b, head.end)
+                            if rest is not None:
+                                parts[:0] = [rest] if rest.n_tokens <= max_tokens else list(_split_block(rest, max_tokens))
+                            b = head
+                buf.append(b)
+                buf_tokens = size(buf)
+    if buf:
+        yield emit(buf)
@@ -1,11 +1,9 @@
-import json
-from dotenv import load_dotenv
-from openai import OpenAI
+from .clients import lazy_client
+from .llm_json import call_json, enum_of, nullable_string, object_schema
+from .packing import build_packed_prompt, parse_packed_output, plan_packs
 
-# Load API key from .env
-load_dotenv()
-
-client = OpenAI()
+# shared client, built (and .env read) on first call
+client = lazy_client()
 
 TAXONOMY = [
     "subsidy",
@@ -19,8 +17,7 @@ TAXONOMY = [
     "other"
 ]
 
-def classify_policy_text(text: str) -> dict:
-    prompt = f"""
+CLASSIFY_INSTRUCTIONS = f"""
 You are classifying industrial policy instruments.
 
 Classify the policy text into exactly ONE instrument_type from:
@@ -32,23 +29,58 @@ Return ONLY valid JSON with keys:
 - evidence_span (short quote from text, <= 20 words)
 
 If unclear, use instrument_type="other" and confidence<=0.4.
+"""
+
+CLASSIFY_SCHEMA = object_schema({
+    "instrument_type": enum_of(TAXONOMY),
+    "confidence": {"type": "number"},
+    "evidence_span": nullable_string(),
+})
 
+def classify_policy_text(text: str) -> dict:
+    prompt = CLASSIFY_INSTRUCTIONS + f"""
 TEXT:
 {text}
 """
 
-    response = client.responses.create(
+    result = call_json(
+        client,
+        schema=CLASSIFY_SCHEMA,
+        schema_name="classification",
         model="gpt-4.1-mini",
         input=prompt,
     )
 
-    try:
-        return json.loads(response.output_text)
-    except json.JSONDecodeError:
+    if "error" in result:
         # Fallback in case model returns malformed JSON
         return {
             "instrument_type": "other",
             "confidence": 0.0,
             "evidence_span": "",
             "error": "Invalid JSON response"
-        }
\ No newline at end of file
+        }
+    return result
+
+def classify_policy_texts(texts: list[str], token_budget: int = 6000, max_items: int = 25) -> list[dict]:
+    """Classify many short texts, several per request.
+
+    Texts are packed under `token_budget`; any text whose id is missing from
+    the returned JSON array, or whose answer breaks CLASSIFY_SCHEMA, is
+    re-classified on its own.
+    """
+    results: list[dict | None] = [None] * len(texts)
+    for pack in plan_packs(texts, CLASSIFY_INSTRUCTIONS, token_budget, max_items=max_items):
+        if len(pack) == 1:
+            results[pack[0]] = classify_policy_text(texts[pack[0]])
+            continue
+
+        response = client.responses.create(
+            model="gpt-4.1-mini",
+            input=build_packed_prompt(CLASSIFY_INSTRUCTIONS, texts, pack),
+        )
+        got, missing = parse_packed_output(response.output_text, pack, schema=CLASSIFY_SCHEMA)
+        for i, out in got.items():
+            results[i] = out
+        for i in missing:
+            results[i] = classify_policy_text(texts[i])
+    return results
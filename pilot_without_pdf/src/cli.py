@@ -0,0 +1,153 @@
+import sys
+import json
+import argparse
+import importlib
+from pathlib import Path
+
+# Single entry point for the pipelines, run from the repository root:
+#
+#   python -m pilot_without_pdf analyze                  run_pdf_analysis.py
+#   python -m pilot_without_pdf extract naive [--fresh]  run_pdf_extract_naive.py
+#   python -m pilot_without_pdf extract after_analysis   run_pdf_extract_after_analysis.py
+#   python -m pilot_without_pdf corpus MANIFEST [...]    run_corpus.py
+#   python -m pilot_without_pdf classify "text" ...      classify_policy_text(s)
+#   python -m pilot_without_pdf batch [--mode packed]    batch_pipeline.run_batch
+#
+# Only argparse is imported up front. Each subcommand imports just the module it
+# runs, and the OpenAI SDK, pandas, pdfplumber and the taxonomy plan are loaded
+# on first use inside it (src/clients.py, lazy imports), so `--help` and
+# single-stage commands do not pay for the others. Arguments after the script
+# subcommands (and after the prompt for `extract`, which is required) are passed
+# through to the script's own parser.
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PDF_SCRIPTS_DIR = REPO_ROOT / "pilot_with_pdf"
+
+EXTRACT_SCRIPTS = {
+    "naive": "run_pdf_extract_naive",
+    "after_analysis": "run_pdf_extract_after_analysis",
+}
+
+
+def _run_script(module: str, argv: list[str]) -> None:
+    """Import a pilot_with_pdf script and call its main() with `argv` as its command line."""
+    if str(PDF_SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(PDF_SCRIPTS_DIR))
+    script = importlib.import_module(module)
+    saved = sys.argv
+    sys.argv = [str(PDF_SCRIPTS_DIR / f"{module}.py"), *argv]
+    try:
+        script.main()
+    finally:
+        sys.argv = saved
+
+
+def _read_texts(args) -> list[str]:
+    texts = list(args.texts)
+    if args.file is not None:
+        with args.file.open(encoding="utf-8") as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    return texts
+
+
+def cmd_analyze(args) -> None:
+    _run_script("run_pdf_analysis", args.script_args)
+
+
+def cmd_extract(args) -> None:
+    _run_script(EXTRACT_SCRIPTS[args.prompt], args.script_args)
+
+
+def cmd_corpus(args) -> None:
+    _run_script("run_corpus", args.script_args)
+
+
+def cmd_classify(args) -> None:
+    from .classify import classify_policy_text, classify_policy_texts
+
+    texts = _read_texts(args)
+    if not texts:
+        sys.exit("classify: pass texts as arguments or --file (one per line)")
+    results = [classify_policy_text(t) for t in texts] if args.single else classify_policy_texts(texts)
+    for i, (text, out) in enumerate(zip(texts, results)):
+        print(json.dumps({"id": i, "text": text, **out}, ensure_ascii=False))
+
+
+def cmd_batch(args) -> None:
+    from .batch_pipeline import run_batch
+
+    texts = _read_texts(args)
+    if not texts:
+        from .batch_config import SNIPPETS
+
+        texts = SNIPPETS
+    cascade = None
+    if args.cascade:
+        from .cascade import ModelCascade
+        from .batch_config import CHEAP_MODEL, ESCALATE_BELOW, MODEL
+
+        cascade = ModelCascade([CHEAP_MODEL, MODEL], threshold=ESCALATE_BELOW)
+    df = run_batch(texts, mode=args.mode, batch_id=args.batch_id, concurrency=args.concurrency, cascade=cascade)
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(args.out, index=False)
+        print(f"Saved {args.out}")
+    else:
+        print(df.to_string())
+    if cascade is not None:
+        print("Cascade:", json.dumps(cascade.report()))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m pilot_without_pdf", description="Policy instrument extraction pipelines")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="document typology + taxonomy proposal (run_pdf_analysis.py)")
+    p.add_argument("script_args", nargs="*")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("extract", help="chunked PDF extraction (run_pdf_extract_*.py)")
+    # required: an optional positional before REMAINDER would swallow `extract --fresh`
+    p.add_argument("prompt", choices=sorted(EXTRACT_SCRIPTS))
+    p.add_argument("script_args", nargs="*", help="e.g. --fresh, --retry-errors")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("corpus", help="extraction over a manifest of PDFs (run_corpus.py)")
+    p.add_argument("script_args", nargs="*", help="manifest path and run_corpus.py options")
+    p.set_defaults(func=cmd_corpus)
+
+    p = sub.add_parser("classify", help="instrument type for short texts")
+    p.add_argument("texts", nargs="*")
+    p.add_argument("--file", type=Path, default=None, help="one text per line")
+    p.add_argument("--single", action="store_true", help="one request per text instead of packed requests")
+    p.set_defaults(func=cmd_classify)
+
+    p = sub.add_parser("batch", help="few-shot field extraction for short texts (batch_pipeline.run_batch)")
+    p.add_argument("texts", nargs="*", help="default: the snippets in batch_config.py")
+    p.add_argument("--file", type=Path, default=None, help="one text per line")
+    p.add_argument("--mode", choices=["async", "packed", "batch"], default="async")
+    p.add_argument("--batch-id", default=None, help="resume a previously submitted batch")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--cascade", action="store_true", help="async mode: cheap model first, escalate uncertain answers")
+    p.add_argument("--out", type=Path, default=None, help="CSV path (default: print the table)")
+    p.set_defaults(func=cmd_batch)
+    return parser
+
+
+# words the CLI itself reads before a script subcommand's pass-through arguments
+# (run_pdf_analysis.py takes no options, so `analyze --help` stays with argparse)
+SCRIPT_HEADS = {"corpus": 1, "extract": 2}
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    parser = build_parser()
+    head = SCRIPT_HEADS.get(argv[0]) if argv else None
+    if head is not None and not {"-h", "--help"} & set(argv[1:head]):
+        # argparse would read the script's flags as its own (or reject them), so
+        # everything after the head goes to the script as is
+        args = parser.parse_args(argv[:head])
+        args.script_args = argv[head:]
+    else:
+        args = parser.parse_args(argv)
+    args.func(args)
@@ -0,0 +1,72 @@
+import threading
+
+from .llm_cache import cached_client
+from .rate_limit import AdaptiveLimiter, rate_limited_client
+from .instrumentation import instrumented_client
+
+# One OpenAI() and one AsyncOpenAI() per process, built on first use.
+#
+# Modules and scripts used to run load_dotenv() and construct their own
+# clients at import time, which paid for `import openai` (and an .env read)
+# even when the command never made a call. Now they hold LazyClient proxies:
+#
+#   client = lazy_client(rpm=RPM_LIMIT, tpm=TPM_LIMIT)
+#   aclient = lazy_client(async_=True)
+#
+# The first attribute access builds the shared client (same layering
+# everywhere: instrumented -> cached -> rate-limited -> OpenAI) and every
+# module then talks through it, so the rpm/tpm budget, the response cache and
+# the run report are shared too. The proxies are plain module globals, so
+# benchmarks can still swap `module.client` for a fake.
+
+LIMITER = AdaptiveLimiter()
+_clients: dict[bool, object] = {}
+_lock = threading.Lock()
+
+
+def build_client(raw, limiter: AdaptiveLimiter | None = None, cache: bool = True):
+    """The standard wrapper stack around any OpenAI-compatible client (real or fake)."""
+    client = rate_limited_client(raw, limiter=limiter or LIMITER)
+    if cache:
+        client = cached_client(client)
+    return instrumented_client(client)
+
+
+def seed_limits(rpm: int | None = None, tpm: int | None = None) -> None:
+    """Seed the shared RPM/TPM buckets until the API's x-ratelimit headers report the real limits."""
+    for bucket, limit in ((LIMITER.requests, rpm), (LIMITER.tokens, tpm)):
+        if limit and not bucket.capacity:
+            bucket.sync(limit, None)
+
+
+def shared_client(async_: bool = False):
+    with _lock:
+        if async_ not in _clients:
+            # the SDK import and the .env read happen here, not when a module is imported
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            if async_:
+                from openai import AsyncOpenAI as OpenAI
+            else:
+                from openai import OpenAI
+            _clients[async_] = build_client(OpenAI())
+        return _clients[async_]
+
+
+class LazyClient:
+    """Stands in for shared_client(async_) and builds it on first attribute access."""
+
+    def __init__(self, async_: bool = False):
+        self._async = async_
+
+    def __getattr__(self, name):
+        return getattr(shared_client(self._async), name)
+
+    def __repr__(self) -> str:
+        return f"LazyClient(async_={self._async}, built={self._async in _clients})"
+
+
+def lazy_client(async_: bool = False, rpm: int | None = None, tpm: int | None = None) -> LazyClient:
+    seed_limits(rpm, tpm)
+    return LazyClient(async_)
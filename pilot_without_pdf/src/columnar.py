@@ -0,0 +1,197 @@
+import re
+import json
+import uuid
+from pathlib import Path
+from datetime import date
+from typing import Any, Iterable, Iterator
+
+from .llm_json import LIST_FIELDS, LIST_SUFFIXES
+from .streaming import iter_jsonl
+
+# Typed Parquet output for extracted rows (needs pyarrow).
+#
+# Rows land in a hive-partitioned dataset:
+#   <root>/doc_id=<doc>/run_date=<YYYY-MM-DD>/part-<run key>.parquet
+# Each run adds (or, when the same run is finished again, replaces) one part
+# file, so appends never rewrite what is already there. Column types come
+# from the column name, not from whatever the first row happened to hold:
+#   list fields (eligibility_rules, evidence_spans, ...)  list<string>
+#   instrument_type / category / enforceability            dictionary<int32, string>
+#   chunk and page/char offsets, dedup_of                  int64
+#   confidence / keyword_score / dedup_similarity          float64
+#   prefiltered / reextract                                bool
+#   everything else                                        string (dicts/lists as JSON)
+# read_dataset() loads the whole dataset (or a column subset / filter) with
+# the part schemas unified, so runs with different prompts can share a root.
+
+CATEGORICAL_FIELDS = {"instrument_type", "category", "enforceability", "doc_type", "evidence_status"}
+INT_FIELDS = {"chunk_id", "id", "page_start", "page_end", "char_start", "char_end", "n_tokens", "dedup_of"}
+FLOAT_FIELDS = {"confidence", "keyword_score", "dedup_similarity", "evidence_score"}
+BOOL_FIELDS = {"prefiltered", "reextract"}
+PARTITION_FIELDS = ("doc_id", "run_date")
+BATCH_ROWS = 50_000
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def _is_list_field(name: str) -> bool:
+    return name in LIST_FIELDS or name.endswith(LIST_SUFFIXES)
+
+
+def arrow_type(name: str):
+    pa, _ = _pyarrow()
+    if _is_list_field(name):
+        return pa.list_(pa.string())
+    if name in CATEGORICAL_FIELDS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if name in INT_FIELDS:
+        return pa.int64()
+    if name in FLOAT_FIELDS:
+        return pa.float64()
+    if name in BOOL_FIELDS:
+        return pa.bool_()
+    return pa.string()
+
+
+def _text(v: Any) -> str | None:
+    if v is None:
+        return None
+    if isinstance(v, str):
+        return v
+    return json.dumps(v, ensure_ascii=False, default=str)
+
+
+def _convert(v: Any, kind: str) -> Any:
+    if v is None or v == "":
+        return [] if kind == "list" else None
+    try:
+        if kind == "list":
+            items = v if isinstance(v, list) else [v]
+            return [t for t in (_text(x) for x in items) if t is not None]
+        if kind == "int":
+            return int(v)
+        if kind == "float":
+            return float(v)
+        if kind == "bool":
+            return v if isinstance(v, bool) else str(v).strip().lower() in ("true", "1", "yes")
+    except (TypeError, ValueError):
+        return None
+    return _text(v)
+
+
+def _kind(t) -> str:
+    pa, _ = _pyarrow()
+    if pa.types.is_list(t):
+        return "list"
+    if pa.types.is_integer(t):
+        return "int"
+    if pa.types.is_floating(t):
+        return "float"
+    if pa.types.is_boolean(t):
+        return "bool"
+    return "str"
+
+
+def schema_for_rows(rows: Iterable[dict]):
+    """Arrow schema for the union of columns in `rows` (first-seen order, partition keys excluded)."""
+    pa, _ = _pyarrow()
+    # by name only: part files written from different data must agree on every column
+    columns = dict.fromkeys(k for row in rows for k in row if k not in PARTITION_FIELDS)
+    return pa.schema([pa.field(name, arrow_type(name)) for name in columns])
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    batch: list[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _safe(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(value)).strip("_") or "unknown"
+
+
+def partition_dir(root: Path, doc_id: str, run_date: str | None = None) -> Path:
+    return Path(root) / f"doc_id={_safe(doc_id)}" / f"run_date={run_date or date.today().isoformat()}"
+
+
+def write_rows(
+    rows: Iterable[dict] | Path,
+    root: Path,
+    doc_id: str,
+    run_date: str | None = None,
+    part: str | None = None,
+    batch_rows: int = BATCH_ROWS,
+) -> Path:
+    """Write rows (or a JSONL path, streamed twice) as one part file of the dataset at `root`.
+
+    `part` names the file (e.g. the run key); writing the same part again replaces it.
+    Without one the file gets a random name, so every call adds rows.
+    """
+    pa, pq = _pyarrow()
+    if isinstance(rows, (str, Path)):
+        jsonl = Path(rows)
+        schema = schema_for_rows(iter_jsonl(jsonl))
+        source = lambda: iter_jsonl(jsonl)
+    else:
+        rows = list(rows)
+        schema = schema_for_rows(rows)
+        source = lambda: iter(rows)
+
+    out_dir = partition_dir(root, doc_id, run_date)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"part-{_safe(part or uuid.uuid4().hex)}.parquet"
+    tmp = path.with_suffix(".parquet.tmp")
+    kinds = {f.name: _kind(f.type) for f in schema}
+
+    with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+        for batch in _batches(source(), batch_rows):
+            columns = {name: [_convert(row.get(name), kind) for row in batch] for name, kind in kinds.items()}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    tmp.replace(path)
+    return path
+
+
+def jsonl_to_parquet(jsonl_path: Path, root: Path, doc_id: str, run_date: str | None = None, part: str | None = None) -> Path:
+    return write_rows(Path(jsonl_path), root, doc_id, run_date, part)
+
+
+def dataframe_to_parquet(df, root: Path, doc_id: str, run_date: str | None = None, part: str | None = None) -> Path:
+    """Parquet twin of df.to_csv(...) for the pandas runners; NaN cells become nulls."""
+    records = [{k: (None if _is_nan(v) else v) for k, v in rec.items()} for rec in df.to_dict(orient="records")]
+    return write_rows(records, root, doc_id, run_date, part)
+
+
+def _is_nan(v: Any) -> bool:
+    return isinstance(v, float) and v != v
+
+
+def read_dataset(root: Path, columns: list[str] | None = None, filter=None):
+    """Whole dataset as a pyarrow Table; only `columns` are read from disk.
+
+    `filter` is a pyarrow.dataset expression, e.g. ds.field("doc_id") == "hk_blueprint_1a2b3c4d".
+    """
+    pa, pq = _pyarrow()
+    import pyarrow.dataset as ds
+
+    files = sorted(Path(root).rglob("*.parquet"))
+    if not files:
+        raise FileNotFoundError(f"No parquet files under {root}")
+    schema = pa.unify_schemas(
+        [pq.read_schema(f) for f in files] + [pa.schema([pa.field(k, pa.string()) for k in PARTITION_FIELDS])]
+    )
+    partitioning = ds.partitioning(pa.schema([pa.field(k, pa.string()) for k in PARTITION_FIELDS]), flavor="hive")
+    dataset = ds.dataset([str(f) for f in files], schema=schema, format="parquet",
+                         partitioning=partitioning, partition_base_dir=str(root))
+    return dataset.to_table(columns=columns, filter=filter)
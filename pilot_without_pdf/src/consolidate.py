@@ -0,0 +1,366 @@
+import re
+import ast
+import csv
+import json
+import hashlib
+from pathlib import Path
+from collections import Counter, defaultdict
+from typing import Any, Iterable
+
+from .llm_json import LIST_FIELDS, LIST_SUFFIXES
+from .streaming import iter_jsonl
+
+# Post-extraction consolidation: one record per instrument instead of one row
+# per chunk. A scheme spanning two chunks comes out of extraction as two
+# partial rows (name in one, amount in the other, overlapping quotes);
+# InstrumentConsolidator merges them.
+#
+# Rows are never compared pairwise. Each row emits blocking keys into a hash
+# index, scoped by document:
+#   name    normalised instrument_name / policy_name         -> merge
+#   span    5-word shingles of the evidence spans             -> merge if the
+#           rows' shingle sets overlap >= span_overlap
+#   amount  normalised funding amount (currency, value)       -> merge if the
+#           rows are within `window` chunks of each other
+# Only rows sharing a key are looked at, and keys shared by more than
+# max_bucket rows (boilerplate quotes, "HKD 1 million") are ignored, so the
+# cost grows with the number of rows, not its square. Matches are joined with
+# union-find; two groups whose names (or, for the span/amount keys, non-"other"
+# instrument types) disagree are never joined.
+#
+# Merged fields: lists are unioned, scalars take the most common non-empty
+# value (longest on ties), confidence the maximum; provenance becomes
+# chunk_ids / page_start / page_end / n_rows.
+
+NAME_FIELDS = ("instrument_name", "policy_name")
+AMOUNT_FIELDS = ("funding_amount_or_cap", "funding_amount")
+TYPE_FIELDS = ("instrument_type", "category")
+# row-level bookkeeping that has no meaning for a merged record
+DROP_FIELDS = {
+    "chunk_id", "page_start", "page_end", "char_start", "char_end", "n_tokens",
+    "error", "raw_output", "schema_errors", "keyword_score", "prefiltered",
+    "dedup_of", "dedup_of_doc", "dedup_similarity",
+}
+EMPTY = {"", "none", "null", "nan", "n/a", "[]", "{}"}
+
+_PAREN = re.compile(r"\([^)]*\)")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_WORD = re.compile(r"[a-z0-9]+")
+_AMOUNT = re.compile(
+    r"(hk\$|us\$|hkd|usd|rmb|eur|gbp|€|£|\$)?\s*(\d[\d,]*(?:\.\d+)?)\s*"
+    r"(thousand|million|mn|billion|bn|trillion)?\b",
+    re.IGNORECASE,
+)
+_CURRENCY = {"hk$": "hkd", "us$": "usd", "$": "usd", "€": "eur", "£": "gbp"}
+_SCALE = {"thousand": 1e3, "million": 1e6, "mn": 1e6, "billion": 1e9, "bn": 1e9, "trillion": 1e12}
+
+
+# ---------- cell values ----------
+def _is_list_field(name: str) -> bool:
+    return name in LIST_FIELDS or name.endswith(LIST_SUFFIXES)
+
+
+def clean_value(v: Any) -> Any:
+    """None for empty cells; lists (also CSV-rendered "['a', 'b']") as lists of non-empty strings."""
+    if v is None or (isinstance(v, float) and v != v):
+        return None
+    if isinstance(v, str):
+        s = v.strip()
+        if s.lower() in EMPTY:
+            return None
+        if s.startswith("[") and s.endswith("]"):
+            try:
+                v = ast.literal_eval(s)
+            except (ValueError, SyntaxError):
+                return s
+        else:
+            return s
+    if isinstance(v, (list, tuple)):
+        items = [clean_value(x) for x in v]
+        items = [x if isinstance(x, str) else json.dumps(x, ensure_ascii=False) for x in items if x is not None]
+        return items or None
+    return v
+
+
+def _strings(v: Any) -> list[str]:
+    v = clean_value(v)
+    if v is None:
+        return []
+    return [str(x) for x in v] if isinstance(v, list) else [str(v)]
+
+
+def normalise_name(name: str) -> str | None:
+    s = _PAREN.sub(" ", name.lower()).replace("&", " and ")
+    words = _NON_WORD.sub(" ", s).split()
+    if words[:1] == ["the"]:
+        words = words[1:]
+    return " ".join(words) or None
+
+
+def normalise_amounts(text: str) -> set[str]:
+    """'up to HKD 10 million' -> {'hkd:10000000'}; bare numbers without currency or scale are ignored."""
+    out = set()
+    for currency, number, scale in _AMOUNT.findall(text):
+        if not currency and not scale:
+            continue
+        try:
+            value = float(number.replace(",", "")) * _SCALE.get(scale.lower(), 1.0)
+        except ValueError:
+            continue
+        currency = currency.lower()
+        out.add(f"{_CURRENCY.get(currency, currency)}:{value:g}")
+    return out
+
+
+def _shingles(spans: list[str], k: int = 5) -> set[str]:
+    out = set()
+    for span in spans:
+        words = _WORD.findall(span.lower())
+        if len(words) <= k:
+            if words:
+                out.add(" ".join(words))
+            continue
+        out.update(" ".join(words[i:i + k]) for i in range(len(words) - k + 1))
+    return out
+
+
+def _key(*parts: Any) -> str:
+    # fixed-size bucket keys, whatever the span/name length
+    return hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _float(v: Any) -> float | None:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(v: Any) -> int | None:
+    x = _float(v)
+    return int(x) if x is not None and x == x else None
+
+
+# ---------- consolidation ----------
+class InstrumentConsolidator:
+    def __init__(
+        self,
+        scope: str | None = "doc_id",
+        window: int = 2,
+        span_overlap: float = 0.5,
+        max_bucket: int = 200,
+    ):
+        self.scope = scope                # rows are only merged within the same value of this field
+        self.window = window              # max chunk distance for amount-only matches
+        self.span_overlap = span_overlap  # shared shingles / shingles of the smaller row
+        self.max_bucket = max_bucket
+        self.stats: Counter = Counter()
+
+    def is_instrument(self, row: dict) -> bool:
+        if row.get("error") or clean_value(row.get("prefiltered")) in (True, "True", "true"):
+            return False
+        if any(_strings(row.get(f)) for f in NAME_FIELDS + AMOUNT_FIELDS):
+            return True
+        kind = next((v for f in TYPE_FIELDS for v in _strings(row.get(f))), None)
+        return kind is not None and kind.lower() != "other"
+
+    def consolidate(self, rows: Iterable[dict]) -> list[dict]:
+        kept = []
+        for row in rows:
+            self.stats["rows_in"] += 1
+            if self.is_instrument(row):
+                kept.append(row)
+        rows = kept
+        self.stats["instrument_rows"] += len(rows)
+        n = len(rows)
+        parent = list(range(n))
+        names: list[set[str]] = []
+        types: list[set[str]] = []
+        chunks: list[int | None] = []
+        name_index: dict[str, list[int]] = defaultdict(list)
+        span_index: dict[str, list[int]] = defaultdict(list)
+        amount_index: dict[str, list[int]] = defaultdict(list)
+        n_shingles: list[int] = []
+
+        for i, row in enumerate(rows):
+            scope = row.get(self.scope) if self.scope else None
+            row_names = {nm for f in NAME_FIELDS for v in _strings(row.get(f)) if (nm := normalise_name(v))}
+            names.append(row_names)
+            types.append({v.lower() for f in TYPE_FIELDS for v in _strings(row.get(f)) if v.lower() != "other"})
+            chunks.append(_int(row.get("chunk_id")))
+            for nm in row_names:
+                name_index[_key(scope, nm)].append(i)
+            spans = [s for f in row if f.endswith(("_span", "_spans")) for s in _strings(row.get(f))]
+            shingles = _shingles(spans)
+            n_shingles.append(len(shingles))
+            for sh in shingles:
+                span_index[_key(scope, sh)].append(i)
+            for f in AMOUNT_FIELDS:
+                for text in _strings(row.get(f)):
+                    for amount in normalise_amounts(text):
+                        amount_index[_key(scope, amount)].append(i)
+
+        by_chunk = lambda i: (chunks[i] is None, chunks[i] or 0)
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(a: int, b: int, strict: bool) -> bool:
+            ra, rb = find(a), find(b)
+            if ra == rb:
+                return False
+            if names[ra] and names[rb] and not names[ra] & names[rb]:
+                self.stats["name_conflicts"] += 1
+                return False
+            if strict and types[ra] and types[rb] and not types[ra] & types[rb]:
+                self.stats["type_conflicts"] += 1
+                return False
+            if len(names[ra]) + len(types[ra]) < len(names[rb]) + len(types[rb]):
+                ra, rb = rb, ra
+            parent[rb] = ra
+            names[ra] |= names[rb]
+            types[ra] |= types[rb]
+            return True
+
+        # strongest evidence first, so the guards see names before the weaker keys join groups
+        for bucket in name_index.values():
+            for j in bucket[1:]:
+                self.stats["merged_by_name"] += union(bucket[0], j, strict=False)
+
+        shared: Counter = Counter()
+        for bucket in span_index.values():
+            if len(bucket) > self.max_bucket:
+                self.stats["skipped_buckets"] += 1
+                continue
+            members = sorted(set(bucket))
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    shared[members[x], members[y]] += 1
+        for (a, b), common in sorted(shared.items()):
+            if common / max(1, min(n_shingles[a], n_shingles[b])) >= self.span_overlap:
+                self.stats["merged_by_span"] += union(a, b, strict=True)
+
+        for bucket in amount_index.values():
+            if len(bucket) > self.max_bucket:
+                self.stats["skipped_buckets"] += 1
+                continue
+            members = sorted(set(bucket), key=by_chunk)
+            # sorted by chunk: only neighbours within the window are candidates
+            for x, a in enumerate(members):
+                for b in members[x + 1:]:
+                    if chunks[a] is None or chunks[b] is None or chunks[b] - chunks[a] > self.window:
+                        break
+                    self.stats["merged_by_amount"] += union(a, b, strict=True)
+
+        groups: dict[int, list[int]] = defaultdict(list)
+        for i in range(n):
+            groups[find(i)].append(i)
+        merged = [self.merge([rows[i] for i in sorted(members, key=by_chunk)]) for members in groups.values()]
+        merged.sort(key=lambda r: (str(r.get(self.scope, "")) if self.scope else "", r["chunk_ids"][:1] or [-1]))
+        for k, record in enumerate(merged):
+            record["instrument_id"] = k
+        self.stats["instruments"] += len(merged)
+        return merged
+
+    @staticmethod
+    def merge(rows: list[dict]) -> dict:
+        columns: dict[str, None] = {}
+        for row in rows:
+            columns.update(dict.fromkeys(row))
+        out: dict[str, Any] = {}
+        for col in columns:
+            if col in DROP_FIELDS:
+                continue
+            values = [clean_value(row.get(col)) for row in rows]
+            values = [v for v in values if v is not None]
+            if col == "confidence":
+                numbers = [x for x in map(_float, values) if x is not None]
+                out[col] = max(numbers) if numbers else None
+            elif _is_list_field(col) or any(isinstance(v, list) for v in values):
+                seen: dict[str, str] = {}
+                for v in values:
+                    for item in (v if isinstance(v, list) else [v]):
+                        seen.setdefault(" ".join(str(item).lower().split()), str(item))
+                out[col] = list(seen.values())
+            else:
+                if col in TYPE_FIELDS and any(str(v).lower() != "other" for v in values):
+                    values = [v for v in values if str(v).lower() != "other"]
+                counts = Counter(values)
+                out[col] = max(counts, key=lambda v: (counts[v], len(str(v)))) if counts else None
+        chunk_ids = sorted({c for c in (_int(r.get("chunk_id")) for r in rows) if c is not None})
+        pages_start = [p for p in (_int(r.get("page_start")) for r in rows) if p is not None]
+        pages_end = [p for p in (_int(r.get("page_end")) for r in rows) if p is not None]
+        out["chunk_ids"] = chunk_ids
+        if pages_start:
+            out["page_start"] = min(pages_start)
+        if pages_end:
+            out["page_end"] = max(pages_end)
+        out["n_rows"] = len(rows)
+        return out
+
+    def report(self) -> dict:
+        s = self.stats
+        return {
+            "rows": s["rows_in"],
+            "instrument_rows": s["instrument_rows"],
+            "instruments": s["instruments"],
+            "merged_by_name": s["merged_by_name"],
+            "merged_by_span": s["merged_by_span"],
+            "merged_by_amount": s["merged_by_amount"],
+            "conflicts_kept_apart": s["name_conflicts"] + s["type_conflicts"],
+            "skipped_buckets": s["skipped_buckets"],
+        }
+
+
+def consolidate_dataframe(df, **kwargs):
+    """DataFrame twin of InstrumentConsolidator().consolidate(rows)."""
+    import pandas as pd
+
+    records = df.to_dict(orient="records")
+    return pd.DataFrame(InstrumentConsolidator(**kwargs).consolidate(records))
+
+
+# ---------- inputs ----------
+def _doc_id_for(path: Path) -> str:
+    # corpus runs write <out_dir>/<doc_id>/extraction.jsonl
+    return path.parent.name if path.stem == "extraction" else path.stem
+
+
+def load_rows(path: Path) -> Iterable[dict]:
+    """Rows of an extraction CSV/JSONL file or Parquet dataset directory, each with a doc_id."""
+    path = Path(path)
+    if path.is_dir():
+        from .columnar import read_dataset
+
+        yield from read_dataset(path).to_pylist()
+        return
+    doc_id = _doc_id_for(path)
+    if path.suffix == ".jsonl":
+        for row in iter_jsonl(path):
+            row.setdefault("doc_id", doc_id)
+            yield row
+        return
+    with path.open(encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            row.setdefault("doc_id", doc_id)
+            yield row
+
+
+def consolidate_files(paths: Iterable[Path], out_csv: Path, **kwargs) -> dict:
+    """Consolidate extraction outputs (CSV/JSONL files, Parquet dirs) into one instruments CSV; returns the report."""
+    consolidator = InstrumentConsolidator(**kwargs)
+    records = consolidator.consolidate(row for path in paths for row in load_rows(path))
+    columns: dict[str, None] = {"instrument_id": None}
+    for record in records:
+        columns.update(dict.fromkeys(record))
+    out_csv = Path(out_csv)
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    with out_csv.open("w", encoding="utf-8", newline="") as f:
+        # same rendering as the extraction CSVs: None -> empty cell, lists -> Python repr
+        writer = csv.DictWriter(f, fieldnames=list(columns))
+        writer.writeheader()
+        writer.writerows({k: "" if v is None else v for k, v in r.items()} for r in records)
+    return consolidator.report()
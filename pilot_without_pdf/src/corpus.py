@@ -0,0 +1,294 @@
+import re
+import csv
+import json
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import unquote
+from dataclasses import dataclass, field, asdict
+from typing import Any, Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from .downloader import Downloader
+from .llm_engine import RateLimiter
+from .pdf_pages import iter_pages, pdf_page_count
+from .pdf_pipeline import extract_pdf_async
+from .prefilter import KeywordPrefilter
+from .dedup import ChunkDeduper
+from .cascade import ModelCascade
+from .evidence import EvidenceVerifier
+from .incremental import PlanTracker
+from .instrumentation import RECORDER
+
+# Multi-document corpus runner.
+#
+# A manifest lists PDFs (URLs or local paths). Each document moves through
+# three stages, each with its own pool:
+#   download  - thread pool over one pooled, conditional, resumable Downloader
+#   parse     - thread pool, each job fanning pages out to a process pool via
+#               iter_pages(); this fills the page-text cache
+#   extract   - chunking + LLM calls for up to `extract_workers` documents at
+#               once on one event loop, sharing a single rpm/tpm budget
+# Chunking is streamed inside the extract stage (from cached pages) so no
+# document is ever fully materialised as chunks. Output is one directory per
+# document plus corpus_report.json with throughput figures and run_report.json
+# with stage latency percentiles and token/cost per document. All documents'
+# rows also go to one Parquet dataset, <out_dir>/parquet (src/columnar.py).
+
+@dataclass
+class CorpusDoc:
+    source: str  # URL or local path
+    doc_id: str = ""
+    skip_first: int = 8
+    max_pages: int | None = 15
+    # filled in as the document moves through the stages
+    path: str | None = None
+    download: str | None = None  # downloaded | resumed | not_modified | offline | local
+    pages: int = 0
+    chunks: int = 0
+    failed_chunks: int = 0
+    status: str = "pending"
+    error: str | None = None
+    seconds: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.doc_id:
+            self.doc_id = make_doc_id(self.source)
+
+    @property
+    def is_url(self) -> bool:
+        return self.source.startswith(("http://", "https://"))
+
+
+def make_doc_id(source: str) -> str:
+    """Readable, filesystem-safe id: file stem plus a short hash of the full source."""
+    stem = Path(unquote(source.split("?")[0])).stem or "doc"
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", stem).strip("_").lower()[:40] or "doc"
+    return f"{slug}_{hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _blank(value) -> bool:
+    return value is None or str(value).strip() == ""
+
+
+def load_manifest(path: Path) -> list[CorpusDoc]:
+    """Read a manifest: .csv (column `source`, optional doc_id/skip_first/max_pages; blank = default),
+    .jsonl (same keys) or plain text with one URL/path per line (# comments allowed).
+    """
+    path = Path(path)
+    if path.suffix == ".csv":
+        with path.open("r", encoding="utf-8", newline="") as f:
+            records = list(csv.DictReader(f))
+    elif path.suffix == ".jsonl":
+        with path.open("r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            records = [{"source": line.strip()} for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    docs: list[CorpusDoc] = []
+    seen: set[str] = set()
+    for rec in records:
+        source = (rec.get("source") or rec.get("url") or rec.get("path") or "").strip()
+        if not source:
+            continue
+        doc = CorpusDoc(source=source, doc_id=(rec.get("doc_id") or "").strip())
+        if not _blank(rec.get("skip_first")):
+            doc.skip_first = int(rec["skip_first"])
+        if not _blank(rec.get("max_pages")):
+            # "all" processes every page after skip_first
+            doc.max_pages = None if str(rec["max_pages"]).strip().lower() == "all" else int(rec["max_pages"])
+        if doc.doc_id in seen:
+            raise ValueError(f"Duplicate doc_id in manifest: {doc.doc_id}")
+        seen.add(doc.doc_id)
+        docs.append(doc)
+    return docs
+
+
+class CorpusRunner:
+    def __init__(
+        self,
+        call: Callable[[str], Awaitable[Any]],
+        prompt_hash: str,
+        out_dir: Path,
+        pdf_dir: Path,
+        download_workers: int = 4,
+        parse_workers: int = 2,
+        page_workers: int | None = None,
+        extract_workers: int = 2,
+        concurrency: int = 8,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        tokens_for: Callable[[str], int] | None = None,
+        prefilter_threshold: float | None = None,
+        dedup_threshold: float | None = None,
+        cascade: ModelCascade | None = None,
+        plan: PlanTracker | None = None,
+        evidence_min_score: float | None = None,
+        skipped_row: dict | None = None,
+        retry_errors: bool = False,
+        fresh: bool = False,
+        parquet: bool = True,
+        **chunk_kwargs,
+    ):
+        self.call = call
+        self.prompt_hash = prompt_hash
+        self.out_dir = Path(out_dir)
+        self.pdf_dir = Path(pdf_dir)
+        self.downloader = Downloader(self.pdf_dir, pool_size=max(1, download_workers))
+        self.download_workers = download_workers
+        self.parse_workers = parse_workers
+        self.page_workers = page_workers
+        self.extract_workers = extract_workers
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.tokens_for = tokens_for
+        self.prefilter_threshold = prefilter_threshold
+        self.dedup_threshold = dedup_threshold
+        self.dedup: ChunkDeduper | None = None
+        self.cascade = cascade  # already wrapped into `call`; kept for the report
+        self.plan = plan
+        self.verifier = EvidenceVerifier(evidence_min_score) if evidence_min_score is not None else None
+        self.skipped_row = skipped_row
+        self.retry_errors = retry_errors
+        self.fresh = fresh
+        self.parquet_dir = self.out_dir / "parquet" if parquet else None
+        self.chunk_kwargs = chunk_kwargs  # chunker, max_tokens, overlap_tokens, max_chars, overlap
+
+    def doc_dir(self, doc: CorpusDoc) -> Path:
+        return self.out_dir / doc.doc_id
+
+    # ---------- stages (blocking; run inside the stage pools) ----------
+    def _download(self, doc: CorpusDoc) -> None:
+        if not doc.is_url:
+            path = Path(doc.source)
+            if not path.exists():
+                raise FileNotFoundError(path)
+            doc.path, doc.download = str(path), "local"
+        else:
+            result = self.downloader.fetch(doc.source)
+            doc.path, doc.download = str(result.path), result.status
+
+    def _parse(self, doc: CorpusDoc) -> None:
+        total = pdf_page_count(Path(doc.path))
+        end = total if doc.max_pages is None else min(doc.skip_first + doc.max_pages, total)
+        start = min(doc.skip_first, end)
+        # drain the page stream: pages land in the page cache for the extract stage
+        pages = iter_pages(Path(doc.path), start, end, workers=self.page_workers)
+        doc.pages = sum(1 for _ in RECORDER.timed_iter("pdf_pages", pages))
+
+    async def _extract(self, doc: CorpusDoc, limiter: RateLimiter) -> None:
+        prefilter = KeywordPrefilter(self.prefilter_threshold) if self.prefilter_threshold is not None else None
+        manifest = await extract_pdf_async(
+            Path(doc.path),
+            self.doc_dir(doc) / "extraction.csv",
+            self.call,
+            self.prompt_hash,
+            skip_first=doc.skip_first,
+            max_pages=doc.max_pages if doc.max_pages is not None else 10**9,
+            retry_errors=self.retry_errors,
+            fresh=self.fresh,
+            tokens_for=self.tokens_for,
+            prefilter=prefilter,
+            skipped_row=self.skipped_row,
+            dedup=self.dedup,
+            plan=self.plan,
+            verifier=self.verifier,
+            parquet_dir=self.parquet_dir,
+            doc_id=doc.doc_id,
+            verbose=False,
+            concurrency=self.concurrency,
+            limiter=limiter,
+            **self.chunk_kwargs,
+        )
+        summary = manifest.summary()
+        doc.chunks = summary["completed"] + summary["failed"]
+        doc.failed_chunks = summary["failed"]
+
+    # ---------- scheduling ----------
+    async def _run(self, docs: list[CorpusDoc]) -> None:
+        loop = asyncio.get_running_loop()
+        limiter = RateLimiter(self.rpm, self.tpm)
+        extract_slots = asyncio.Semaphore(max(1, self.extract_workers))
+        # one index for the whole corpus: boilerplate repeats across documents too
+        self.dedup = ChunkDeduper(self.dedup_threshold) if self.dedup_threshold is not None else None
+        done = 0
+
+        async def timed(doc: CorpusDoc, stage: str, awaitable) -> None:
+            doc.status = stage
+            t0 = time.perf_counter()
+            try:
+                await awaitable
+            finally:
+                doc.seconds[stage] = round(time.perf_counter() - t0, 3)
+
+        with ThreadPoolExecutor(self.download_workers, thread_name_prefix="download") as download_pool, \
+                ThreadPoolExecutor(self.parse_workers, thread_name_prefix="parse") as parse_pool:
+
+            async def process(doc: CorpusDoc) -> None:
+                nonlocal done
+                # LLM usage and cost recorded inside this task are attributed to the document
+                RECORDER.set_document(doc.doc_id)
+                try:
+                    await timed(doc, "download", loop.run_in_executor(download_pool, self._download, doc))
+                    await timed(doc, "parse", loop.run_in_executor(parse_pool, self._parse, doc))
+                    async with extract_slots:
+                        await timed(doc, "extract", self._extract(doc, limiter))
+                    doc.status = "done"
+                except Exception as e:
+                    doc.error = f"{doc.status}: {type(e).__name__}: {e}"
+                    doc.status = "failed"
+                done += 1
+                print(f"[{done}/{len(docs)}] {doc.doc_id}: {doc.status} "
+                      f"({doc.pages} pages, {doc.chunks} chunks){' - ' + doc.error if doc.error else ''}")
+
+            await asyncio.gather(*(process(doc) for doc in docs))
+
+    def run(self, docs: list[CorpusDoc]) -> dict:
+        started = datetime.now()
+        t0 = time.perf_counter()
+        asyncio.run(self._run(docs))
+        report = throughput_report(docs, time.perf_counter() - t0)
+        report["started_at"] = started.isoformat(timespec="seconds")
+        if self.dedup is not None:
+            report["dedup"] = self.dedup.report()
+        if self.cascade is not None:
+            report["cascade"] = self.cascade.report()
+        if self.verifier is not None:
+            report["evidence"] = self.verifier.report()
+        self.downloader.close()
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        (self.out_dir / "corpus_report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+        RECORDER.write_report(self.out_dir / "run_report.json", prompt_hash=self.prompt_hash)
+        return report
+
+
+def throughput_report(docs: list[CorpusDoc], wall_seconds: float) -> dict:
+    finished = [d for d in docs if d.status == "done"]
+    minutes = max(wall_seconds, 1e-9) / 60
+    pages = sum(d.pages for d in finished)
+    chunks = sum(d.chunks for d in finished)
+    stage_seconds: dict[str, float] = {}
+    for d in docs:
+        for stage, s in d.seconds.items():
+            stage_seconds[stage] = round(stage_seconds.get(stage, 0.0) + s, 3)
+
+    return {
+        "documents": len(docs),
+        "done": len(finished),
+        "failed": len(docs) - len(finished),
+        "pages": pages,
+        "chunks": chunks,
+        "failed_chunks": sum(d.failed_chunks for d in finished),
+        "wall_seconds": round(wall_seconds, 3),
+        "docs_per_min": round(len(finished) / minutes, 2),
+        "pages_per_min": round(pages / minutes, 2),
+        "chunks_per_min": round(chunks / minutes, 2),
+        # summed per-document time in each stage (exceeds wall time when stages overlap)
+        "stage_seconds": stage_seconds,
+        "per_document": [asdict(d) for d in docs],
+    }
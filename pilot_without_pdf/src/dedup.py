@@ -0,0 +1,254 @@
+import re
+import copy
+import json
+import math
+import random
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Hashable, MutableMapping, Sequence
+
+# Near-duplicate chunk detection, so repeated boilerplate (programme names,
+# agency descriptions, recurring tables) costs one LLM call instead of many.
+#
+# MinHash signatures over word 5-gram shingles estimate Jaccard similarity;
+# LSH banding finds candidates in ~O(1) per chunk instead of comparing every
+# pair. Everything is local and deterministic. Optionally, candidates are
+# confirmed by embedding cosine similarity (embed=callable, vectors cached).
+#
+# ChunkDeduper sits in front of the extraction call: the first chunk of each
+# near-duplicate cluster is sent, later members wait for its result and
+# receive a copy tagged with dedup_of / dedup_similarity (fan-out with
+# provenance). It works on a stream, so nothing has to be clustered up front.
+
+_MERSENNE = (1 << 61) - 1
+_WORD = re.compile(r"[a-z0-9$%]+")
+
+
+def shingles(text: str, k: int = 5) -> set[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> tuple[int, ...]:
+        hashes = [_hash64(s) for s in shingles(text, self.shingle_size)]
+        if not hashes:
+            return (_MERSENNE,) * self.num_perm
+        return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in self._perms)
+
+
+def estimated_jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class NearDuplicateIndex:
+    """LSH index of representative texts.
+
+    With the default 16 bands x 4 rows, pairs at Jaccard 0.8 collide in at
+    least one band ~99.9% of the time and pairs at 0.3 ~12%; candidates are
+    then checked against `threshold` on the full signature.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+        embed: Callable[[str], Sequence[float]] | None = None,
+        embed_threshold: float = 0.95,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.embed = embed
+        self.embed_threshold = embed_threshold
+        self._buckets: dict[tuple, list[Hashable]] = {}
+        self._signatures: dict[Hashable, tuple[int, ...]] = {}
+        self._vectors: dict[Hashable, Sequence[float]] = {}
+
+    def _band_keys(self, sig: tuple[int, ...]) -> list[tuple]:
+        return [(b, sig[b * self.rows:(b + 1) * self.rows]) for b in range(self.bands)]
+
+    def query(self, text: str, sig: tuple[int, ...] | None = None) -> tuple[Hashable, float] | None:
+        """(key, similarity) of the closest indexed near-duplicate of `text`, or None."""
+        sig = sig or self.hasher.signature(text)
+        candidates = {key for band in self._band_keys(sig) for key in self._buckets.get(band, ())}
+        # with embeddings the MinHash bar is lowered and cosine has the final say
+        floor = self.threshold if self.embed is None else self.threshold * 0.7
+        scored = sorted(
+            ((estimated_jaccard(sig, self._signatures[k]), k) for k in candidates),
+            key=lambda t: -t[0],
+        )
+        for jaccard, key in scored:
+            if jaccard < floor:
+                break
+            if self.embed is None:
+                return key, jaccard
+            sim = cosine(self.embed(text), self._vectors[key])
+            if sim >= self.embed_threshold:
+                return key, sim
+        return None
+
+    def add(self, key: Hashable, text: str, sig: tuple[int, ...] | None = None) -> None:
+        sig = sig or self.hasher.signature(text)
+        self._signatures[key] = sig
+        for band in self._band_keys(sig):
+            self._buckets.setdefault(band, []).append(key)
+        if self.embed is not None:
+            self._vectors[key] = self.embed(text)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+def cluster_texts(texts: Sequence[str], threshold: float = 0.85, **index_kwargs) -> list[int]:
+    """Representative index for every text (itself for cluster heads), first occurrence wins."""
+    index = NearDuplicateIndex(threshold, **index_kwargs)
+    reps: list[int] = []
+    for i, text in enumerate(texts):
+        hit = index.query(text)
+        if hit is None:
+            index.add(i, text)
+            reps.append(i)
+        else:
+            reps.append(hit[0])
+    return reps
+
+
+class ChunkDeduper:
+    """Send one representative per near-duplicate cluster; fan its result out to the rest.
+
+    Keys are (doc_id, chunk_id), so one deduper can be shared by every document
+    of a corpus run (boilerplate repeats across documents too).
+    """
+
+    def __init__(self, threshold: float = 0.85, **index_kwargs):
+        self.index = NearDuplicateIndex(threshold, **index_kwargs)
+        self._results: dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.duplicates = 0
+
+    def _claim(self, key: Hashable, text: str, fut: asyncio.Future) -> tuple[Hashable, float] | None:
+        """Look up `text`; if it is new, index it under `key` with `fut` as its pending result."""
+        sig = self.index.hasher.signature(text)
+        with self._lock:
+            hit = self.index.query(text, sig)
+            if hit is None:
+                self.index.add(key, text, sig)
+                self._results[key] = fut
+                self.sent += 1
+            else:
+                self.duplicates += 1
+            return hit
+
+    async def call(self, key: tuple[Any, int], text: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        # hashing (and embedding, if enabled) runs off the event loop
+        hit = await asyncio.to_thread(self._claim, key, text, fut)
+        if hit is not None:
+            (rep_doc, rep_chunk), similarity = hit
+            out = copy.deepcopy(await asyncio.shield(self._results[(rep_doc, rep_chunk)]))
+            if isinstance(out, dict):
+                for k in ("chunk_id", "page_start", "page_end", "char_start", "char_end", "n_tokens", "keyword_score"):
+                    out.pop(k, None)  # the representative's provenance; this chunk's is added by the caller
+                out["dedup_of"] = rep_chunk
+                if rep_doc != key[0]:
+                    out["dedup_of_doc"] = rep_doc
+                out["dedup_similarity"] = round(similarity, 3)
+            return out
+
+        try:
+            out = await call(text)
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved: duplicates re-raise it, nobody else needs to
+            raise
+        fut.set_result(out)
+        return out
+
+    def report(self) -> dict:
+        total = self.sent + self.duplicates
+        return {
+            "threshold": self.index.threshold,
+            "sent": self.sent,
+            "duplicates": self.duplicates,
+            "saved_ratio": round(self.duplicates / total, 3) if total else 0.0,
+        }
+
+
+# ---------- optional embeddings ----------
+class EmbeddingCache:
+    """sqlite store of embedding vectors keyed by (model, sha256(text))."""
+
+    def __init__(self, path: str | Path = "pilot_with_pdf/data/cache/embeddings.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (model TEXT, sha256 TEXT, vector TEXT, PRIMARY KEY (model, sha256))"
+        )
+        self._conn.commit()
+
+    def get(self, model: str, sha: str) -> list[float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND sha256 = ?", (model, sha)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, model: str, sha: str, vector: Sequence[float]) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", (model, sha, json.dumps(list(vector))))
+            self._conn.commit()
+
+
+def cached_embedder(
+    client,
+    model: str = "text-embedding-3-small",
+    cache: EmbeddingCache | MutableMapping | None = None,
+) -> Callable[[str], list[float]]:
+    """text -> vector via client.embeddings.create, each text embedded at most once."""
+    cache = cache if cache is not None else EmbeddingCache()
+
+    def embed(text: str) -> list[float]:
+        sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if isinstance(cache, EmbeddingCache):
+            vector = cache.get(model, sha)
+        else:
+            vector = cache.get((model, sha))
+        if vector is None:
+            vector = list(client.embeddings.create(model=model, input=text).data[0].embedding)
+            if isinstance(cache, EmbeddingCache):
+                cache.put(model, sha, vector)
+            else:
+                cache[(model, sha)] = vector
+        return vector
+
+    return embed
@@ -0,0 +1,275 @@
+import json
+import shutil
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from functools import lru_cache
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# PDF downloader shared by the pilot_with_pdf scripts and the corpus runner.
+#
+# - one pooled requests.Session (keep-alive, connect/5xx retries)
+# - conditional GETs: the ETag / Last-Modified of the last download are sent
+#   back, so an unchanged PDF costs a 304 instead of a full transfer
+# - interrupted transfers stay in partial/ and resume with an HTTP Range
+#   request (guarded by If-Range, so a changed file restarts from zero)
+# - finished files are stored once under blobs/<sha256[:2]>/<sha256>.pdf;
+#   URLs that serve identical bytes share one blob
+# - fetch_many() downloads a URL list in parallel over the same pool
+
+DOWNLOAD_DIR = Path("pilot_with_pdf/data/pdf")
+USER_AGENT = "Mozilla/5.0"
+CHUNK_BYTES = 64 * 1024  # small reads: an interrupted read loses at most this much
+
+
+@dataclass
+class FetchResult:
+    url: str
+    path: Path | None
+    sha256: str | None
+    status: str  # downloaded | resumed | not_modified | offline | failed
+    bytes_transferred: int = 0
+    error: str | None = None
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class Downloader:
+    def __init__(
+        self,
+        root: Path = DOWNLOAD_DIR,
+        pool_size: int = 8,
+        timeout: float = 60,
+        attempts: int = 3,
+    ):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.partial_dir = self.root / "partial"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.attempts = attempts
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        retry = Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.root / "downloads.sqlite", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    # ---------- index ----------
+    def _lookup(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, size, etag, last_modified FROM downloads WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"sha256": row[0], "size": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def _record(self, url: str, sha: str, size: int, etag: str | None, last_modified: str | None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?)",
+                (url, sha, size, etag, last_modified, datetime.now().isoformat(timespec="seconds")),
+            )
+            self._conn.commit()
+
+    def blob_path(self, sha: str) -> Path:
+        return self.blob_dir / sha[:2] / f"{sha}.pdf"
+
+    def known_path(self, url: str) -> Path | None:
+        """Blob previously downloaded for `url`, if it is still on disk."""
+        row = self._lookup(url)
+        if row is None:
+            return None
+        path = self.blob_path(row["sha256"])
+        return path if path.exists() else None
+
+    # ---------- partial transfers ----------
+    def _partial(self, url: str) -> tuple[Path, Path]:
+        key = _url_key(url)
+        return self.partial_dir / f"{key}.part", self.partial_dir / f"{key}.json"
+
+    def _drop_partial(self, url: str) -> None:
+        for p in self._partial(url):
+            p.unlink(missing_ok=True)
+
+    # ---------- fetching ----------
+    def fetch(self, url: str) -> FetchResult:
+        """Download `url` (or confirm the stored copy is current); returns the blob path.
+
+        If the server cannot be reached, or keeps answering 5xx / 429, but a
+        previous copy exists, that copy is returned with status "offline".
+        """
+        last_error: Exception | None = None
+        for _ in range(max(1, self.attempts)):
+            try:
+                return self._fetch_once(url)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                # the partial file is kept, so the next attempt resumes where this one stopped
+                last_error = e
+            except (requests.exceptions.RetryError, requests.HTTPError) as e:
+                # the server is up but failing (5xx / 429, after the session's own retries)
+                if not _server_unavailable(e):
+                    raise
+                last_error = e
+
+        known = self.known_path(url)
+        if known is not None:
+            row = self._lookup(url)
+            return FetchResult(url, known, row["sha256"], "offline", error=str(last_error))
+        raise last_error
+
+    def _fetch_once(self, url: str) -> FetchResult:
+        known = self._lookup(url)
+        known_path = self.blob_path(known["sha256"]) if known else None
+        part, meta_path = self._partial(url)
+
+        headers = {}
+        offset = 0
+        part_meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        if part.exists() and part.stat().st_size > 0 and (part_meta.get("etag") or part_meta.get("last_modified")):
+            offset = part.stat().st_size
+            headers["Range"] = f"bytes={offset}-"
+            # only resume if the file is unchanged; otherwise the server sends a fresh 200
+            headers["If-Range"] = part_meta.get("etag") or part_meta["last_modified"]
+        elif known_path is not None and known_path.exists():
+            if known["etag"]:
+                headers["If-None-Match"] = known["etag"]
+            if known["last_modified"]:
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+            if r.status_code == 304 and known_path is not None:
+                return FetchResult(url, known_path, known["sha256"], "not_modified")
+            if r.status_code == 416:
+                # stale partial (e.g. already complete or file shrank): start over
+                self._drop_partial(url)
+                return self._fetch_once(url)
+            r.raise_for_status()
+
+            resumed = r.status_code == 206 and offset > 0
+            if not resumed:
+                offset = 0
+            etag = r.headers.get("ETag") or (part_meta.get("etag") if resumed else None)
+            last_modified = r.headers.get("Last-Modified") or (part_meta.get("last_modified") if resumed else None)
+            meta_path.write_text(json.dumps({"url": url, "etag": etag, "last_modified": last_modified}), encoding="utf-8")
+
+            h = hashlib.sha256()
+            if resumed:
+                with part.open("rb") as f:
+                    for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+                        h.update(block)
+
+            transferred = 0
+            with part.open("ab" if resumed else "wb") as f:
+                for block in r.iter_content(chunk_size=CHUNK_BYTES):
+                    if block:
+                        f.write(block)
+                        h.update(block)
+                        transferred += len(block)
+
+        size = part.stat().st_size
+        expected = _expected_size(r, offset)
+        if expected is not None and size != expected:
+            raise requests.exceptions.ChunkedEncodingError(f"Incomplete download of {url}: {size}/{expected} bytes")
+
+        sha = h.hexdigest()
+        blob = self.blob_path(sha)
+        if blob.exists():
+            part.unlink()  # identical bytes already stored (same file under another URL, or unchanged)
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(part), str(blob))
+        meta_path.unlink(missing_ok=True)
+        self._record(url, sha, size, etag, last_modified)
+        return FetchResult(url, blob, sha, "resumed" if resumed else "downloaded", transferred)
+
+    def fetch_many(self, urls: list[str], workers: int = 4) -> list[FetchResult]:
+        """Fetch several URLs over the shared connection pool; results in input order.
+
+        Failures are reported as FetchResult(status="failed") rather than raised.
+        """
+        def one(url: str) -> FetchResult:
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                return FetchResult(url, None, None, "failed", error=f"{type(e).__name__}: {e}")
+
+        unique = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max(1, workers), thread_name_prefix="fetch") as pool:
+            by_url = dict(zip(unique, pool.map(one, unique)))
+        return [by_url[u] for u in urls]
+
+    def close(self) -> None:
+        self.session.close()
+        with self._lock:
+            self._conn.close()
+
+
+def _server_unavailable(e: Exception) -> bool:
+    if isinstance(e, requests.exceptions.RetryError):
+        return True
+    status = getattr(e.response, "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+def _expected_size(r: requests.Response, offset: int) -> int | None:
+    if r.status_code == 206:
+        total = r.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = r.headers.get("Content-Length")
+    # requests transparently decompresses gzip bodies, so Content-Length only
+    # describes the stored file when no content encoding was applied
+    if length and length.isdigit() and not r.headers.get("Content-Encoding"):
+        return int(length) + offset
+    return None
+
+
+def latest_pdf(root: Path = DOWNLOAD_DIR) -> Path | None:
+    """Most recently stored PDF: blobs/ first, then PDFs saved directly under `root` (older layout)."""
+    root = Path(root)
+    candidates = [*root.glob("blobs/*/*.pdf"), *root.glob("*.pdf")]
+    return max(candidates, key=lambda p: p.stat().st_mtime, default=None)
+
+
+@lru_cache(maxsize=1)
+def default_downloader() -> Downloader:
+    return Downloader()
+
+
+def fetch_pdf(url: str) -> Path:
+    """Path to an up-to-date local copy of `url` (downloads only when it changed)."""
+    result = default_downloader().fetch(url)
+    if result.status == "offline":
+        print(f"Could not reach {url} ({result.error}); using stored copy {result.path}")
+    else:
+        print(f"{url}: {result.status} -> {result.path}")
+    return result.path
@@ -0,0 +1,253 @@
+import re
+import json
+import time
+import threading
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Iterable, Iterator
+
+from .streaming import iter_jsonl
+
+# Local check that evidence spans are really quoted from the source text.
+#
+# Every extraction prompt asks for verbatim evidence_spans / evidence_span, but
+# models paraphrase, stitch quotes together or invent them. Instead of a second
+# LLM pass, the page text is indexed once per document and each span is looked
+# up locally:
+#
+#   PageIndex(pages)            tokens of the pages (NFKC, casefolded, \w+ runs)
+#                               with their page and char offsets, one joined
+#                               string for exact search and an n-gram -> token
+#                               positions map for near misses
+#   EvidenceVerifier.verify_row(row, index)
+#       exact   the span's tokens occur in order inside the row's page/char
+#               range (str.find on the joined tokens, so case, punctuation,
+#               quotes and line breaks do not matter)
+#       fuzzy   the span's n-grams vote for an alignment; SequenceMatcher over
+#               that window gives the share of span tokens found in order, and
+#               at least `min_score` counts as found (the verbatim source text
+#               is attached)
+#       missing anything else; the row gets reextract=True
+#
+# Rows gain evidence_status (verified / fuzzy / unverified / none),
+# evidence_score (lowest span score) and evidence_matches (one dict per span
+# with page, char_start/char_end into that page's text). Rows with page
+# provenance are checked against their own range; rows without it (the "chars"
+# chunker) against the whole page range of the run.
+#
+# Building the index is linear in the text, an exact lookup is one bounded
+# str.find and a fuzzy one touches only the postings of the span's n-grams, so
+# whole corpus outputs verify at thousands of rows per second.
+
+_WORD = re.compile(r"\w+")
+_POS = 10**9  # sort key for (page, char offset) pairs
+
+
+def tokens_with_offsets(text: str) -> Iterator[tuple[str, int, int]]:
+    for m in _WORD.finditer(text):
+        yield unicodedata.normalize("NFKC", m.group()).casefold(), m.start(), m.end()
+
+
+def normalise_tokens(text: str) -> list[str]:
+    return [t for t, _, _ in tokens_with_offsets(text)]
+
+
+class PageIndex:
+    def __init__(self, pages: Iterable[tuple[int, str]], n: int = 3):
+        self.n = n
+        self.pages: dict[int, str] = {}
+        self.tokens: list[str] = []
+        self.page_of: list[int] = []
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        for page, text in pages:
+            self.pages[page] = text
+            for tok, s, e in tokens_with_offsets(text):
+                self.tokens.append(tok)
+                self.page_of.append(page)
+                self.starts.append(s)
+                self.ends.append(e)
+        self.keys = [p * _POS + s for p, s in zip(self.page_of, self.starts)]
+
+        # " tok0 tok1 ... " with each token's position, for exact lookups
+        self.pos: list[int] = []
+        at = 1
+        for tok in self.tokens:
+            self.pos.append(at)
+            at += len(tok) + 1
+        self.joined = " " + " ".join(self.tokens) + " "
+
+        self._grams: dict[int, dict[tuple, list[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def grams(self, n: int) -> dict[tuple, list[int]]:
+        """n-gram -> ascending token positions (built on first use per n)."""
+        if n not in self._grams:
+            index: dict[tuple, list[int]] = defaultdict(list)
+            toks = self.tokens
+            for i in range(len(toks) - n + 1):
+                index[tuple(toks[i:i + n])].append(i)
+            self._grams[n] = dict(index)
+        return self._grams[n]
+
+    def token_range(self, row: dict) -> tuple[int, int]:
+        """Token positions covered by a row's page/char provenance (everything without one)."""
+        try:
+            lo = int(row["page_start"]) * _POS + int(row["char_start"])
+            hi = int(row["page_end"]) * _POS + int(row["char_end"])
+        except (KeyError, TypeError, ValueError):
+            return 0, len(self.tokens)
+        return bisect_left(self.keys, lo), bisect_left(self.keys, hi)
+
+    def location(self, first: int, last: int) -> dict:
+        """Page and char offsets of tokens first..last (inclusive) in the page text."""
+        page = self.page_of[first]
+        end = self.ends[last] if self.page_of[last] == page else len(self.pages[page])
+        return {"page": page, "char_start": self.starts[first], "char_end": end}
+
+    def find_exact(self, span_tokens: list[str], lo: int, hi: int) -> int | None:
+        if not span_tokens or hi - lo < len(span_tokens):
+            return None
+        needle = " " + " ".join(span_tokens) + " "
+        end = self.pos[hi - 1] + len(self.tokens[hi - 1]) + 1
+        at = self.joined.find(needle, self.pos[lo] - 1, end)
+        if at < 0:
+            return None
+        return bisect_left(self.pos, at + 1)
+
+    def find_fuzzy(self, span_tokens: list[str], lo: int, hi: int, slack: int = 3) -> tuple[float, int, int] | None:
+        """(score, first, last) of the best in-order alignment of span_tokens inside [lo, hi)."""
+        n = min(self.n, len(span_tokens))
+        if n == 0 or hi <= lo:
+            return None
+        grams = self.grams(n)
+        votes: Counter = Counter()
+        for i in range(len(span_tokens) - n + 1):
+            postings = grams.get(tuple(span_tokens[i:i + n]))
+            if not postings:
+                continue
+            for p in postings[bisect_left(postings, lo):bisect_left(postings, hi - n + 1)]:
+                votes[p - i] += 1
+        if not votes:
+            return None
+        best = None
+        for offset, _ in votes.most_common(3):
+            w_lo = max(lo, offset - slack)
+            w_hi = min(hi, offset + len(span_tokens) + slack)
+            window = self.tokens[w_lo:w_hi]
+            blocks = [b for b in SequenceMatcher(None, span_tokens, window, autojunk=False).get_matching_blocks() if b.size]
+            if not blocks:
+                continue
+            score = sum(b.size for b in blocks) / len(span_tokens)
+            if best is None or score > best[0]:
+                best = (score, w_lo + blocks[0].b, w_lo + blocks[-1].b + blocks[-1].size - 1)
+        return best
+
+
+def _spans(row: dict, fields: tuple[str, ...]) -> list[str]:
+    spans: list[str] = []
+    for f in fields:
+        value = row.get(f)
+        if isinstance(value, str):
+            value = [value]
+        if isinstance(value, list):
+            spans.extend(str(v) for v in value if v is not None and str(v).strip())
+    return spans
+
+
+class EvidenceVerifier:
+    def __init__(self, min_score: float = 0.8, fields: Iterable[str] = ("evidence_spans", "evidence_span")):
+        self.min_score = min_score
+        self.fields = tuple(fields)
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.seconds = 0.0
+
+    def check_span(self, span: str, index: PageIndex, lo: int, hi: int) -> dict:
+        toks = normalise_tokens(span)
+        if not toks:
+            return {"status": "missing", "score": 0.0}
+        at = index.find_exact(toks, lo, hi)
+        if at is not None:
+            return {"status": "exact", "score": 1.0, **index.location(at, at + len(toks) - 1)}
+        found = index.find_fuzzy(toks, lo, hi)
+        if found is None:
+            return {"status": "missing", "score": 0.0}
+        score, first, last = found
+        if score < self.min_score:
+            return {"status": "missing", "score": round(score, 3)}
+        loc = index.location(first, last)
+        text = index.pages[loc["page"]][loc["char_start"]:loc["char_end"]]
+        return {"status": "fuzzy", "score": round(score, 3), **loc, "text": text}
+
+    def verify_row(self, row: dict, index: PageIndex) -> dict:
+        """Adds evidence_status / evidence_score / evidence_matches (and reextract) to `row`."""
+        spans = _spans(row, self.fields)
+        counts = Counter(rows=1)
+        if not spans:
+            row["evidence_status"] = "none"
+            row.pop("evidence_score", None)
+            row.pop("evidence_matches", None)
+        else:
+            lo, hi = index.token_range(row)
+            matches = [self.check_span(s, index, lo, hi) for s in spans]
+            statuses = Counter(m["status"] for m in matches)
+            counts.update(statuses)
+            counts["spans"] += len(matches)
+            row["evidence_matches"] = matches
+            row["evidence_score"] = min(m["score"] for m in matches)
+            if statuses["missing"]:
+                row["evidence_status"] = "unverified"
+            else:
+                row["evidence_status"] = "fuzzy" if statuses["fuzzy"] else "verified"
+        if row["evidence_status"] == "unverified":
+            row["reextract"] = True
+            counts["flagged"] += 1
+        else:
+            row.pop("reextract", None)
+        with self._lock:
+            self.counts.update(counts)
+        return row
+
+    def verify_rows(self, rows: Iterable[dict], index: PageIndex) -> Iterator[dict]:
+        t0 = time.perf_counter()
+        try:
+            for row in rows:
+                yield self.verify_row(row, index)
+        finally:
+            with self._lock:
+                self.seconds += time.perf_counter() - t0
+
+    def verify_jsonl(self, path: Path, index: PageIndex) -> list:
+        """Rewrite a JSONL output with the evidence columns; returns the chunk_ids flagged for re-extraction."""
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        flagged = []
+        with tmp.open("w", encoding="utf-8") as f:
+            for row in self.verify_rows(iter_jsonl(path), index):
+                if row.get("reextract"):
+                    flagged.append(row.get("chunk_id"))
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        tmp.replace(path)
+        return flagged
+
+    def report(self) -> dict:
+        with self._lock:
+            c = dict(self.counts)
+            seconds = self.seconds
+        return {
+            "min_score": self.min_score,
+            "rows": c.get("rows", 0),
+            "spans": c.get("spans", 0),
+            "exact": c.get("exact", 0),
+            "fuzzy": c.get("fuzzy", 0),
+            "missing": c.get("missing", 0),
+            "rows_flagged": c.get("flagged", 0),
+            "seconds": round(seconds, 3),
+            "rows_per_s": round(c.get("rows", 0) / seconds, 1) if seconds else None,
+        }
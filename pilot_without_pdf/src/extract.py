@@ -1,12 +1,8 @@
-import json
-import re
-from dotenv import load_dotenv
-from openai import OpenAI
+from .clients import lazy_client
+from .llm_json import call_json, schema_from_fields
 
-# Load API key
-load_dotenv()
-
-client = OpenAI()
+# shared client, built (and .env read) on first call
+client = lazy_client()
 
 TAXONOMY = [
     "subsidy",
@@ -20,6 +16,15 @@ TAXONOMY = [
     "other"
 ]
 
+EXTRACT_SCHEMA = schema_from_fields(
+    [
+        "instrument_name", "instrument_type", "administering_agency", "target_sector",
+        "beneficiary", "funding_amount_or_cap", "cost_share_or_matching",
+        "eligibility_rules", "application_process", "enforceability", "evidence_spans",
+    ],
+    enums={"instrument_type": TAXONOMY, "enforceability": ["binding", "nonbinding", "unclear"]},
+)
+
 def extract_instrument_fields(text: str) -> dict:
     prompt = f"""
 You extract industrial policy / regulatory instrument fields.
@@ -48,31 +53,13 @@ TEXT:
 {text}
 """
 
-    response = client.responses.create(
+    # Structured output + local repair + one re-ask; {"error", "raw_output"} if all fail
+    return call_json(
+        client,
+        schema=EXTRACT_SCHEMA,
+        schema_name="policy_instrument",
         model="gpt-4.1-mini",
         input=prompt
     )
 
-    # Clean common formatting the model may add (```json ... ```)
-    clean = response.output_text.strip()
-    clean = re.sub(r"^```(?:json)?\s*", "", clean, flags=re.IGNORECASE)
-    clean = re.sub(r"\s*```$", "", clean)
-
-    # Try parsing
-    try:
-        return json.loads(clean)
-    except json.JSONDecodeError:
-        # Fallback: try to extract the first {...} block
-        m = re.search(r"\{.*\}", clean, flags=re.DOTALL)
-        if m:
-            try:
-                return json.loads(m.group(0))
-            except json.JSONDecodeError:
-                pass
-
-        return {
-            "error": "Invalid JSON",
-            "raw_output": response.output_text
-        }
-
 # Run if I want to check function module is loaded properly: python -c "import src.extract as e; print('HAS:', hasattr(e,'extract_instrument_fields')); print(dir(e))"
\ No newline at end of file
@@ -0,0 +1,204 @@
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from .llm_engine import estimate_tokens
+
+# Deterministic stand-in for OpenAI()/AsyncOpenAI() (`responses.create` only),
+# for benchmarks and dry runs that must not cost anything.
+#
+# Replies are canned JSON shaped by the request:
+#   - text.format json_schema   -> an instance of that schema
+#   - packed prompt (packing.py) -> a JSON array with one object per "id"
+#   - anything else             -> DEFAULT_REPLY-shaped object
+# Latency, transient errors (500 / 429 with retry-after) and malformed
+# (truncated) replies are drawn from a RNG seeded by (seed, request, attempt),
+# so a run is reproducible whatever the concurrency or completion order.
+# The wrappers in rate_limit.py / llm_json.py see exactly what they would see
+# from the API: retryable errors carry status_code and headers.
+
+PACKED_MARKER = "Texts (one JSON object per line):"
+TAXONOMY = ["subsidy", "tax_credit", "grant", "loan", "export_control", "local_content", "procurement", "standard", "other"]
+
+DEFAULT_REPLY = {
+    "instrument_type": None,  # drawn from TAXONOMY
+    "confidence": None,       # drawn from [0.5, 1.0]
+    "target_sector": "synthetic sector",
+    "funding_amount_or_cap": None,
+    "eligibility_rules": [],
+    "evidence_span": None,
+}
+
+
+class FakeAPIError(Exception):
+    """Looks like openai.APIStatusError to retry_reason() / _headers_of()."""
+
+    def __init__(self, status_code: int, headers: dict | None = None):
+        super().__init__(f"fake API error {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 200.0
+    jitter_ms: float = 50.0
+    error_rate: float = 0.0        # share of attempts failing with a 500
+    rate_limit_rate: float = 0.0   # share of attempts failing with a 429
+    malformed_rate: float = 0.0    # share of replies cut off mid-JSON
+    seed: int = 0
+
+
+def _quote(text: str, rng: random.Random, words: int = 8) -> str:
+    tokens = text.split()
+    if len(tokens) <= words:
+        return " ".join(tokens)
+    start = rng.randrange(len(tokens) - words)
+    return " ".join(tokens[start:start + words])
+
+
+def canned_instance(schema: dict, rng: random.Random, source: str = "", name: str = "") -> object:
+    """A value valid under `schema` (the JSON-schema subset built by llm_json.py)."""
+    types = schema.get("type", "string")
+    types = [types] if isinstance(types, str) else types
+    if "enum" in schema:
+        return rng.choice([v for v in schema["enum"] if v is not None] or [None])
+    if "object" in types:
+        return {k: canned_instance(sub, rng, source, k) for k, sub in schema.get("properties", {}).items()}
+    if "array" in types:
+        if "span" in name and source:
+            return [_quote(source, rng)]
+        return [canned_instance(schema.get("items", {}), rng, source)] if rng.random() < 0.5 else []
+    if "number" in types or "integer" in types:
+        return round(rng.uniform(0.5, 1.0), 2)
+    if "boolean" in types:
+        return rng.random() < 0.5
+    if "null" in types and rng.random() < 0.3:
+        return None
+    if "span" in name and source:
+        return _quote(source, rng)
+    return f"synthetic {name or 'value'}"
+
+
+def _default_object(rng: random.Random, source: str) -> dict:
+    out = dict(DEFAULT_REPLY)
+    out["instrument_type"] = rng.choice(TAXONOMY)
+    out["confidence"] = round(rng.uniform(0.5, 1.0), 2)
+    out["evidence_span"] = _quote(source, rng)
+    return out
+
+
+def fake_reply(request: dict, rng: random.Random) -> str:
+    prompt = str(request.get("input", ""))
+    fmt = (request.get("text") or {}).get("format") or {}
+    if PACKED_MARKER in prompt:
+        items = []
+        for line in prompt.split(PACKED_MARKER, 1)[1].splitlines():
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(item, dict) and "id" in item:
+                items.append({"id": item["id"], **_default_object(rng, str(item.get("text", "")))})
+        return json.dumps(items)
+    if fmt.get("type") == "json_schema":
+        return json.dumps(canned_instance(fmt["schema"], rng, prompt[-2000:]))
+    return json.dumps(_default_object(rng, prompt[-2000:]))
+
+
+class FakeBackend:
+    """Shared state (config, attempt counters, stats) for the sync and async fakes."""
+
+    def __init__(self, config: FakeLLMConfig | None = None):
+        self.config = config or FakeLLMConfig()
+        self._lock = threading.Lock()
+        self._attempts: Counter = Counter()
+        self.stats: Counter = Counter()
+
+    def plan(self, request: dict) -> tuple[float, FakeAPIError | None, str | None]:
+        """(latency seconds, error to raise or None, reply text or None) for one attempt."""
+        key = hashlib.sha1(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts[key]
+            self._attempts[key] += 1
+            self.stats["calls"] += 1
+        c = self.config
+        rng = random.Random(f"{c.seed}|{key}|{attempt}")
+        latency = max(0.0, rng.gauss(c.latency_ms, c.jitter_ms)) / 1000
+
+        roll = rng.random()
+        if roll < c.rate_limit_rate:
+            self._count("rate_limited")
+            return latency, FakeAPIError(429, {"retry-after-ms": "50"}), None
+        if roll < c.rate_limit_rate + c.error_rate:
+            self._count("server_errors")
+            return latency, FakeAPIError(500), None
+
+        # replies depend on the request only, not the attempt, like a temperature-0 model
+        reply = fake_reply(request, random.Random(f"{c.seed}|{key}"))
+        if rng.random() < c.malformed_rate:
+            self._count("malformed")
+            reply = reply[: max(1, int(len(reply) * rng.uniform(0.3, 0.9)))]
+        return latency, None, reply
+
+    def _count(self, event: str) -> None:
+        with self._lock:
+            self.stats[event] += 1
+
+    def response(self, request: dict, reply: str) -> SimpleNamespace:
+        input_tokens = estimate_tokens(str(request.get("input", "")))
+        output_tokens = estimate_tokens(reply)
+        with self._lock:
+            self.stats["input_tokens"] += input_tokens
+            self.stats["output_tokens"] += output_tokens
+        usage = SimpleNamespace(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            input_tokens_details=SimpleNamespace(cached_tokens=0),
+        )
+        return SimpleNamespace(output_text=reply, usage=usage, model=request.get("model"))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+class _FakeResponses:
+    def __init__(self, backend: FakeBackend):
+        self._backend = backend
+
+    def create(self, **request):
+        latency, error, reply = self._backend.plan(request)
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        return self._backend.response(request, reply)
+
+
+class _AsyncFakeResponses(_FakeResponses):
+    async def create(self, **request):
+        latency, error, reply = self._backend.plan(request)
+        await asyncio.sleep(latency)
+        if error is not None:
+            raise error
+        return self._backend.response(request, reply)
+
+
+class FakeOpenAI:
+    def __init__(self, backend: FakeBackend | None = None, **config):
+        self.backend = backend or FakeBackend(FakeLLMConfig(**config))
+        self.responses = _FakeResponses(self.backend)
+
+
+class AsyncFakeOpenAI:
+    def __init__(self, backend: FakeBackend | None = None, **config):
+        self.backend = backend or FakeBackend(FakeLLMConfig(**config))
+        self.responses = _AsyncFakeResponses(self.backend)
+
@@ -0,0 +1,156 @@
+import json
+from pathlib import Path
+from collections import Counter
+from typing import Iterable
+
+from .checkpoint import RUNS_DIR, RunManifest, text_sha256
+from .streaming import JsonlSink, iter_jsonl
+
+# Incremental re-extraction when the taxonomy plan changes.
+#
+# The prompt hash covers the whole taxonomy, so editing one category starts a
+# new run and, without this, sends every chunk again. PlanTracker splits the
+# prompt into the parts a row depends on:
+#   template    hash of everything except the taxonomy (instructions, examples,
+#               model, output cap, cascade); changing it re-runs everything
+#   categories  name -> hash of its definition
+#   fields      the schema fields asked for
+# The fingerprint is stored in the run manifest and every row carries its
+# short hash as `plan_fp`.
+#
+# When a new run starts for a PDF (same chunking and template, different plan),
+# seed() loads the rows of the latest such run and carries forward every row the
+# change cannot affect. Only these chunks are sent again:
+#   removed / redefined  rows labelled with that category
+#   added                rows already labelled with it (off-taxonomy labels),
+#                        or with no category / "other", which it may now cover
+#   new fields           rows with a category, which need the new values
+# Failed rows are carried as failed, so --retry-errors still picks them up.
+# Carried rows lose removed fields and get null for new ones.
+
+ABSTAIN_LABELS = {"", "other", "none", "null"}
+
+
+def _norm(label) -> str:
+    return str(label).strip().lower() if label is not None else ""
+
+
+class PlanTracker:
+    def __init__(
+        self,
+        taxonomy: Iterable[dict],
+        schema_fields: Iterable[str],
+        template_hash: str,
+        label_field: str = "category",
+    ):
+        categories = {}
+        for t in taxonomy:
+            name = str(t.get("category") or "").strip()
+            if name:
+                categories[name] = text_sha256(str(t.get("definition") or "").strip())[:12]
+        self.fingerprint = {
+            "template": template_hash,
+            "categories": categories,
+            "fields": sorted(dict.fromkeys(str(f) for f in schema_fields)),
+        }
+        self.plan_fp = text_sha256(json.dumps(self.fingerprint, sort_keys=True))[:12]
+        self.label_field = label_field
+
+    def meta(self) -> dict:
+        """Stored in the run manifest, where later runs look for it."""
+        return {**self.fingerprint, "plan_fp": self.plan_fp}
+
+    def stamp(self, row: dict) -> dict:
+        row["plan_fp"] = self.plan_fp
+        return row
+
+    # ---------- diff ----------
+    def diff(self, old: dict) -> dict:
+        old_cats, new_cats = old.get("categories", {}), self.fingerprint["categories"]
+        old_fields, new_fields = set(old.get("fields", [])), set(self.fingerprint["fields"])
+        return {
+            "added": sorted(set(new_cats) - set(old_cats)),
+            "removed": sorted(set(old_cats) - set(new_cats)),
+            "redefined": sorted(c for c in set(old_cats) & set(new_cats) if old_cats[c] != new_cats[c]),
+            "new_fields": sorted(new_fields - old_fields),
+            "dropped_fields": sorted(old_fields - new_fields),
+        }
+
+    def rerun_reason(self, row: dict, diff: dict) -> str | None:
+        """Why a previous row has to be extracted again under this plan, or None to carry it."""
+        label = _norm(row.get(self.label_field))
+        if label in {_norm(c) for c in diff["removed"]}:
+            return "removed_category"
+        if label in {_norm(c) for c in diff["redefined"]}:
+            return "redefined_category"
+        if diff["added"]:
+            old_names = {_norm(c) for c in self.fingerprint["categories"]} - {_norm(c) for c in diff["added"]}
+            if label in ABSTAIN_LABELS or label not in old_names:
+                return "added_category"
+        if diff["new_fields"] and label not in ABSTAIN_LABELS:
+            return "new_fields"
+        return None
+
+    # ---------- carrying rows forward ----------
+    def previous_run(self, manifest: RunManifest, runs_dir: Path = RUNS_DIR) -> dict | None:
+        """Meta of the most recently opened other run of this PDF + chunking + template."""
+        best, best_mtime = None, -1.0
+        for path in Path(runs_dir).glob("*/manifest.json"):
+            try:
+                meta = json.loads(path.read_text(encoding="utf-8"))
+                mtime = path.stat().st_mtime  # rewritten whenever the run is opened or resumed
+            except (OSError, ValueError):
+                continue
+            plan = meta.get("plan")
+            if (
+                meta.get("run_key") == manifest.meta["run_key"]
+                or not plan
+                or plan.get("template") != self.fingerprint["template"]
+                or meta.get("pdf_sha256") != manifest.meta["pdf_sha256"]
+                or meta.get("chunking") != manifest.meta["chunking"]
+                or not Path(meta.get("out_jsonl", "")).exists()
+            ):
+                continue
+            if mtime > best_mtime:
+                best, best_mtime = meta, mtime
+        return best
+
+    def seed(self, manifest: RunManifest, runs_dir: Path = RUNS_DIR) -> dict:
+        """Write the unaffected rows of the previous run into a new run; returns what happened."""
+        prev = self.previous_run(manifest, runs_dir)
+        if prev is None:
+            return {"plan_fp": self.plan_fp, "previous_run": None}
+        old_fp = prev["plan"]["plan_fp"]
+        diff = self.diff(prev["plan"])
+
+        # last row per chunk, and only rows that run wrote (the output path is per day
+        # and may have been overwritten by a run with another template since)
+        rows: dict[int, dict] = {}
+        for row in iter_jsonl(Path(prev["out_jsonl"])):
+            if row.get("plan_fp") == old_fp:
+                rows[row["chunk_id"]] = row
+
+        rerun = Counter()
+        carried = 0
+        with JsonlSink(manifest.out_jsonl) as sink:
+            for chunk_id in sorted(rows):
+                row = rows[chunk_id]
+                reason = self.rerun_reason(row, diff)
+                if reason is not None:
+                    rerun[reason] += 1
+                    continue
+                for field in diff["dropped_fields"]:
+                    row.pop(field, None)
+                for field in diff["new_fields"]:
+                    row.setdefault(field, None)
+                sink.write(self.stamp(row))
+                manifest.record(row)
+                carried += 1
+        return {
+            "plan_fp": self.plan_fp,
+            "previous_run": prev["run_key"],
+            "previous_plan_fp": old_fp,
+            "diff": diff,
+            "carried": carried,
+            "rerun": dict(rerun),
+        }
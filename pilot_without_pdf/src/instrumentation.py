@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from .wrapping import is_async_client
+
+# Stage timings, LLM latency / token / cost accounting and a JSON run report.
+#
+#   RECORDER.span("pdf_text")            with-block timing (nested spans report self time)
+#   RECORDER.timed("call_llm_json")      decorator for sync or async functions
+#   RECORDER.timed_iter("chunk", it)     time spent producing each item of a lazy stream
+#   instrumented_client(client)          latency + usage + cost of every responses.create
+#   RECORDER.document("doc id")          attribute LLM usage/cost to a document
+#   RECORDER.write_report(path, ...)     percentiles + totals as JSON
+#
+# If OTEL_EXPORTER_OTLP_ENDPOINT is set and the opentelemetry SDK + OTLP exporter
+# are installed, every recorded span is also exported as an OpenTelemetry span.
+
+# USD per 1M tokens: (input, cached input, output). Batch API requests cost half.
+MODEL_PRICES = {
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def model_price(model: str | None) -> tuple[float, float, float] | None:
+    # longest prefix wins, so dated snapshots ("gpt-4.1-mini-2025-04-14") resolve too
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model and model.startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+def estimate_cost(model: str | None, input_tokens: int, cached_tokens: int, output_tokens: int) -> float | None:
+    price = model_price(model)
+    if price is None:
+        return None
+    p_in, p_cached, p_out = price
+    return ((input_tokens - cached_tokens) * p_in + cached_tokens * p_cached + output_tokens * p_out) / 1e6
+
+
+def summarize(durations: list[float]) -> dict:
+    if not durations:
+        return {"count": 0}
+    xs = sorted(durations)
+    out = {"count": len(xs), "total_s": round(sum(xs), 4), "mean_s": round(sum(xs) / len(xs), 4)}
+    for p in PERCENTILES:
+        # nearest-rank percentile
+        out[f"p{p}_s"] = round(xs[min(len(xs) - 1, max(0, -(-p * len(xs) // 100) - 1))], 4)
+    out["max_s"] = round(xs[-1], 4)
+    return out
+
+
+def _usage_field(obj, name: str):
+    if obj is None:
+        return None
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def _otel_tracer():
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        print("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk / "
+              "opentelemetry-exporter-otlp-proto-http are not installed; skipping export")
+        return None
+    service = os.getenv("OTEL_SERVICE_NAME", "policy-llm-pipeline")
+    provider = TracerProvider(resource=Resource.create({"service.name": service}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return trace.get_tracer("policy-llm-pipeline")
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._doc = contextvars.ContextVar("document", default=None)
+        self.started = time.time()
+        self.stages: dict[str, list[float]] = {}
+        self.llm: dict[str, dict] = {}
+        self.documents: dict[str, dict] = {}
+        self._tracer = None
+        self._tracer_checked = False
+
+    # ---------- stage timing ----------
+    def _tracer_or_none(self):
+        if not self._tracer_checked:
+            self._tracer_checked = True
+            self._tracer = _otel_tracer()
+        return self._tracer
+
+    def record(self, stage: str, seconds: float, start: float | None = None, **attributes) -> None:
+        with self._lock:
+            self.stages.setdefault(stage, []).append(seconds)
+        tracer = self._tracer_or_none()
+        if tracer is not None:
+            start = start if start is not None else time.time() - seconds
+            doc = self._doc.get()
+            attrs = {k: v for k, v in {**attributes, "document": doc}.items() if v is not None}
+            span = tracer.start_span(stage, start_time=int(start * 1e9), attributes=attrs)
+            span.end(end_time=int((start + seconds) * 1e9))
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        """Time a block. Nested spans on the same thread are subtracted (self time)."""
+        try:
+            with self._frame() as frame:
+                yield
+        finally:
+            self.record(stage, frame["self"], start=frame["start"], **attributes)
+
+    @contextmanager
+    def _frame(self):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        frame = {"start": time.time()}
+        t0 = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            elapsed = time.perf_counter() - t0
+            frame["self"] = elapsed - stack.pop()
+            if stack:
+                stack[-1] += elapsed
+
+    def timed(self, stage: str):
+        """Decorator; async functions are timed end to end (they interleave, so no self time)."""
+        def decorate(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    wall_start = time.time()
+                    t0 = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self.record(stage, time.perf_counter() - t0, start=wall_start)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def timed_iter(self, stage: str, items: Iterable) -> Iterator:
+        """Yield from `items`, timing each next() (the work of producing one item)."""
+        it = iter(items)
+        sentinel = object()
+        while True:
+            with self._frame() as frame:
+                item = next(it, sentinel)
+            if item is sentinel:
+                # the exhausting next() produced nothing; not counted as an item
+                return
+            self.record(stage, frame["self"], start=frame["start"])
+            yield item
+
+    # ---------- documents ----------
+    @contextmanager
+    def document(self, doc_id: str):
+        token = self._doc.set(doc_id)
+        try:
+            yield
+        finally:
+            self._doc.reset(token)
+
+    def set_document(self, doc_id: str) -> None:
+        """Like document(), for a whole task/coroutine (contextvars are per task)."""
+        self._doc.set(doc_id)
+
+    # ---------- LLM calls ----------
+    def record_llm(self, model: str | None, seconds: float, response=None, error: bool = False, start: float | None = None) -> None:
+        usage = _usage_field(response, "usage")
+        cached_response = bool(getattr(response, "cached", False))
+        input_tokens = _usage_field(usage, "input_tokens") or 0
+        output_tokens = _usage_field(usage, "output_tokens") or 0
+        cached_tokens = _usage_field(_usage_field(usage, "input_tokens_details"), "cached_tokens") or 0
+        if cached_response:
+            # served from the local response cache: no tokens billed
+            input_tokens = output_tokens = cached_tokens = 0
+        cost = estimate_cost(model, input_tokens, cached_tokens, output_tokens) or 0.0
+
+        doc = self._doc.get() or "-"
+        with self._lock:
+            for bucket in (
+                self.llm.setdefault(model or "unknown", {"latencies": []}),
+                self.documents.setdefault(doc, {}),
+            ):
+                bucket["calls"] = bucket.get("calls", 0) + 1
+                bucket["errors"] = bucket.get("errors", 0) + int(error)
+                bucket["local_cache_hits"] = bucket.get("local_cache_hits", 0) + int(cached_response)
+                bucket["input_tokens"] = bucket.get("input_tokens", 0) + input_tokens
+                bucket["cached_tokens"] = bucket.get("cached_tokens", 0) + cached_tokens
+                bucket["output_tokens"] = bucket.get("output_tokens", 0) + output_tokens
+                bucket["cost_usd"] = bucket.get("cost_usd", 0.0) + cost
+            if not cached_response:
+                self.llm[model or "unknown"]["latencies"].append(seconds)
+        self.record("llm_call", seconds, start=start, model=model, input_tokens=input_tokens,
+                    output_tokens=output_tokens, cached_tokens=cached_tokens, local_cache_hit=cached_response)
+
+    # ---------- report ----------
+    def report(self, **meta) -> dict:
+        with self._lock:
+            stages = {name: summarize(ds) for name, ds in self.stages.items()}
+            llm = {}
+            for model, b in self.llm.items():
+                row = {k: v for k, v in b.items() if k != "latencies"}
+                row["cost_usd"] = round(row.get("cost_usd", 0.0), 6)
+                row["latency"] = summarize(b["latencies"])
+                llm[model] = row
+            documents = {d: {**b, "cost_usd": round(b.get("cost_usd", 0.0), 6)} for d, b in self.documents.items()}
+
+        totals = {
+            k: sum(b.get(k, 0) for b in documents.values())
+            for k in ("calls", "input_tokens", "cached_tokens", "output_tokens")
+        }
+        totals["cost_usd"] = round(sum(b["cost_usd"] for b in documents.values()), 6)
+        return {
+            "started_at": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "wall_seconds": round(time.time() - self.started, 3),
+            **meta,
+            "stages": stages,
+            "llm": llm,
+            "documents": documents,
+            "totals": totals,
+        }
+
+    def write_report(self, path: Path, **meta) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(**meta), indent=2, default=str), encoding="utf-8")
+        return path
+
+
+RECORDER = Recorder()
+
+
+def report_path(script: str, raw_dir: Path = Path("pilot_with_pdf/data/raw")) -> Path:
+    return Path(raw_dir) / f"run_report_{script}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+
+class _InstrumentedResponses:
+    def __init__(self, responses, recorder: Recorder):
+        self._responses = responses
+        self._recorder = recorder
+
+    def create(self, **request):
+        wall_start = time.time()
+        t0 = time.perf_counter()
+        try:
+            r = self._responses.create(**request)
+        except Exception:
+            self._recorder.record_llm(request.get("model"), time.perf_counter() - t0, error=True, start=wall_start)
+            raise
+        self._recorder.record_llm(request.get("model"), time.perf_counter() - t0, r, start=wall_start)
+        return r
+
+
+class _AsyncInstrumentedResponses(_InstrumentedResponses):
+    async def create(self, **request):
+        wall_start = time.time()
+        t0 = time.perf_counter()
+        try:
+            r = await self._responses.create(**request)
+        except Exception:
+            self._recorder.record_llm(request.get("model"), time.perf_counter() - t0, error=True, start=wall_start)
+            raise
+        self._recorder.record_llm(request.get("model"), time.perf_counter() - t0, r, start=wall_start)
+        return r
+
+
+class InstrumentedClient:
+    """Drop-in wrapper: records latency, usage and cost of every `responses.create`."""
+
+    def __init__(self, client, recorder: Recorder):
+        self._client = client
+        self.recorder = recorder
+        wrapper = _AsyncInstrumentedResponses if is_async_client(client) else _InstrumentedResponses
+        self.responses = wrapper(client.responses, recorder)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrumented_client(client, recorder: Recorder | None = None) -> InstrumentedClient:
+    return InstrumentedClient(client, recorder or RECORDER)
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from functools import lru_cache
+from types import SimpleNamespace
+
+from .wrapping import is_async_client
+
+# On-disk cache for client.responses.create, keyed by a hash of the request.
+#
+# LLM_CACHE_MODE:
+#   on     - serve hits from disk, call the API on a miss and store the result (default)
+#   replay - serve hits from disk, raise CacheMiss on a miss (zero API calls)
+#   off    - bypass the cache entirely
+#
+# Settings are read when the first client is wrapped (after load_dotenv()).
+
+DEFAULT_CACHE_PATH = ".llm_cache/responses.sqlite"
+DEFAULT_MAX_MB = 512
+
+EVICT_EVERY_N_PUTS = 200
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a request has no stored response."""
+
+
+def cache_key(**request) -> str:
+    # model, input, temperature and max_output_tokens are the core of the key;
+    # any other request kwargs (e.g. a response format) are folded in too so
+    # two different requests can never share an entry.
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _usage_dict(r) -> dict | None:
+    usage = getattr(r, "usage", None)
+    if usage is None:
+        return None
+    if hasattr(usage, "model_dump"):
+        return usage.model_dump()
+    return dict(usage) if isinstance(usage, dict) else None
+
+
+def _to_namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in value.items()})
+    return value
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_CACHE_PATH,
+        max_bytes: int | None = None,
+        max_entries: int | None = None,
+        max_age_days: float | None = None,
+        replay: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.replay = replay
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                output_text TEXT NOT NULL,
+                usage TEXT,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+        if not replay:
+            self.evict()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output_text, usage FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.replay:
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+                self._conn.commit()
+        return {"output_text": row[0], "usage": json.loads(row[1]) if row[1] else None}
+
+    def put(self, key: str, output_text: str, model: str | None = None, usage: dict | None = None) -> None:
+        if self.replay:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, output_text, json.dumps(usage) if usage else None,
+                 len(output_text.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self.stores += 1
+            due = self.stores % EVICT_EVERY_N_PUTS == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under the size/count caps."""
+        removed = 0
+        with self._lock:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (cutoff,)
+                ).rowcount
+
+            if self.max_entries:
+                removed += self._conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                ).rowcount
+
+            if self.max_bytes:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    doomed = []
+                    for key, size in self._conn.execute(
+                        "SELECT key, size FROM responses ORDER BY last_access ASC"
+                    ):
+                        if total <= self.max_bytes:
+                            break
+                        doomed.append((key,))
+                        total -= size
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+                    removed += len(doomed)
+
+            self._conn.commit()
+            self.evicted += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evicted": self.evicted,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def cache_mode() -> str:
+    return os.getenv("LLM_CACHE_MODE", "on").strip().lower()
+
+
+@lru_cache(maxsize=None)
+def default_cache() -> ResponseCache:
+    """Process-wide cache configured from the LLM_CACHE_* environment variables."""
+    max_mb = float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_MAX_MB))
+    max_age_days = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "0"))
+    return ResponseCache(
+        os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+        max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+        max_age_days=max_age_days or None,
+        replay=cache_mode() == "replay",
+    )
+
+
+def _cached_response(hit: dict) -> SimpleNamespace:
+    return SimpleNamespace(output_text=hit["output_text"], usage=_to_namespace(hit["usage"]), cached=True)
+
+
+class _CachedResponses:
+    def __init__(self, responses, cache: ResponseCache):
+        self._responses = responses
+        self._cache = cache
+
+    def create(self, **request):
+        key = cache_key(**request)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return _cached_response(hit)
+        if self._cache.replay:
+            raise CacheMiss(f"No cached response for request {key[:12]} (replay mode)")
+
+        r = self._responses.create(**request)
+        self._cache.put(key, getattr(r, "output_text", "") or "", request.get("model"), _usage_dict(r))
+        return r
+
+
+class _AsyncCachedResponses(_CachedResponses):
+    async def create(self, **request):
+        key = cache_key(**request)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return _cached_response(hit)
+        if self._cache.replay:
+            raise CacheMiss(f"No cached response for request {key[:12]} (replay mode)")
+
+        r = await self._responses.create(**request)
+        self._cache.put(key, getattr(r, "output_text", "") or "", request.get("model"), _usage_dict(r))
+        return r
+
+
+class CachedClient:
+    """Drop-in wrapper around OpenAI()/AsyncOpenAI(): only `responses.create` is cached."""
+
+    def __init__(self, client, cache: ResponseCache):
+        self._client = client
+        self.cache = cache
+        wrapper = _AsyncCachedResponses if is_async_client(client) else _CachedResponses
+        self.responses = wrapper(client.responses, cache)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def cached_client(client, cache: ResponseCache | None = None):
+    if cache is None and cache_mode() == "off":
+        return client
+    return CachedClient(client, cache or default_cache())
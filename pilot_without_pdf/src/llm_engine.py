@@ -0,0 +1,98 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Sequence
+
+from .rate_limit import AdaptiveLimiter, estimate_tokens
+
+# Async execution engine shared by the PDF extraction scripts and run_batch.
+# Callers pass an `async def call(item)` (usually wrapping AsyncOpenAI().responses.create)
+# and get results back in input order, whatever order the requests finished in.
+# Point OPENAI_BASE_URL at a local fake Responses server to exercise it offline.
+
+# estimate_tokens lives in rate_limit.py and is re-exported for existing callers
+__all__ = ["RateLimiter", "estimate_tokens", "iter_ordered", "gather_ordered", "run_ordered"]
+
+_END = object()
+
+
+class RateLimiter(AdaptiveLimiter):
+    """rpm/tpm budget for iter_ordered: AdaptiveLimiter's token buckets, awaited
+    instead of slept on, so run-level and client-level budgets behave the same."""
+
+    async def acquire(self, tokens: int = 0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def iter_ordered(
+    items: Iterable[Any],
+    call: Callable[[Any], Awaitable[Any]],
+    concurrency: int = 8,
+    rpm: int | None = None,
+    tpm: int | None = None,
+    tokens_for: Callable[[Any], int] | None = None,
+    window: int | None = None,
+    desc: str | None = None,
+    limiter: RateLimiter | None = None,
+) -> AsyncIterator[tuple[int, Any, Any]]:
+    """Yield (index, item, result) in input order with at most `concurrency` calls in flight.
+
+    `items` may be a lazy iterator (e.g. chunks streamed from a PDF); it is only
+    advanced while fewer than `window` items are in flight or waiting to be
+    yielded, so memory stays bounded and a slow consumer applies backpressure.
+    A call that raises yields its exception as the result instead of stopping the run.
+    Pass a shared `limiter` to budget several concurrent runs together (rpm/tpm are then ignored).
+    """
+    from tqdm import tqdm  # imported on first use: keeps `import src.*` fast
+
+    limiter = limiter or RateLimiter(rpm, tpm)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    window = window or max(1, concurrency) * 4
+    it = iter(items)
+    pending: dict[int, tuple[Any, asyncio.Task]] = {}
+    next_in = next_out = 0
+    exhausted = False
+    pbar = tqdm(total=len(items) if hasattr(items, "__len__") else None, desc=desc, disable=desc is None)
+
+    async def run(item: Any) -> Any:
+        async with sem:
+            await limiter.acquire(tokens_for(item) if tokens_for else 0)
+            try:
+                return await call(item)
+            except Exception as e:
+                return e
+
+    try:
+        while True:
+            while not exhausted and next_in - next_out < window:
+                # the source may block (PDF parsing), so pull it off the event loop
+                item = await asyncio.to_thread(next, it, _END)
+                if item is _END:
+                    exhausted = True
+                    break
+                pending[next_in] = (item, asyncio.create_task(run(item)))
+                next_in += 1
+
+            if next_out == next_in:
+                return
+
+            item, task = pending.pop(next_out)
+            result = await task
+            pbar.update(1)
+            yield next_out, item, result
+            next_out += 1
+    finally:
+        for _, task in pending.values():
+            task.cancel()
+        pbar.close()
+
+
+async def gather_ordered(items: Sequence[Any], call: Callable[[Any], Awaitable[Any]], **kwargs) -> list:
+    """Run `call(item)` for every item; returns one result (or exception) per item, in input order."""
+    kwargs.setdefault("window", len(items) or 1)
+    return [result async for _, _, result in iter_ordered(items, call, **kwargs)]
+
+
+def run_ordered(items: Sequence[Any], call: Callable[[Any], Awaitable[Any]], **kwargs) -> list:
+    """Synchronous entry point for scripts: asyncio.run(gather_ordered(...))."""
+    return asyncio.run(gather_ordered(list(items), call, **kwargs))
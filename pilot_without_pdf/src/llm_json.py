@@ -0,0 +1,377 @@
+import re
+import json
+import threading
+from collections import Counter
+from typing import Any, Iterable
+
+# One JSON-output path for every LLM call site.
+#
+# 1. Ask for structured output: with a schema the request carries
+#    text.format = json_schema (strict), otherwise json_object.
+# 2. Fast path: json.loads on the reply with code fences stripped.
+# 3. Local repair, no API call: cut trailing prose, drop trailing commas, close
+#    truncated strings/objects (e.g. replies cut off by max_output_tokens).
+# 4. Validate against the schema, after cheap coercions (missing keys -> null/[],
+#    enum spelling, scalar -> one-item list).
+# 5. Only if that still fails, re-ask once with the parser's complaint.
+#
+# PARSE_STATS counts which step each reply needed.
+
+PARSE_STATS: Counter = Counter()
+_stats_lock = threading.Lock()
+
+LIST_FIELDS = {"evidence_spans", "eligibility_rules", "application_process", "likely_instrument_types"}
+LIST_SUFFIXES = ("_spans", "_rules", "_list", "_steps")
+
+
+def _count(event: str) -> None:
+    with _stats_lock:
+        PARSE_STATS[event] += 1
+
+
+# ---------- schema helpers ----------
+def nullable_string() -> dict:
+    return {"type": ["string", "null"]}
+
+
+def string_list() -> dict:
+    return {"type": "array", "items": {"type": "string"}}
+
+
+def enum_of(values: Iterable[str], nullable: bool = False) -> dict:
+    values = [v for v in dict.fromkeys(values) if v]
+    return {"type": ["string", "null"] if nullable else "string", "enum": values + ([None] if nullable else [])}
+
+
+def object_schema(properties: dict[str, dict]) -> dict:
+    # strict structured outputs require every property to be listed as required
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def schema_from_fields(fields: Iterable, enums: dict[str, list] | None = None) -> dict:
+    """Typed object schema from a list of field names (e.g. SCHEMA_FIELDS).
+
+    Fields in `enums` are restricted to those values; plural rule/span style
+    fields become list[string]; everything else is string|null.
+    """
+    enums = enums or {}
+    props: dict[str, dict] = {}
+    for f in fields:
+        name = (f.get("name") or f.get("field")) if isinstance(f, dict) else f
+        if not name:
+            continue
+        name = str(name)
+        if name in enums:
+            props[name] = enum_of(enums[name])
+        elif name in LIST_FIELDS or name.endswith(LIST_SUFFIXES):
+            props[name] = string_list()
+        else:
+            props[name] = nullable_string()
+    return object_schema(props)
+
+
+def structured_format(schema: dict | None, name: str = "result") -> dict:
+    """Value for responses.create(text=...): json_schema when a schema is given, else json_object."""
+    if schema is None:
+        return {"format": {"type": "json_object"}}
+    return {"format": {"type": "json_schema", "name": name, "schema": schema, "strict": True}}
+
+
+# ---------- parsing + repair ----------
+def strip_fences(raw: str) -> str:
+    clean = raw.strip()
+    clean = re.sub(r"^```(?:json)?\s*", "", clean, flags=re.IGNORECASE)
+    clean = re.sub(r"\s*```$", "", clean)
+    return clean
+
+
+def _drop_trailing_comma(out: list[str]) -> None:
+    """Remove a comma (and nothing else) left just before a closing bracket."""
+    j = len(out)
+    while j and out[j - 1].isspace():
+        j -= 1
+    if j and out[j - 1] == ",":
+        del out[j - 1]
+
+
+def repair_json(text: str) -> str | None:
+    """Best-effort local repair of an LLM JSON reply.
+
+    Starts at the first { or [, stops after the matching close (dropping any
+    trailing prose), removes trailing commas, and closes strings / brackets
+    left open by a truncated reply. Returns None if there is no JSON to repair.
+    """
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return None
+
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = escaped = False
+    for ch in text[start:]:
+        out.append(ch)
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            out.pop()
+            if not stack or stack[-1] != ch:
+                continue  # stray closer
+            _drop_trailing_comma(out)
+            out.append(ch)
+            stack.pop()
+            if not stack:
+                break
+
+    repaired = "".join(out)
+    if stack:
+        if escaped:
+            repaired = repaired[:-1]
+        if in_string:
+            repaired += '"'
+        if stack[-1] == "}":
+            # inside an object a trailing string after { or , is a key with no value
+            repaired = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', r"\1", repaired)
+        repaired = re.sub(r"[,:]\s*$", "", repaired)
+        repaired += "".join(reversed(stack))
+    return repaired
+
+
+def parse_json(raw: str | None) -> tuple[Any, str]:
+    """Return (value, how) with how in {"fast", "repaired"}; value is None if nothing parses."""
+    if not raw:
+        return None, "empty"
+    clean = strip_fences(raw)
+    try:
+        return json.loads(clean), "fast"
+    except json.JSONDecodeError:
+        pass
+    repaired = repair_json(clean)
+    if repaired is not None:
+        try:
+            return json.loads(repaired), "repaired"
+        except json.JSONDecodeError:
+            pass
+    return None, "invalid"
+
+
+# ---------- validation ----------
+_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "number": (int, float), "integer": int, "null": type(None),
+}
+
+
+def _type_ok(value: Any, types: list[str]) -> bool:
+    for t in types:
+        if t in ("number", "integer") and isinstance(value, bool):
+            continue
+        if isinstance(value, _TYPES[t]):
+            return True
+    return False
+
+
+def _norm(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", s.lower()).strip("_")
+
+
+def _coerce(value: Any, schema: dict) -> Any:
+    types = schema.get("type", [])
+    types = [types] if isinstance(types, str) else types
+
+    if "object" in types and isinstance(value, dict):
+        props = schema.get("properties", {})
+        out = {k: _coerce(v, props[k]) if k in props else v for k, v in value.items()}
+        for k in schema.get("required", []):
+            if k not in out:
+                sub = props.get(k, {})
+                sub_types = sub.get("type", [])
+                out[k] = [] if sub_types == "array" or "array" in sub_types else None
+        if schema.get("additionalProperties") is False:
+            out = {k: v for k, v in out.items() if k in props}
+        return out
+    if "array" in types:
+        if value is None and "null" not in types:
+            return []
+        if isinstance(value, (str, dict)):
+            value = [value]
+        if isinstance(value, list) and "items" in schema:
+            return [_coerce(v, schema["items"]) for v in value]
+        return value
+    if "enum" in schema and isinstance(value, str) and value not in schema["enum"]:
+        by_norm = {_norm(e): e for e in schema["enum"] if isinstance(e, str)}
+        return by_norm.get(_norm(value), value)
+    if "number" in types and isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def validate(value: Any, schema: dict, path: str = "$") -> list[str]:
+    """Errors for the JSON-schema subset used here (type, enum, properties, required, items, min/max)."""
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not _type_ok(value, types):
+            return [f"{path}: expected {'|'.join(types)}, got {type(value).__name__}"]
+    errors: list[str] = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} not in {schema['enum']}")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: {value} < {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: {value} > {schema['maximum']}")
+    if isinstance(value, dict):
+        props = schema.get("properties", {})
+        for k in schema.get("required", []):
+            if k not in value:
+                errors.append(f"{path}.{k}: missing")
+        for k, v in value.items():
+            if k in props:
+                errors.extend(validate(v, props[k], f"{path}.{k}"))
+    if isinstance(value, list) and "items" in schema:
+        for i, v in enumerate(value):
+            errors.extend(validate(v, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def conform(value: Any, schema: dict) -> tuple[Any, list[str]]:
+    """Coerce + validate an already parsed value: (value, errors)."""
+    value = _coerce(value, schema)
+    return value, validate(value, schema)
+
+
+def check(raw: str | None, schema: dict | None = None, expect: type = dict) -> tuple[Any, list[str], str]:
+    """Parse + coerce + validate one reply: (value, errors, how)."""
+    value, how = parse_json(raw)
+    if value is None:
+        return None, ["not valid JSON"], how
+    if schema is not None:
+        return (*conform(value, schema), how)
+    if not isinstance(value, expect):
+        return value, [f"expected a JSON {expect.__name__}"], how
+    return value, [], how
+
+
+# ---------- calling ----------
+def response_text(r) -> str:
+    raw = getattr(r, "output_text", None)
+    if not raw:
+        try:
+            raw = r.output[0].content[0].text
+        except Exception:
+            raw = str(r)
+    return raw
+
+
+REASK_TEMPLATE = """
+
+Your previous reply could not be used: {problem}
+Previous reply:
+{previous}
+
+Reply again with ONLY the corrected JSON."""
+
+
+def _reask_input(request: dict, raw: str, errors: list[str]) -> dict:
+    problem = "; ".join(errors[:5])
+    return {**request, "input": request["input"] + REASK_TEMPLATE.format(problem=problem, previous=raw[:2000])}
+
+
+def _finish(raw: str, value: Any, errors: list[str], how: str, reasked: bool = False) -> Any:
+    if value is None or (errors and not isinstance(value, dict)):
+        _count("failed")
+        return {"error": "Invalid JSON", "raw_output": strip_fences(raw or "")[:1000]}
+    _count("reasked" if reasked else how)
+    if errors:
+        # usable JSON that still misses the schema: keep it, but say why
+        _count("schema_errors")
+        value["schema_errors"] = errors[:10]
+    return value
+
+
+def _request(request: dict, schema: dict | None, schema_name: str, structured: bool) -> dict:
+    if structured and "text" not in request:
+        return {**request, "text": structured_format(schema, schema_name)}
+    return request
+
+
+def call_json(
+    client,
+    schema: dict | None = None,
+    schema_name: str = "result",
+    structured: bool = True,
+    reask: bool = True,
+    on_response=None,
+    **request,
+) -> Any:
+    """responses.create(**request) -> parsed JSON, or {"error": "Invalid JSON", "raw_output": ...}."""
+    request = _request(request, schema, schema_name, structured)
+    r = client.responses.create(**request)
+    if on_response is not None:
+        on_response(r)
+    raw = response_text(r)
+    value, errors, how = check(raw, schema)
+    if errors and reask:
+        r = client.responses.create(**_reask_input(request, raw, errors))
+        if on_response is not None:
+            on_response(r)
+        raw2 = response_text(r)
+        value2, errors2, how2 = check(raw2, schema)
+        if value2 is not None and (value is None or len(errors2) < len(errors)):
+            return _finish(raw2, value2, errors2, how2, reasked=True)
+    return _finish(raw, value, errors, how)
+
+
+async def acall_json(
+    aclient,
+    schema: dict | None = None,
+    schema_name: str = "result",
+    structured: bool = True,
+    reask: bool = True,
+    on_response=None,
+    **request,
+) -> Any:
+    """Async twin of call_json for AsyncOpenAI clients."""
+    request = _request(request, schema, schema_name, structured)
+    r = await aclient.responses.create(**request)
+    if on_response is not None:
+        on_response(r)
+    raw = response_text(r)
+    value, errors, how = check(raw, schema)
+    if errors and reask:
+        r = await aclient.responses.create(**_reask_input(request, raw, errors))
+        if on_response is not None:
+            on_response(r)
+        raw2 = response_text(r)
+        value2, errors2, how2 = check(raw2, schema)
+        if value2 is not None and (value is None or len(errors2) < len(errors)):
+            return _finish(raw2, value2, errors2, how2, reasked=True)
+    return _finish(raw, value, errors, how)
+
+
+def parse_reply(raw: str | None, schema: dict | None = None) -> Any:
+    """Parse a reply obtained elsewhere (e.g. a Batch API output line); no re-ask."""
+    return _finish(raw or "", *check(raw, schema))
+
+
+def parse_stats() -> dict:
+    with _stats_lock:
+        return dict(PARSE_STATS)
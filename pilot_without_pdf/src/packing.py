@@ -0,0 +1,94 @@
+import json
+from typing import Sequence
+
+from .chunking import count_tokens
+from .llm_json import conform, parse_json, strip_fences
+
+# Pack many short snippets into one request so the shared instructions /
+# few-shot prefix is paid once per pack instead of once per snippet.
+# The model answers with a JSON array keyed by id; ids that are missing,
+# malformed or (given a schema) invalid come back from parse_packed_output()
+# so callers can re-run them one at a time.
+
+PACK_SUFFIX = """
+
+Now process EACH of the texts below independently.
+Return ONLY a JSON array with exactly one object per text (any order).
+Each object must contain "id" (copied from the input) plus the keys described above.
+
+Texts (one JSON object per line):
+{items}
+
+JSON array:
+"""
+
+
+def _item_line(i: int, text: str) -> str:
+    return json.dumps({"id": i, "text": text}, ensure_ascii=False)
+
+
+def plan_packs(
+    texts: Sequence[str],
+    prefix: str,
+    token_budget: int = 6000,
+    output_tokens_per_item: int = 120,
+    max_items: int = 25,
+) -> list[list[int]]:
+    """Greedy packing of text indices so that prompt + expected output stay under token_budget."""
+    base = count_tokens(prefix + PACK_SUFFIX)
+    packs: list[list[int]] = []
+    cur: list[int] = []
+    used = base
+    for i, text in enumerate(texts):
+        cost = count_tokens(_item_line(i, text)) + output_tokens_per_item
+        if cur and (used + cost > token_budget or len(cur) >= max_items):
+            packs.append(cur)
+            cur, used = [], base
+        cur.append(i)
+        used += cost
+    if cur:
+        packs.append(cur)
+    return packs
+
+
+def build_packed_prompt(prefix: str, texts: Sequence[str], indices: list[int]) -> str:
+    items = "\n".join(_item_line(i, texts[i]) for i in indices)
+    return prefix + PACK_SUFFIX.format(items=items)
+
+
+def parse_packed_output(
+    raw: str, expected: list[int], schema: dict | None = None
+) -> tuple[dict[int, dict], list[int]]:
+    """Return ({id: result}, missing_ids). Results have their "id" key removed.
+
+    With `schema`, each result is coerced and validated like a single reply
+    (llm_json.conform); results that still break it count as missing.
+    """
+    data, how = parse_json(raw)
+    clean = strip_fences(raw or "")
+    if how == "repaired" and isinstance(data, list) and data and clean.rfind("]") < clean.rfind("{"):
+        # reply was cut off inside the array: keep the completed objects only
+        data = data[:-1]
+
+    if isinstance(data, dict):
+        # tolerate {"results": [...]} style wrappers
+        data = next((v for v in data.values() if isinstance(v, list)), None)
+
+    wanted = set(expected)
+    got: dict[int, dict] = {}
+    for obj in data if isinstance(data, list) else []:
+        if not isinstance(obj, dict):
+            continue
+        try:
+            i = int(obj.pop("id"))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if i not in wanted or i in got:
+            continue
+        if schema is not None:
+            obj, errors = conform(obj, schema)
+            if errors:
+                continue
+        got[i] = obj
+
+    return got, [i for i in expected if i not in got]
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+# Page-level PDF text extraction shared by the pilot_with_pdf scripts.
+# Page ranges are sharded across a process pool and streamed back in page
+# order; every extracted page is stored under (pdf sha256, page index) so the
+# analysis, naive and after-analysis scripts only ever parse a PDF once.
+
+PAGE_CACHE_PATH = Path("pilot_with_pdf/data/cache/page_text.sqlite")
+SHARD_PAGES = 8
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class PageTextCache:
+    def __init__(self, path: str | Path = PAGE_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                pdf_sha256 TEXT NOT NULL,
+                page_index INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (pdf_sha256, page_index)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents (pdf_sha256 TEXT PRIMARY KEY, page_count INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def page_count(self, sha: str) -> int | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count FROM documents WHERE pdf_sha256 = ?", (sha,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, sha: str, n: int) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)", (sha, n))
+            self._conn.commit()
+
+    def get_range(self, sha: str, start: int, end: int) -> dict[int, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_index, text FROM pages WHERE pdf_sha256 = ? AND page_index >= ? AND page_index < ?",
+                (sha, start, end),
+            ).fetchall()
+        return dict(rows)
+
+    def put_many(self, sha: str, pages: list[tuple[int, str]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                [(sha, i, text) for i, text in pages],
+            )
+            self._conn.commit()
+
+
+def _extract_range(path: str, start: int, end: int) -> list[str]:
+    # Runs in a worker process: open the PDF once per shard
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _count_pages(path: Path) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _shards(missing: list[int], shard_pages: int) -> list[tuple[int, int]]:
+    """Group sorted page indices into contiguous [start, end) runs of <= shard_pages."""
+    shards = []
+    for i in missing:
+        if shards and shards[-1][1] == i and shards[-1][1] - shards[-1][0] < shard_pages:
+            shards[-1] = (shards[-1][0], i + 1)
+        else:
+            shards.append((i, i + 1))
+    return shards
+
+
+def iter_pages(
+    path: Path,
+    start: int = 0,
+    end: int | None = None,
+    workers: int | None = None,
+    shard_pages: int = SHARD_PAGES,
+    cache: PageTextCache | None = None,
+) -> Iterator[tuple[int, str]]:
+    """Yield (page_index, text) for pages [start, end) in page order.
+
+    Cached pages are served from disk; the rest are parsed in parallel, with at
+    most 2 shards per worker in flight so memory stays bounded on big PDFs.
+    """
+    cache = cache or PageTextCache()
+    sha = file_sha256(path)
+    total = _cached_page_count(path, sha, cache)
+    end = total if end is None else min(end, total)
+
+    cached = cache.get_range(sha, start, end)
+    shards = deque(_shards([i for i in range(start, end) if i not in cached], shard_pages))
+    workers = workers or min(os.cpu_count() or 1, 8)
+
+    if workers <= 1 or len(shards) <= 1:
+        pool = None
+        submit = lambda s, e: _Deferred(_extract_range, str(path), s, e)
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(shards)))
+        submit = lambda s, e: pool.submit(_extract_range, str(path), s, e)
+
+    in_flight: deque = deque()
+
+    def top_up():
+        while shards and len(in_flight) < workers * 2:
+            s, e = shards.popleft()
+            in_flight.append((s, e, submit(s, e)))
+
+    try:
+        top_up()
+        i = start
+        while i < end:
+            if i in cached:
+                yield i, cached.pop(i)
+                i += 1
+                continue
+
+            s, e, fut = in_flight.popleft()
+            texts = fut.result()
+            top_up()
+            pages = list(zip(range(s, e), texts))
+            cache.put_many(sha, pages)
+            yield from pages
+            i = e
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+class _Deferred:
+    """Future-like wrapper so the serial path parses a shard only when it is needed."""
+
+    def __init__(self, fn, *args):
+        self._fn = fn
+        self._args = args
+
+    def result(self):
+        return self._fn(*self._args)
+
+
+def _cached_page_count(path: Path, sha: str, cache: PageTextCache) -> int:
+    total = cache.page_count(sha)
+    if total is None:
+        total = _count_pages(path)
+        cache.set_page_count(sha, total)
+    return total
+
+
+def pdf_page_count(path: Path, cache: PageTextCache | None = None) -> int:
+    return _cached_page_count(path, file_sha256(path), cache or PageTextCache())
+
+
+def pdf_to_text_limited(path: Path, skip_first: int = 8, max_pages: int = 5) -> str:
+    total_pages = pdf_page_count(path)
+    start = skip_first
+    end = min(skip_first + max_pages, total_pages)
+
+    print(f"Total pages in PDF: {total_pages}")
+    print(f"Using pages {start} to {end - 1}")
+
+    return "\n".join(text for _, text in iter_pages(path, start, end))
@@ -0,0 +1,200 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from .pdf_pages import file_sha256, iter_pages, pdf_page_count
+from .streaming import JsonlSink, iter_chunks, jsonl_to_csv, stream_to_sink
+from .checkpoint import RunManifest, compact_jsonl
+from .chunking import Chunk, iter_structured_chunks
+from .prefilter import KeywordPrefilter
+from .dedup import ChunkDeduper
+from .incremental import PlanTracker
+from .evidence import EvidenceVerifier, PageIndex
+from .instrumentation import RECORDER
+from .columnar import jsonl_to_parquet
+
+# Shared PDF -> rows pipeline for the pilot_with_pdf extraction scripts:
+# stream pages -> chunks -> `call(chunk)` -> JSONL/CSV, checkpointed per chunk.
+#
+# chunker="structure" (default) packs paragraph/heading blocks under a token
+# budget and adds page/char provenance to every row; chunker="chars" keeps the
+# original fixed-width character windows (chunk_text).
+#
+# With a `prefilter`, chunks scoring below its keyword-density threshold are
+# written as `skipped_row` (labelled locally, no API call).
+#
+# extract_pdf_async() is the same pipeline as a coroutine, so the corpus
+# runner can drive several documents on one event loop.
+#
+# With a `dedup` (ChunkDeduper), chunks that are near-duplicates of one already
+# sent (MinHash/LSH over word shingles) reuse its result instead of a new call;
+# their rows carry dedup_of / dedup_similarity next to their own provenance.
+#
+# With a `plan` (PlanTracker), rows carry the taxonomy plan's fingerprint and a
+# new run for a changed plan starts from the previous run's rows: only chunks
+# whose label or fields the change touches are sent again (src/incremental.py).
+#
+# With a `verifier` (EvidenceVerifier), the finished rows' evidence spans are
+# looked up in the page text (cached pages, no API call); rows whose spans are
+# not found get reextract=True and count as failed for --retry-errors.
+#
+# With a `parquet_dir`, the finished rows are also written as one typed part
+# file of the Parquet dataset there (src/columnar.py), partitioned by doc_id
+# and run date.
+#
+# Page extraction, chunking and the CSV/Parquet writes are timed into RECORDER
+# (src/instrumentation.py) as "pdf_pages", "chunk", "csv_write", "parquet_write".
+
+
+def iter_pdf_chunks(
+    pdf_path: Path,
+    start: int,
+    end: int,
+    chunker: str = "structure",
+    max_tokens: int = 1000,
+    overlap_tokens: int = 0,
+    max_chars: int = 4000,
+    overlap: int = 300,
+):
+    pages = RECORDER.timed_iter("pdf_pages", iter_pages(pdf_path, start, end))
+    if chunker == "structure":
+        return RECORDER.timed_iter("chunk", iter_structured_chunks(pages, max_tokens, overlap_tokens))
+    if chunker == "chars":
+        return RECORDER.timed_iter("chunk", iter_chunks((text for _, text in pages), max_chars, overlap))
+    raise ValueError(f"Unknown chunker: {chunker!r}")
+
+
+def _chunk_text(chunk: Chunk | str) -> str:
+    return chunk.text if isinstance(chunk, Chunk) else chunk
+
+
+async def extract_pdf_async(
+    pdf_path: Path,
+    out_csv: Path,
+    call: Callable[[str], Awaitable[Any]],
+    prompt_hash: str,
+    skip_first: int = 8,
+    max_pages: int = 15,
+    chunker: str = "structure",
+    max_tokens: int = 1000,
+    overlap_tokens: int = 0,
+    max_chars: int = 4000,
+    overlap: int = 300,
+    retry_errors: bool = False,
+    fresh: bool = False,
+    tokens_for: Callable[[str], int] | None = None,
+    prefilter: KeywordPrefilter | None = None,
+    skipped_row: dict | None = None,
+    dedup: ChunkDeduper | None = None,
+    plan: PlanTracker | None = None,
+    verifier: EvidenceVerifier | None = None,
+    parquet_dir: Path | None = None,
+    doc_id: str | None = None,
+    verbose: bool = True,
+    **engine_kwargs,
+) -> RunManifest:
+    log = print if verbose else (lambda *a, **k: None)
+    total_pages = pdf_page_count(pdf_path)
+    start, end = skip_first, min(skip_first + max_pages, total_pages)
+    log(f"Total pages in PDF: {total_pages}")
+    log(f"Using pages {start} to {end - 1}")
+
+    chunk_params = {"skip_first": skip_first, "max_pages": max_pages, "chunker": chunker}
+    if chunker == "structure":
+        chunk_params.update(max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+    else:
+        chunk_params.update(max_chars=max_chars, overlap=overlap)
+    if prefilter is not None:
+        chunk_params["prefilter_threshold"] = prefilter.threshold
+    if dedup is not None:
+        chunk_params["dedup_threshold"] = dedup.index.threshold
+    manifest = RunManifest.open(
+        file_sha256(pdf_path), chunk_params, prompt_hash,
+        out_jsonl=out_csv.with_suffix(".jsonl"), out_csv=out_csv, fresh=fresh,
+        extra={"plan": plan.meta()} if plan is not None else None,
+    )
+    if plan is not None and not fresh and not manifest.resumed:
+        # a new run: start from the previous plan's rows where the change does not touch them
+        seeded = plan.seed(manifest)
+        manifest.update_meta(incremental=seeded)
+        if seeded["previous_run"] is not None:
+            log(f"Taxonomy plan changed since run {seeded['previous_run']}: "
+                f"{seeded['carried']} rows carried, re-running {seeded['rerun']}")
+    elif manifest.resumed:
+        log(f"Resuming run {manifest.meta['run_key']}: {manifest.summary()}"
+              f"{' (retrying failed chunks)' if retry_errors else ''}")
+
+    chunks = iter_pdf_chunks(pdf_path, start, end, chunker, max_tokens, overlap_tokens, max_chars, overlap)
+    todo = (
+        (chunk_id, (chunk_id, chunk))
+        for chunk_id, chunk in enumerate(chunks)
+        if not manifest.should_skip(chunk_id, retry_errors)
+    )
+    dedup_doc = doc_id or Path(pdf_path).stem
+
+    async def call_chunk(item: tuple[int, Chunk | str]):
+        chunk_id, chunk = item
+        text = _chunk_text(chunk)
+        if prefilter is not None and not prefilter.should_send(text):
+            out = {**(skipped_row or {}), "prefiltered": True}
+        elif dedup is not None:
+            out = await dedup.call((dedup_doc, chunk_id), text, call)
+        else:
+            out = await call(text)
+        if isinstance(out, dict):
+            if plan is not None:
+                plan.stamp(out)
+            if prefilter is not None:
+                out["keyword_score"] = prefilter.score(text)
+            if isinstance(chunk, Chunk):
+                out.update(chunk.provenance())
+        return out
+
+    try:
+        with JsonlSink(manifest.out_jsonl, append=manifest.resumed) as sink:
+            n = await stream_to_sink(
+                todo, call_chunk, sink,
+                on_row=manifest.record,
+                tokens_for=(lambda item: tokens_for(_chunk_text(item[1]))) if tokens_for else None,
+                **engine_kwargs,
+            )
+    finally:
+        manifest.close()
+
+    def finish():
+        if manifest.resumed:
+            # resumed rows were appended out of order and retried chunks appear twice
+            compact_jsonl(manifest.out_jsonl)
+        if verifier is not None:
+            with RECORDER.span("evidence_check"):
+                index = PageIndex(iter_pages(pdf_path, start, end))
+                manifest.flag(verifier.verify_jsonl(manifest.out_jsonl, index))
+        with RECORDER.span("csv_write"):
+            jsonl_to_csv(manifest.out_jsonl, manifest.out_csv)
+        if parquet_dir is not None:
+            with RECORDER.span("parquet_write"):
+                # one part per run, dated by when the run started: finishing
+                # (or resuming) the same run again replaces it
+                return jsonl_to_parquet(
+                    manifest.out_jsonl, parquet_dir, doc_id or Path(pdf_path).stem,
+                    run_date=manifest.meta["created_at"][:10], part=manifest.meta["run_key"],
+                )
+        return None
+
+    parquet_path = await asyncio.to_thread(finish)
+
+    log(f"Processed {n} chunks this run; totals: {manifest.summary()}")
+    if parquet_path is not None:
+        log(f"Parquet: {parquet_path}")
+    if prefilter is not None:
+        log("Keyword prefilter:", prefilter.report())
+    if dedup is not None:
+        log("Near-duplicate chunks:", dedup.report())
+    if verifier is not None:
+        log("Evidence check:", verifier.report())
+    return manifest
+
+
+def run_pdf_extraction(*args, **kwargs) -> RunManifest:
+    """Synchronous entry point for the extraction scripts: asyncio.run(extract_pdf_async(...))."""
+    return asyncio.run(extract_pdf_async(*args, **kwargs))
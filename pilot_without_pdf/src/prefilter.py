@@ -0,0 +1,62 @@
+import re
+from collections import Counter
+
+# Local keyword prefilter: score each chunk for policy-instrument vocabulary
+# with one compiled regex, and label chunks below a threshold "other" without
+# calling the LLM. Narrative-heavy blueprints (vision, statistics, context)
+# are mostly skipped; chunks that mention schemes, funding or rules are sent.
+
+# The keyword list of run_pdf_analysis.py's frequency scan; the prefilter counts
+# the same words (plus inflections, see below) so both measure one vocabulary.
+KEYWORD_SCAN = [
+    "grant", "fund", "funding", "scheme",
+    "subsidy", "loan", "tax", "incentive",
+    "standard", "procurement", "regulation",
+    "eligible", "million", "HK$"
+]
+
+DEFAULT_THRESHOLD = 1.0  # keyword hits per 1,000 characters
+
+
+class KeywordPrefilter:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, keywords: list[str] = KEYWORD_SCAN):
+        self.threshold = threshold
+        # Whole words plus common inflections ("fund" -> "funds"/"funded", not
+        # "fundamental"; "subsidy" -> "subsidies"); symbol-terminated keywords
+        # like "HK$" match as prefixes.
+        plurals = [k[:-1] + "ies" for k in keywords if len(k) > 2 and k.endswith("y")]
+        ordered = sorted(set(keywords) | set(plurals), key=len, reverse=True)
+        words = "|".join(re.escape(k) for k in ordered if k[-1].isalnum())
+        symbols = "|".join(re.escape(k) for k in ordered if not k[-1].isalnum())
+        parts = [rf"(?<!\w)(?:{words})(?:s|es|ed|ing)?(?!\w)"] if words else []
+        if symbols:
+            parts.append(rf"(?<!\w)(?:{symbols})")
+        self._pattern = re.compile("|".join(parts), re.IGNORECASE)
+        self.sent = 0
+        self.skipped = 0
+
+    def counts(self, text: str) -> Counter:
+        return Counter(m.group(0).lower() for m in self._pattern.finditer(text))
+
+    def score(self, text: str) -> float:
+        if not text:
+            return 0.0
+        hits = sum(1 for _ in self._pattern.finditer(text))
+        return round(hits * 1000 / len(text), 3)
+
+    def should_send(self, text: str) -> bool:
+        send = self.score(text) >= self.threshold
+        if send:
+            self.sent += 1
+        else:
+            self.skipped += 1
+        return send
+
+    def report(self) -> dict:
+        total = self.sent + self.skipped
+        return {
+            "threshold": self.threshold,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "skipped_ratio": round(self.skipped / total, 3) if total else 0.0,
+        }
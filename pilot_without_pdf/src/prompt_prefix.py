@@ -0,0 +1,113 @@
+import json
+import hashlib
+import threading
+from typing import Iterable
+
+from .chunking import count_tokens
+
+# Byte-stable prompt prefixes for provider-side prompt caching.
+#
+# OpenAI caches the longest previously-seen prompt prefix (in 128-token steps,
+# once the prompt is at least 1,024 tokens), so every request for a run should
+# start with exactly the same bytes: instructions, taxonomy, schema and
+# examples first, the chunk last. PromptPrefix normalises those sections and
+# exposes a hash of the result; PromptCacheStats reads
+# usage.input_tokens_details.cached_tokens back from each response so the
+# hit rate can be checked rather than assumed.
+
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def stable_list(values: Iterable) -> str:
+    """Render a list for a prompt the same way every time: stripped, de-duplicated, JSON."""
+    seen: list[str] = []
+    for v in values:
+        v = str(v).strip() if v is not None else ""
+        if v and v not in seen:
+            seen.append(v)
+    return json.dumps(seen, ensure_ascii=False)
+
+
+def _normalize(section: str) -> str:
+    lines = section.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+class PromptPrefix:
+    """The static head of a prompt. render(dynamic) appends the per-request part."""
+
+    def __init__(self, *sections: str, separator: str = "\n\n"):
+        self.text = separator.join(_normalize(s) for s in sections if s and s.strip())
+        self.sha256 = hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+        self.n_tokens = count_tokens(self.text)
+
+    @property
+    def cache_key(self) -> str:
+        # sent as prompt_cache_key so requests sharing this prefix are routed together
+        return f"prefix-{self.sha256[:16]}"
+
+    @property
+    def cacheable(self) -> bool:
+        return self.n_tokens >= MIN_CACHEABLE_TOKENS
+
+    def render(self, dynamic: str) -> str:
+        return self.text + dynamic
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def _field(obj, name: str):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class PromptCacheStats:
+    """Accumulates input / cached-input token counts across responses (thread-safe)."""
+
+    def __init__(self, prefix: PromptPrefix | None = None):
+        self.prefix = prefix
+        self.requests = 0
+        self.local_hits = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.requests_with_hit = 0
+        self._lock = threading.Lock()
+
+    def record(self, r) -> int:
+        """Record one response; returns its cached-input token count."""
+        if getattr(r, "cached", False):
+            # served by the local response cache, so no provider call was made
+            with self._lock:
+                self.local_hits += 1
+            return 0
+
+        usage = _field(r, "usage")
+        input_tokens = _field(usage, "input_tokens") or 0
+        cached = _field(_field(usage, "input_tokens_details"), "cached_tokens") or 0
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached
+            self.requests_with_hit += 1 if cached else 0
+        return cached
+
+    def report(self) -> dict:
+        out = {
+            "requests": self.requests,
+            "local_cache_hits": self.local_hits,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.input_tokens, 3) if self.input_tokens else 0.0,
+            "requests_with_hit": self.requests_with_hit,
+        }
+        if self.prefix is not None:
+            out.update({
+                "prefix_sha256": self.prefix.sha256[:16],
+                "prefix_tokens": self.prefix.n_tokens,
+                "prefix_cacheable": self.prefix.cacheable,
+            })
+        return out
@@ -0,0 +1,330 @@
+import re
+import time
+import random
+import asyncio
+import threading
+from collections import Counter
+
+from .wrapping import is_async_client
+
+# Header-driven rate limiting + retries for OpenAI()/AsyncOpenAI().
+#
+# rate_limited_client(client) wraps `responses.create` so that every call:
+#   1. reserves one request and its estimated tokens from two token buckets
+#      (RPM / TPM) shared by all threads and coroutines using the client;
+#   2. reads x-ratelimit-{limit,remaining,reset}-{requests,tokens} from the
+#      response and re-syncs the buckets with what the server reports;
+#   3. retries only 429 / 408 / 409 / 5xx / timeouts / connection errors,
+#      with full-jitter exponential backoff (or retry-after when given); a 429
+#      pauses every worker, not just the one that hit it;
+#   4. updates live metrics (client.metrics.snapshot()).
+# Everything else (bad request, auth, CacheMiss, ...) is raised immediately.
+# The SDK's own retries are switched off so the two don't stack.
+#
+# AdaptiveLimiter is also the budget behind llm_engine.RateLimiter (run_ordered's
+# rpm/tpm), which awaits the same reservations instead of sleeping.
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose; good enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def parse_reset(value: str | None) -> float | None:
+    """Seconds from an x-ratelimit-reset-* value such as "20ms", "1s", "6m0s", "1h2m3.5s"."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for num, unit in re.findall(r"([\d.]+)\s*(ms|h|m|s)", value):
+        total += float(num) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+        matched = True
+    return total if matched else None
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; reserve() returns how long to wait.
+
+    The balance may go negative: each caller reserves immediately and sleeps for
+    its share, so waiting workers are served in arrival order without polling.
+    capacity=None means "unknown" (no throttling) until the server reports a limit.
+    """
+
+    def __init__(self, capacity: float | None = None):
+        self.capacity = capacity
+        self.tokens = float(capacity or 0)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.capacity / 60)
+        self._last = now
+
+    def reserve(self, n: float = 1) -> float:
+        with self._lock:
+            if not self.capacity:
+                return 0.0
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= min(n, self.capacity)
+            return max(0.0, -self.tokens * 60 / self.capacity)
+
+    def sync(self, limit: float | None, remaining: float | None) -> None:
+        """Adopt the server's view: its limit, and never more headroom than it reports."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                if not self.capacity:
+                    self.tokens = float(limit)
+                self.capacity = float(limit)
+            if remaining is not None and self.capacity:
+                self.tokens = min(self.tokens, float(remaining))
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 6, base_delay: float = 0.5, max_delay: float = 60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            # small jitter so paused workers don't all wake in the same instant
+            return min(self.max_delay, retry_after) + random.uniform(0, 0.25)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def retry_reason(e: BaseException) -> str | None:
+    """Why `e` is worth retrying ("rate_limited", "server_error", "timeout", "connection"), or None."""
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        if status == 429:
+            return "rate_limited"
+        return "server_error" if status in RETRYABLE_STATUS else None
+    name = type(e).__name__
+    if isinstance(e, TimeoutError) or "Timeout" in name:
+        return "timeout"
+    if isinstance(e, ConnectionError) or name == "APIConnectionError":
+        return "connection"
+    return None
+
+
+def _headers_of(obj) -> dict:
+    headers = getattr(obj, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(obj, "response", None), "headers", None)
+    return {k.lower(): v for k, v in dict(headers or {}).items()}
+
+
+def _retry_after(headers: dict) -> float | None:
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            return None
+    return None
+
+
+def _float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def request_tokens(request: dict) -> int:
+    """What TPM accounting charges up front: prompt estimate + max_output_tokens."""
+    return estimate_tokens(str(request.get("input", ""))) + int(request.get("max_output_tokens") or 0)
+
+
+class LiveMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.retries: Counter = Counter()
+        self.throttle_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.ratelimit: dict = {}
+
+    def update(self, **deltas) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def retry(self, reason: str, delay: float) -> None:
+        with self._lock:
+            self.retries[reason] += 1
+            self.backoff_seconds += delay
+
+    def observe(self, headers: dict) -> None:
+        snap = {k[len("x-ratelimit-"):]: v for k, v in headers.items() if k.startswith("x-ratelimit-")}
+        if snap:
+            with self._lock:
+                self.ratelimit = snap
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return {
+                "requests": self.requests,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "retries": dict(self.retries),
+                "throttle_seconds": round(self.throttle_seconds, 2),
+                "backoff_seconds": round(self.backoff_seconds, 2),
+                "requests_per_min": round(self.succeeded * 60 / elapsed, 1),
+                "ratelimit": dict(self.ratelimit),
+            }
+
+
+class AdaptiveLimiter:
+    """RPM + TPM buckets plus a shared pause after 429s."""
+
+    def __init__(self, rpm: int | None = None, tpm: int | None = None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            return max(wait, self._pause_until - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def observe(self, headers: dict) -> None:
+        self.requests.sync(_float(headers.get("x-ratelimit-limit-requests")),
+                           _float(headers.get("x-ratelimit-remaining-requests")))
+        self.tokens.sync(_float(headers.get("x-ratelimit-limit-tokens")),
+                         _float(headers.get("x-ratelimit-remaining-tokens")))
+        remaining = _float(headers.get("x-ratelimit-remaining-requests"))
+        if remaining is not None and remaining <= 0:
+            reset = parse_reset(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self.pause(reset)
+
+
+class _RateLimitedResponses:
+    def __init__(self, responses, limiter: AdaptiveLimiter, policy: RetryPolicy, metrics: LiveMetrics):
+        self._responses = responses
+        self._raw = getattr(responses, "with_raw_response", None)
+        self._limiter = limiter
+        self._policy = policy
+        self._metrics = metrics
+
+    def _on_success(self, raw_or_response):
+        headers = _headers_of(raw_or_response)
+        self._limiter.observe(headers)
+        self._metrics.observe(headers)
+        self._metrics.update(succeeded=1)
+        return raw_or_response.parse() if hasattr(raw_or_response, "parse") else raw_or_response
+
+    def _on_error(self, e: Exception, attempt: int) -> float | None:
+        """Delay before retrying, or None to give up."""
+        reason = retry_reason(e)
+        if reason is None or attempt + 1 >= self._policy.max_attempts:
+            self._metrics.update(failed=1)
+            return None
+        headers = _headers_of(e)
+        self._limiter.observe(headers)
+        self._metrics.observe(headers)
+        delay = self._policy.delay(attempt, _retry_after(headers))
+        if reason == "rate_limited":
+            self._limiter.pause(delay)
+        self._metrics.retry(reason, delay)
+        return delay
+
+    def create(self, **request):
+        create = self._raw.create if self._raw is not None else self._responses.create
+        tokens = request_tokens(request)
+        self._metrics.update(requests=1)
+        for attempt in range(self._policy.max_attempts):
+            wait = self._limiter.reserve(tokens)
+            if wait > 0:
+                self._metrics.update(throttle_seconds=wait)
+                time.sleep(wait)
+            self._metrics.update(in_flight=1)
+            try:
+                return self._on_success(create(**request))
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._metrics.update(in_flight=-1)
+            time.sleep(delay)
+
+
+class _AsyncRateLimitedResponses(_RateLimitedResponses):
+    async def create(self, **request):
+        create = self._raw.create if self._raw is not None else self._responses.create
+        tokens = request_tokens(request)
+        self._metrics.update(requests=1)
+        for attempt in range(self._policy.max_attempts):
+            wait = self._limiter.reserve(tokens)
+            if wait > 0:
+                self._metrics.update(throttle_seconds=wait)
+                await asyncio.sleep(wait)
+            self._metrics.update(in_flight=1)
+            try:
+                return self._on_success(await create(**request))
+            except Exception as e:
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._metrics.update(in_flight=-1)
+            await asyncio.sleep(delay)
+
+
+class RateLimitedClient:
+    """Drop-in wrapper around OpenAI()/AsyncOpenAI(): only `responses.create` is throttled/retried."""
+
+    def __init__(self, client, limiter: AdaptiveLimiter, policy: RetryPolicy | None = None):
+        if hasattr(client, "with_options"):
+            client = client.with_options(max_retries=0)
+        self._client = client
+        self.limiter = limiter
+        self.metrics = LiveMetrics()
+        policy = policy or RetryPolicy()
+        wrapper = _AsyncRateLimitedResponses if is_async_client(client) else _RateLimitedResponses
+        self.responses = wrapper(client.responses, limiter, policy, self.metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def rate_limited_client(
+    client,
+    rpm: int | None = None,
+    tpm: int | None = None,
+    limiter: AdaptiveLimiter | None = None,
+    policy: RetryPolicy | None = None,
+) -> RateLimitedClient:
+    """Wrap `client`. rpm/tpm seed the buckets; the server's headers take over once seen.
+
+    Pass the same `limiter` to a sync and an async client to share one budget.
+    """
+    return RateLimitedClient(client, limiter or AdaptiveLimiter(rpm, tpm), policy)
+
@@ -0,0 +1,184 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Sequence
+
+from .chunking import Chunk, count_tokens
+from .prefilter import KeywordPrefilter
+
+# Representative chunk sample for document-level LLM steps (typology, taxonomy).
+#
+# Reading the first N characters of a long document only describes its opening
+# pages. RepresentativeSampler picks a sample of chunks from the whole document
+# under a fixed token budget, locally and deterministically:
+#
+#   strata     chunks are ranked by keyword density (KeywordPrefilter.score) and
+#              cut into `strata` equal-count bands (narrative ... instrument-
+#              heavy). Each band gets a share of the budget proportional to its
+#              size times its weight, so instrument-heavy text is over-sampled
+#              without dropping the narrative parts; unused budget rolls over
+#   diversity  inside a band, farthest-point selection over content-word sets:
+#              start from the densest chunk, then repeatedly take the chunk
+#              least similar (Jaccard) to everything already picked. The picks
+#              are cluster centres; every other chunk is counted towards its
+#              nearest pick, and `coverage` is the mean similarity of chunks to
+#              their nearest pick
+#
+# sample() returns chunk indices in document order (and leaves the pick each
+# chunk counts towards in `assignment`); pack_groups() packs them into
+# prompt-sized groups for parallel map calls. The "chunks" can be any texts,
+# e.g. one sample per document when choosing documents from a corpus.
+
+_CONTENT_WORD = re.compile(r"[^\W\d_]{4,}")
+
+
+def content_words(text: str) -> frozenset[str]:
+    return frozenset(w.lower() for w in _CONTENT_WORD.findall(text))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _text(chunk: Chunk | str) -> str:
+    return chunk.text if isinstance(chunk, Chunk) else chunk
+
+
+def _tokens(chunk: Chunk | str) -> int:
+    return chunk.n_tokens if isinstance(chunk, Chunk) else count_tokens(chunk)
+
+
+class RepresentativeSampler:
+    def __init__(
+        self,
+        budget_tokens: int = 12000,
+        strata: int = 3,
+        weights: Sequence[float] | None = None,
+        prefilter: KeywordPrefilter | None = None,
+    ):
+        self.budget_tokens = budget_tokens
+        self.strata = max(1, strata)
+        # low -> high keyword density; the densest band counts double by default
+        self.weights = list(weights) if weights is not None else [1.0] * (self.strata - 1) + [2.0]
+        if len(self.weights) != self.strata:
+            raise ValueError(f"{len(self.weights)} weights for {self.strata} strata")
+        self.prefilter = prefilter or KeywordPrefilter()
+        self.last: dict = {}
+        self.assignment: list[int | None] = []  # per chunk of the last sample(): the pick it counts towards
+
+    def stratify(self, scores: Sequence[float]) -> list[int]:
+        """Band of each score: equal-count cuts, with tied scores kept in one band."""
+        ranked = sorted(scores)
+        cuts = [ranked[len(ranked) * i // self.strata] for i in range(1, self.strata)]
+        return [bisect_left(cuts, s) for s in scores]
+
+    def _pick(self, members: list[int], words: list[frozenset], scores: list[float],
+              sizes: list[int], budget: int) -> list[int]:
+        """Farthest-point selection inside one band, under `budget` tokens."""
+        picked: list[int] = []
+        nearest = {i: 0.0 for i in members}  # similarity to the closest pick so far
+        first = max(members, key=lambda i: (scores[i], -i))
+        while True:
+            if not picked:
+                candidate = first if sizes[first] <= budget else None
+            else:
+                fits = [i for i in nearest if sizes[i] <= budget]
+                candidate = min(fits, key=lambda i: (nearest[i], -scores[i], i)) if fits else None
+                if candidate is not None and nearest[candidate] >= 1.0:
+                    break  # everything left repeats a pick
+            if candidate is None:
+                break
+            picked.append(candidate)
+            budget -= sizes[candidate]
+            del nearest[candidate]
+            for i in nearest:
+                nearest[i] = max(nearest[i], jaccard(words[i], words[candidate]))
+        return picked
+
+    def sample(self, chunks: Sequence[Chunk | str]) -> list[int]:
+        texts = [_text(c) for c in chunks]
+        sizes = [_tokens(c) for c in chunks]
+        scores = [self.prefilter.score(t) for t in texts]
+        bands = self.stratify(scores) if chunks else []
+        words = [content_words(t) for t in texts]
+
+        members: dict[int, list[int]] = {b: [] for b in range(self.strata)}
+        for i, b in enumerate(bands):
+            members[b].append(i)
+
+        if sum(sizes) <= self.budget_tokens:
+            chosen = list(range(len(chunks)))
+        else:
+            chosen = []
+            mass = sum(self.weights[b] * len(m) for b, m in members.items()) or 1.0
+            carry = 0
+            # densest band first, so what it leaves over goes to the narrative bands
+            for b in sorted(members, reverse=True):
+                if not members[b]:
+                    continue
+                budget = int(self.budget_tokens * self.weights[b] * len(members[b]) / mass) + carry
+                picked = self._pick(members[b], words, scores, sizes, budget)
+                chosen.extend(picked)
+                carry = budget - sum(sizes[i] for i in picked)
+            chosen.sort()
+
+        # every chunk counts towards its most similar pick (the cluster it belongs to)
+        cluster_sizes: Counter = Counter()
+        similarity = []
+        chosen_set = set(chosen)
+        self.assignment = [None] * len(chunks)
+        for i in range(len(chunks)):
+            if i in chosen_set:
+                best = i
+            else:
+                same_band = [j for j in chosen if bands[j] == bands[i]] or chosen
+                if not same_band:
+                    continue
+                best = max(same_band, key=lambda j: jaccard(words[i], words[j]))
+            self.assignment[i] = best
+            cluster_sizes[best] += 1
+            similarity.append(jaccard(words[i], words[best]))
+
+        pages = sorted({c.page_start for c in (chunks[i] for i in chosen) if isinstance(c, Chunk)})
+        self.last = {
+            "budget_tokens": self.budget_tokens,
+            "chunks": len(chunks),
+            "tokens": sum(sizes),
+            "sampled": len(chosen),
+            "sampled_tokens": sum(sizes[i] for i in chosen),
+            "strata": [
+                {
+                    "chunks": len(members[b]),
+                    "sampled": sum(1 for i in chosen if bands[i] == b),
+                    "min_score": min((scores[i] for i in members[b]), default=None),
+                }
+                for b in range(self.strata)
+            ],
+            "largest_clusters": [n for _, n in cluster_sizes.most_common(5)],
+            "coverage": round(sum(similarity) / len(similarity), 3) if similarity else None,
+            "pages": [pages[0], pages[-1]] if pages else None,
+            "pages_sampled": len(pages) if pages else None,
+        }
+        return chosen
+
+    def report(self) -> dict:
+        return dict(self.last)
+
+
+def pack_groups(chunks: Sequence[Chunk | str], indices: Sequence[int], group_tokens: int) -> list[list[int]]:
+    """Consecutive runs of `indices` of at most `group_tokens` tokens each (one oversized chunk forms its own group)."""
+    groups: list[list[int]] = []
+    current: list[int] = []
+    used = 0
+    for i in indices:
+        n = _tokens(chunks[i])
+        if current and used + n > group_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += n
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,141 @@
+import re
+import csv
+import json
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable, Iterator
+
+from .llm_engine import iter_ordered
+
+# Streaming pages -> chunks -> LLM results -> rows on disk.
+# Rows are appended to a JSONL file as soon as they are ready (crash-safe,
+# bounded memory); the CSV is derived from that JSONL at the end in two
+# streaming passes so its columns match what pd.DataFrame(rows) would give.
+
+
+def iter_chunks(pages: Iterable[str], max_chars: int, overlap: int) -> Iterator[str]:
+    """Streaming equivalent of chunk_text("\\n".join(pages), max_chars, overlap)."""
+    step = max_chars - overlap
+    buf = ""
+    first = True
+    emitted = False
+    for page in pages:
+        buf = re.sub(r"\n{3,}", "\n\n", buf + (page if first else "\n" + page))
+        first = False
+        if not emitted:
+            buf = buf.lstrip()
+        # hold back trailing whitespace: it is stripped if nothing follows it
+        while len(buf.rstrip()) >= max_chars:
+            yield buf[:max_chars]
+            buf = buf[step:]
+            emitted = True
+
+    buf = buf.rstrip() if emitted else buf.strip()
+    while buf:
+        yield buf[:max_chars]
+        buf = buf[step:]
+
+
+class JsonlSink:
+    """Append-only JSONL writer; each row is flushed as soon as it is written."""
+
+    def __init__(self, path: Path, append: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("a" if append else "w", encoding="utf-8")
+        self.rows = 0
+
+    def write(self, row: dict) -> None:
+        self._f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        self._f.flush()
+        self.rows += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path: Path) -> Iterator[dict]:
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _csv_value(v: Any) -> Any:
+    # Same rendering as DataFrame.to_csv: None -> empty cell, lists -> Python repr
+    return "" if v is None else v
+
+
+def jsonl_to_csv(jsonl_path: Path, csv_path: Path) -> int:
+    """Two streaming passes: collect the column union (first-seen order), then write rows."""
+    columns: dict[str, None] = {}
+    for row in iter_jsonl(jsonl_path):
+        columns.update(dict.fromkeys(row))
+
+    n = 0
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    with csv_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(columns))
+        writer.writeheader()
+        for row in iter_jsonl(jsonl_path):
+            writer.writerow({k: _csv_value(v) for k, v in row.items()})
+            n += 1
+    return n
+
+
+def to_row(idx: int, out: Any, id_field: str = "chunk_id") -> dict:
+    try:
+        if isinstance(out, Exception):
+            raise out
+        out[id_field] = idx
+        return out
+    except Exception as e:
+        return {id_field: idx, "error": str(e)}
+
+
+async def stream_to_sink(
+    pairs: Iterable[tuple[Any, Any]],
+    call: Callable[[Any], Awaitable[Any]],
+    sink: JsonlSink,
+    id_field: str = "chunk_id",
+    on_row: Callable[[dict], None] | None = None,
+    tokens_for: Callable[[Any], int] | None = None,
+    **engine_kwargs,
+) -> int:
+    """pairs yields (row_id, payload); `call(payload)` produces the row for that id."""
+    async for _, (row_id, _), out in iter_ordered(
+        pairs,
+        lambda pair: call(pair[1]),
+        tokens_for=(lambda pair: tokens_for(pair[1])) if tokens_for else None,
+        **engine_kwargs,
+    ):
+        row = to_row(row_id, out, id_field)
+        sink.write(row)
+        if on_row is not None:
+            on_row(row)
+    return sink.rows
+
+
+def run_streaming(
+    pairs: Iterable[tuple[Any, Any]],
+    call: Callable[[Any], Awaitable[Any]],
+    jsonl_path: Path,
+    csv_path: Path | None = None,
+    append: bool = False,
+    **kwargs,
+) -> int:
+    """Stream (row_id, payload) pairs through `call` into jsonl_path, then (optionally) render csv_path.
+
+    Returns the number of rows written by this call.
+    """
+    with JsonlSink(jsonl_path, append=append) as sink:
+        n = asyncio.run(stream_to_sink(pairs, call, sink, **kwargs))
+    if csv_path is not None:
+        jsonl_to_csv(jsonl_path, csv_path)
+    return n
@@ -0,0 +1,145 @@
+import random
+import textwrap
+from pathlib import Path
+
+# Deterministic synthetic policy documents for offline benchmarks.
+#
+# write_synthetic_pdf() emits a plain PDF (Helvetica text, no dependencies)
+# whose pages read like a government blueprint: numbered headings, narrative
+# strategy paragraphs and, on some pages, concrete instruments (grants, tax
+# allowances, licensing rules, ...). The mix matters: the keyword prefilter
+# skips the narrative chunks and the chunker sees real paragraph structure.
+
+LINE_CHARS = 90
+LINES_PER_PAGE = 56
+
+SECTORS = [
+    "advanced manufacturing", "semiconductors", "biotechnology", "fintech",
+    "green technology", "artificial intelligence", "logistics", "new energy vehicles",
+]
+AGENCIES = [
+    "the Innovation and Technology Commission", "the Trade and Industry Department",
+    "the Environmental Protection Department", "the Financial Services Bureau",
+]
+
+INSTRUMENT_SENTENCES = [
+    "Eligible {sector} firms may receive matching grants of up to HKD {amount} million for equipment upgrades.",
+    "A {pct}% tax allowance is available for qualifying expenditure on {sector} research and development.",
+    "{agency} will provide concessional loans at below-market rates for {sector} projects.",
+    "Exports of controlled {sector} components require an export licence issued by {agency}.",
+    "Applicants must be registered companies with at least {years} years of operations in Hong Kong.",
+    "Public procurement will give preference to locally developed {sector} products.",
+    "Products placed on the market must comply with the new {sector} safety standard from {year}.",
+    "Firms must source at least {pct}% of inputs locally to qualify for the incentive scheme.",
+    "The subsidy covers {pct}% of approved project costs, capped at HKD {amount} million per applicant.",
+]
+
+NARRATIVE_SENTENCES = [
+    "The Government will continue to strengthen the innovation ecosystem and nurture talent.",
+    "Hong Kong is well placed to become an international hub for {sector}.",
+    "Collaboration between universities, industry and the community remains a key priority.",
+    "The vision is a vibrant economy driven by technology and creativity.",
+    "Stakeholders have highlighted the importance of a supportive environment for start-ups.",
+    "Over the coming decade the city will build on its strengths in {sector}.",
+    "This chapter sets out the strategic directions for the next stage of development.",
+    "Regional cooperation will open new opportunities for local enterprises.",
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        sector=rng.choice(SECTORS),
+        agency=rng.choice(AGENCIES),
+        amount=rng.choice([1, 2, 5, 10, 20, 50]),
+        pct=rng.choice([30, 40, 50, 100, 150, 200]),
+        years=rng.choice([1, 2, 3]),
+        year=rng.choice([2026, 2027, 2028]),
+    )
+
+
+def synthetic_paragraph(rng: random.Random, instrument_share: float = 0.35) -> str:
+    sentences = []
+    for _ in range(rng.randint(3, 7)):
+        pool = INSTRUMENT_SENTENCES if rng.random() < instrument_share else NARRATIVE_SENTENCES
+        sentences.append(_fill(rng.choice(pool), rng))
+    return " ".join(sentences)
+
+
+def synthetic_pages(n_pages: int, seed: int = 0) -> list[list[str]]:
+    """Lines of text per page; identical for the same (n_pages, seed)."""
+    rng = random.Random(seed)
+    pages: list[list[str]] = []
+    section = 0
+    for page_no in range(n_pages):
+        # roughly a third of the pages are pure narrative
+        share = 0.0 if rng.random() < 0.33 else 0.45
+        lines: list[str] = []
+        while len(lines) < LINES_PER_PAGE - 2:
+            if not lines or rng.random() < 0.15:
+                section += 1
+                lines.append(f"{section // 10 + 1}.{section % 10} {rng.choice(SECTORS).title()} Support Measures")
+            lines.extend(textwrap.wrap(synthetic_paragraph(rng, share), LINE_CHARS))
+            lines.append("")
+        lines = lines[: LINES_PER_PAGE - 2] + ["", f"- {page_no + 1} -"]
+        pages.append(lines)
+    return pages
+
+
+def synthetic_snippets(n: int, seed: int = 0) -> list[str]:
+    """Short one-paragraph texts for run_batch / classify / extract benchmarks."""
+    rng = random.Random(seed)
+    return [synthetic_paragraph(rng, instrument_share=0.6) for _ in range(n)]
+
+
+def _pdf_string(line: str) -> str:
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _content_stream(lines: list[str]) -> bytes:
+    ops = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+    for line in lines:
+        ops.append(f"{_pdf_string(line)} Tj T*")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_synthetic_pdf(path: Path, n_pages: int = 300, seed: int = 0) -> Path:
+    """Write an n_pages synthetic PDF to `path` (reused if it already exists)."""
+    path = Path(path)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    pages = synthetic_pages(n_pages, seed)
+    # 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    page_ids = [4 + 2 * i for i in range(n_pages)]
+    objects: dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {n_pages} >>".encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    for pid, lines in zip(page_ids, pages):
+        stream = _content_stream(lines)
+        objects[pid] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>"
+        ).encode()
+        objects[pid + 1] = f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for oid in sorted(objects):
+        offsets[oid] = len(out)
+        out += f"{oid} 0 obj\n".encode() + objects[oid] + b"\nendobj\n"
+    xref = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for oid in range(1, size):
+        out += f"{offsets[oid]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(bytes(out))
+    tmp.replace(path)
+    return path
@@ -0,0 +1,178 @@
+import re
+import json
+from pathlib import Path
+from datetime import datetime
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, asdict
+from typing import Sequence
+
+from .checkpoint import text_sha256
+from .sampling import content_words, jaccard
+
+# One taxonomy for a whole corpus, from per-document proposals.
+#
+# merge_proposals() is the local half of the reduce step. Every category of
+# every proposal is a candidate; two candidates are the same category when
+#   name        their normalised names are equal (case, punctuation, "&"/"and",
+#               stop words, plurals and word order ignored: "Grants & Loans"
+#               == "loan and grant"), or
+#   definition  they share a name word and their definitions' content words
+#               overlap (Jaccard) by at least `def_similarity`
+# Candidates are only compared through a name-word -> candidates index, never
+# all pairs, and matches are joined with union-find. A merged candidate keeps
+# its best-supported name and definition, the other names as aliases, and its
+# support: the number of documents its proposals stand for (a proposal made
+# for a representative document counts for every document assigned to it).
+# Schema fields are counted the same way.
+#
+# The LLM reconciliation call (run_taxonomy_induction.py) sees only the merged,
+# support-ranked list, so its size does not grow with the corpus.
+#
+# TaxonomyStore keeps the results as numbered, never-overwritten files
+# (taxonomy_v<N>.json) with a hash of their content; inducing the same
+# taxonomy again returns the existing version instead of a new one.
+
+_STOP_WORDS = {"a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"}
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+PLAN_KEYS = ("taxonomy", "minimal_extraction_schema_fields", "coding_decision_rules")
+
+
+def _singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def name_words(name: str) -> list[str]:
+    words = _NON_WORD.sub(" ", str(name).lower().replace("&", " and ")).split()
+    return sorted({_singular(w) for w in words if w not in _STOP_WORDS})
+
+
+def normalise_category(name: str) -> str:
+    return " ".join(name_words(name))
+
+
+def normalise_field(name: str) -> str:
+    return _NON_WORD.sub("_", str(name).lower()).strip("_")
+
+
+@dataclass
+class Candidate:
+    name: str
+    definition: str
+    support: int
+    aliases: list[str] = field(default_factory=list)
+    docs: list[str] = field(default_factory=list)
+
+
+def merge_proposals(
+    proposals: Sequence[dict],
+    doc_ids: Sequence[str],
+    weights: Sequence[int] | None = None,
+    def_similarity: float = 0.35,
+) -> dict:
+    """Align the categories (and schema fields) of several taxonomy proposals; returns candidates by support."""
+    weights = list(weights) if weights is not None else [1] * len(proposals)
+    items: list[tuple[str, str, str, int]] = []  # name, definition, doc_id, weight
+    fields: Counter = Counter()
+    rules: list[str] = []
+    for proposal, doc_id, weight in zip(proposals, doc_ids, weights):
+        for t in proposal.get("taxonomy") or []:
+            if isinstance(t, dict) and str(t.get("category") or "").strip():
+                items.append((str(t["category"]).strip(), str(t.get("definition") or "").strip(), doc_id, weight))
+        for f in dict.fromkeys(normalise_field(f) for f in proposal.get("minimal_extraction_schema_fields") or []):
+            if f:
+                fields[f] += weight
+        rules.extend(str(r) for r in proposal.get("coding_decision_rules") or [])
+
+    parent = list(range(len(items)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    by_name: dict[str, int] = {}
+    by_word: dict[str, list[int]] = defaultdict(list)
+    definition_words = [content_words(d) for _, d, _, _ in items]
+    for i, (name, _, _, _) in enumerate(items):
+        key = normalise_category(name)
+        if key in by_name:
+            parent[find(i)] = find(by_name[key])
+        else:
+            by_name[key] = i
+        for w in name_words(name):
+            for j in by_word[w]:
+                if find(i) != find(j) and jaccard(definition_words[i], definition_words[j]) >= def_similarity:
+                    parent[find(i)] = find(j)
+            by_word[w].append(i)
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(items)):
+        groups[find(i)].append(i)
+
+    candidates = []
+    for members in groups.values():
+        names: Counter = Counter()
+        for i in members:
+            names[items[i][0]] += items[i][3]
+        docs = {items[i][2]: items[i][3] for i in members}  # one vote per document
+        best = max(members, key=lambda i: (names[items[i][0]], len(items[i][1])))
+        candidates.append(Candidate(
+            name=items[best][0],
+            definition=items[best][1],
+            support=sum(docs.values()),
+            aliases=[n for n, _ in names.most_common() if n != items[best][0]],
+            docs=sorted(docs),
+        ))
+    candidates.sort(key=lambda c: (-c.support, c.name.lower()))
+    return {
+        "candidates": [asdict(c) for c in candidates],
+        "schema_fields": [{"field": f, "support": n} for f, n in fields.most_common()],
+        "coding_decision_rules": list(dict.fromkeys(rules)),
+        "categories_in": len(items),
+    }
+
+
+class TaxonomyStore:
+    def __init__(self, root: Path = Path("pilot_with_pdf/data/taxonomy")):
+        self.root = Path(root)
+
+    def versions(self) -> list[Path]:
+        paths = self.root.glob("taxonomy_v*.json")
+        return sorted((p for p in paths if p.stem[len("taxonomy_v"):].isdigit()),
+                      key=lambda p: int(p.stem[len("taxonomy_v"):]))
+
+    def latest(self) -> dict | None:
+        paths = self.versions()
+        return json.loads(paths[-1].read_text(encoding="utf-8")) if paths else None
+
+    @staticmethod
+    def content_hash(plan: dict) -> str:
+        return text_sha256(json.dumps({k: plan.get(k) for k in PLAN_KEYS}, sort_keys=True))[:12]
+
+    def save(self, plan: dict, induction: dict) -> tuple[Path, dict, bool]:
+        """(path, artefact, created); an identical taxonomy returns the version that already has it."""
+        digest = self.content_hash(plan)
+        for path in reversed(self.versions()):
+            artefact = json.loads(path.read_text(encoding="utf-8"))
+            if artefact.get("taxonomy_hash") == digest:
+                return path, artefact, False
+        paths = self.versions()
+        version = int(paths[-1].stem[len("taxonomy_v"):]) + 1 if paths else 1
+        artefact = {
+            "version": version,
+            "taxonomy_hash": digest,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            **{k: plan.get(k) for k in PLAN_KEYS},
+            "induction": induction,
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / f"taxonomy_v{version}.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(artefact, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+        return path, artefact, True
@@ -0,0 +1,10 @@
+import inspect
+
+# Shared by the drop-in client wrappers (llm_cache, rate_limit,
+# instrumentation), which each replace `client.responses` with a sync or an
+# async version depending on the client they wrap.
+
+
+def is_async_client(client) -> bool:
+    # AsyncOpenAI's methods can sit behind sync decorators, so check the class name too
+    return inspect.iscoroutinefunction(client.responses.create) or type(client).__name__.startswith("Async")
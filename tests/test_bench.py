@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+pytest.importorskip("pandas")
+
+BENCH = Path(__file__).resolve().parents[1] / "pilot_with_pdf" / "bench_pipeline.py"
+SNIPPETS = 30
+
+
+def run_bench(tmp_path, *extra) -> subprocess.CompletedProcess:
+    # tiny sizes, no injected faults: the counts below are exact, the timings irrelevant
+    return subprocess.run(
+        [sys.executable, str(BENCH), "--only", "pdf_naive,run_batch_packed",
+         "--pages", "4", "--docs", "2", "--snippets", str(SNIPPETS),
+         "--latency-ms", "1", "--jitter-ms", "0", "--error-rate", "0", "--malformed-rate", "0",
+         "--history", str(tmp_path / "history.jsonl"), "--pdf-dir", str(tmp_path / "pdf"), *extra],
+        capture_output=True, text=True, timeout=600,
+    )
+
+
+def test_bench_scenarios_against_the_fake_llm(tmp_path):
+    proc = run_bench(tmp_path)
+    assert proc.returncode == 0, proc.stdout[-2000:] + proc.stderr[-2000:]
+    [entry] = [json.loads(l) for l in (tmp_path / "history.jsonl").read_text().splitlines()]
+    pdf, packed = entry["results"]["pdf_naive"], entry["results"]["run_batch_packed"]
+
+    # one call per chunk (near-duplicates are not sent), every chunk gets a row
+    assert pdf["documents"] == 2 and pdf["pages"] == 8
+    assert 0 < pdf["fake_llm"]["calls"] <= pdf["items"]
+    assert pdf["calls_per_doc"] == pdf["fake_llm"]["calls"] / 2
+
+    # one row per snippet, several snippets per request
+    assert packed["items"] == SNIPPETS and packed["errors"] == 0
+    assert packed["calls_per_doc"] == packed["fake_llm"]["calls"] < SNIPPETS
+
+
+def test_bench_compares_with_the_last_comparable_run(tmp_path):
+    assert run_bench(tmp_path).returncode == 0
+    proc = run_bench(tmp_path, "--fail-on-regression", "1000")
+    assert proc.returncode == 0, proc.stdout[-2000:]
+    assert "Compared with" in proc.stdout
+    first, second = [json.loads(l) for l in (tmp_path / "history.jsonl").read_text().splitlines()]
+    for name in ("pdf_naive", "run_batch_packed"):
+        # the fake LLM is seeded: the same parameters give the same calls and rows
+        assert second["results"][name]["calls_per_doc"] == first["results"][name]["calls_per_doc"]
+        assert second["results"][name]["items"] == first["results"][name]["items"]
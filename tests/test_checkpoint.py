@@ -0,0 +1,62 @@
+from src.checkpoint import RunManifest, run_key
+
+PARAMS = {"chunker": "structure", "max_tokens": 1000}
+
+
+def open_run(tmp_path, out="out/a.jsonl", **kwargs) -> RunManifest:
+    out = tmp_path / out
+    return RunManifest.open("pdfsha", PARAMS, "prompt1", out, out.with_suffix(".csv"), runs_dir=tmp_path / "runs", **kwargs)
+
+
+def test_resume_skips_finished_chunks(tmp_path):
+    run = open_run(tmp_path)
+    assert not run.resumed
+    run.record({"chunk_id": 0, "instrument_type": "grant"})
+    run.record({"chunk_id": 1, "error": "timeout"})
+    run.close()
+
+    run = open_run(tmp_path)
+    assert run.resumed
+    assert run.should_skip(0)
+    assert run.should_skip(1) and not run.should_skip(1, retry_errors=True)
+    assert not run.should_skip(2)
+    assert run.summary() == {"completed": 1, "failed": 1}
+    assert "resumed_at" in run.meta
+    run.close()
+
+
+def test_another_output_path_is_another_run(tmp_path):
+    # the corpus runner must not resume into (and append to) a single-document run's output
+    run = open_run(tmp_path)
+    run.record({"chunk_id": 0})
+    run.close()
+
+    other = open_run(tmp_path, out="corpus/doc/extraction.jsonl")
+    assert not other.resumed
+    assert other.dir != run.dir
+    assert other.out_jsonl == tmp_path / "corpus/doc/extraction.jsonl"
+    other.close()
+    assert run_key("pdfsha", PARAMS, "prompt1", tmp_path / "a.jsonl") != run_key("pdfsha", PARAMS, "prompt1", tmp_path / "b.jsonl")
+
+
+def test_changed_inputs_start_a_new_run(tmp_path):
+    run = open_run(tmp_path)
+    run.record({"chunk_id": 0})
+    run.close()
+    assert run_key("pdfsha", PARAMS, "prompt2") != run_key("pdfsha", PARAMS, "prompt1")
+    assert run_key("pdfsha", {**PARAMS, "max_tokens": 500}, "prompt1") != run_key("pdfsha", PARAMS, "prompt1")
+
+    fresh = open_run(tmp_path, fresh=True)
+    assert not fresh.resumed
+    fresh.close()
+
+
+def test_flagged_chunks_are_retried(tmp_path):
+    run = open_run(tmp_path)
+    run.record({"chunk_id": 0})
+    run.flag([0])
+    run.close()
+
+    run = open_run(tmp_path)
+    assert not run.should_skip(0, retry_errors=True)
+    run.close()
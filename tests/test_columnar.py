@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.columnar import read_dataset, schema_for_rows, write_rows
+
+
+def test_column_types_come_from_the_name(tmp_path):
+    # a list in a non-list column is stored as JSON text, so every part file agrees on the type
+    write_rows([{"chunk_id": 0, "notes": "x"}], tmp_path, "A", part="run")
+    write_rows([{"chunk_id": 0, "notes": ["y"], "evidence_spans": "z"}], tmp_path, "B", part="run")
+    rows = {r["doc_id"]: r for r in read_dataset(tmp_path).to_pylist()}
+    assert rows["A"]["notes"] == "x"
+    assert rows["B"]["notes"] == '["y"]'
+    assert rows["B"]["evidence_spans"] == ["z"]
+
+
+def test_schema_ignores_the_values(tmp_path):
+    schema = schema_for_rows([{"notes": ["a"], "doc_id": "A", "confidence": "0.5"}])
+    assert str(schema.field("notes").type) == "string"
+    assert str(schema.field("confidence").type) == "double"
+    assert "doc_id" not in schema.names
+
+
+def test_same_part_replaces_the_file(tmp_path):
+    write_rows([{"chunk_id": 0}], tmp_path, "A", run_date="2026-01-01", part="demo")
+    write_rows([{"chunk_id": 1}], tmp_path, "A", run_date="2026-01-01", part="demo")
+    assert [r["chunk_id"] for r in read_dataset(tmp_path).to_pylist()] == [1]
@@ -0,0 +1,170 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.downloader import Downloader, latest_pdf
+
+BODY = b"%PDF-1.4\n" + bytes(range(256)) * 2000 + b"\n%%EOF\n"
+
+
+class PDFServer:
+    """Serves BODY with an ETag; supports Range/If-Range and If-None-Match.
+
+    `cut` transfers in a row are dropped half-way through the body; a set
+    `status` is returned (with no body) instead of the file.
+    """
+
+    def __init__(self):
+        self.etag = '"v1"'
+        self.body = BODY
+        self.cut = 0
+        self.status = None
+        self.requests: list[dict] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                headers = dict(self.headers)
+                server.requests.append(headers)
+                if server.status:
+                    self.send_response(server.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body, start = server.body, 0
+                rng = headers.get("Range")
+                if rng and headers.get("If-Range") == server.etag:
+                    start = int(rng.removeprefix("bytes=").rstrip("-"))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                else:
+                    self.send_response(200)
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(body) - start))
+                self.end_headers()
+                if server.cut:
+                    server.cut -= 1
+                    self.wfile.write(body[start:start + (len(body) - start) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body[start:])
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/doc.pdf"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    s = PDFServer()
+    yield s
+    s.stop()
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    d = Downloader(tmp_path / "pdf", attempts=2)
+    # no urllib3 retries/backoff: each fetch attempt is one request
+    d.session.mount("http://", HTTPAdapter(max_retries=0))
+    yield d
+    d.close()
+
+
+def test_download_stores_a_blob(server, downloader):
+    result = downloader.fetch(server.url)
+    assert result.status == "downloaded"
+    assert result.sha256 == hashlib.sha256(BODY).hexdigest()
+    assert result.path == downloader.blob_path(result.sha256)
+    assert result.path.read_bytes() == BODY
+    assert latest_pdf(downloader.root) == result.path
+
+
+def test_interrupted_download_resumes_with_range(server, downloader):
+    server.cut = 1
+    result = downloader.fetch(server.url)
+    assert result.status == "resumed"
+    assert result.path.read_bytes() == BODY
+    assert 0 < result.bytes_transferred < len(BODY)
+    # the request asks for exactly what the partial file is missing
+    assert server.requests[1]["Range"] == f"bytes={len(BODY) - result.bytes_transferred}-"
+    assert server.requests[1]["If-Range"] == '"v1"'
+    assert not any(downloader.partial_dir.iterdir())
+
+
+def test_changed_file_restarts_instead_of_resuming(server, downloader):
+    server.cut = 1
+    downloader.attempts = 1
+    with pytest.raises(Exception):
+        downloader.fetch(server.url)
+    assert any(downloader.partial_dir.glob("*.part"))
+    server.etag, server.body = '"v2"', BODY[::-1]
+    result = downloader.fetch(server.url)
+    assert "Range" in server.requests[-1]  # asked to resume, got the whole new file
+    assert result.status == "downloaded"
+    assert result.path.read_bytes() == BODY[::-1]
+
+
+def test_unchanged_file_is_not_downloaded_again(server, downloader):
+    first = downloader.fetch(server.url)
+    again = downloader.fetch(server.url)
+    assert again.status == "not_modified"
+    assert again.path == first.path
+    assert server.requests[-1]["If-None-Match"] == '"v1"'
+
+
+def test_same_bytes_share_one_blob(server, downloader):
+    a = downloader.fetch(server.url)
+    b = downloader.fetch(server.url + "?copy=1")
+    assert a.path == b.path
+    assert len(list(downloader.blob_dir.glob("*/*.pdf"))) == 1
+
+
+def test_offline_falls_back_to_the_stored_copy(server, downloader):
+    stored = downloader.fetch(server.url)
+    server.stop()
+    result = downloader.fetch(server.url)
+    assert result.status == "offline"
+    assert result.path == stored.path and result.error
+    assert downloader.fetch_many(["http://127.0.0.1:1/never.pdf"])[0].status == "failed"
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_failing_server_falls_back_to_the_stored_copy(server, downloader, status):
+    stored = downloader.fetch(server.url)
+    server.status = status
+    result = downloader.fetch(server.url)
+    assert result.status == "offline"
+    assert result.path == stored.path and str(status) in result.error
+
+
+def test_exhausted_session_retries_fall_back_to_the_stored_copy(server, downloader):
+    stored = downloader.fetch(server.url)
+    retry = Retry(total=1, backoff_factor=0, status_forcelist=(503,), allowed_methods=("GET",))
+    downloader.session.mount("http://", HTTPAdapter(max_retries=retry))
+    server.status = 503
+    result = downloader.fetch(server.url)
+    assert result.status == "offline" and result.path == stored.path
+
+
+def test_client_errors_are_raised(server, downloader):
+    downloader.fetch(server.url)
+    server.status = 404
+    with pytest.raises(requests.HTTPError):
+        downloader.fetch(server.url)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from src import fake_llm
+from src.fake_llm import AsyncFakeOpenAI, FakeOpenAI
+from src.llm_json import (
+    acall_json, call_json, check, enum_of, object_schema, parse_json, parse_stats, repair_json, string_list,
+)
+
+SCHEMA = object_schema({
+    "instrument_type": enum_of(["grant", "loan", "other"]),
+    "confidence": {"type": "number"},
+    "evidence_spans": string_list(),
+})
+GOOD = {"instrument_type": "grant", "confidence": 0.9, "evidence_spans": ["a grant"]}
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Here you go: {"a": 1} Hope that helps!', {"a": 1}),
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ('{"a": "cut', {"a": "cut"}),
+    ('{"a": 1, "b": [1, {"c": 2', {"a": 1, "b": [1, {"c": 2}]}),
+    ('{"a": 1, "b"', {"a": 1}),
+    ('{"quote": "costs, ]", "n": 1,}', {"quote": "costs, ]", "n": 1}),
+])
+def test_repair(raw, expected):
+    value, how = parse_json(raw)
+    assert value == expected
+    assert how == "repaired" or raw.startswith("```")
+
+
+def test_no_json():
+    assert repair_json("no braces here") is None
+    assert parse_json("no braces here")[0] is None
+
+
+def test_check_coerces_to_the_schema():
+    value, errors, _ = check('{"instrument_type": "Grant", "confidence": "0.8", "evidence_spans": null}', SCHEMA)
+    assert errors == []
+    assert value == {"instrument_type": "grant", "confidence": 0.8, "evidence_spans": []}
+
+    value, errors, _ = check('{"instrument_type": "lottery", "confidence": 0.5}', SCHEMA)
+    assert value["evidence_spans"] == []
+    assert errors and "lottery" in errors[0]
+
+
+def scripted(monkeypatch, first: str, second: str = json.dumps(GOOD)) -> list:
+    """fake_llm replies `first`, and `second` to a re-ask; returns the prompts sent."""
+    prompts = []
+
+    def reply(request, rng):
+        prompts.append(request["input"])
+        return second if "could not be used" in request["input"] else first
+
+    monkeypatch.setattr(fake_llm, "fake_reply", reply)
+    return prompts
+
+
+def test_reask_fixes_a_bad_reply(monkeypatch):
+    prompts = scripted(monkeypatch, "I could not find any instrument.")
+    before = parse_stats().get("reasked", 0)
+    out = call_json(FakeOpenAI(latency_ms=0, jitter_ms=0), schema=SCHEMA, model="m", input="TEXT")
+    assert out == GOOD
+    assert len(prompts) == 2 and "not valid JSON" in prompts[1]
+    assert parse_stats()["reasked"] == before + 1
+
+
+def test_repaired_reply_needs_no_reask(monkeypatch):
+    prompts = scripted(monkeypatch, json.dumps(GOOD)[:-1] + ",")
+    out = call_json(FakeOpenAI(latency_ms=0, jitter_ms=0), schema=SCHEMA, model="m", input="TEXT")
+    assert out == GOOD
+    assert len(prompts) == 1
+
+
+def test_reask_keeps_the_better_answer(monkeypatch):
+    partial = json.dumps({"instrument_type": "lottery", "confidence": 0.5, "evidence_spans": []})
+    scripted(monkeypatch, partial, second="still not JSON")
+    out = asyncio.run(acall_json(AsyncFakeOpenAI(latency_ms=0, jitter_ms=0), schema=SCHEMA, model="m", input="T"))
+    assert out["instrument_type"] == "lottery"
+    assert out["schema_errors"]
+
+
+def test_unusable_reply_without_reask(monkeypatch):
+    prompts = scripted(monkeypatch, "nothing")
+    out = call_json(FakeOpenAI(latency_ms=0, jitter_ms=0), schema=SCHEMA, reask=False, model="m", input="T")
+    assert out == {"error": "Invalid JSON", "raw_output": "nothing"}
+    assert len(prompts) == 1
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.fake_llm import AsyncFakeOpenAI, FakeAPIError, FakeOpenAI
+from src.rate_limit import AdaptiveLimiter, RetryPolicy, parse_reset, rate_limited_client, retry_reason
+
+FAST = RetryPolicy(max_attempts=10, base_delay=0.001, max_delay=0.01)
+
+
+def always(client, error):
+    """Make every attempt against `client` fail with `error`."""
+    client.backend.plan = lambda request: (0.0, error, None)
+
+
+def test_429s_are_retried_and_counted():
+    raw = FakeOpenAI(latency_ms=0, jitter_ms=0, rate_limit_rate=0.5, seed=1)
+    client = rate_limited_client(raw, policy=FAST)
+    for i in range(8):
+        r = client.responses.create(model="m", input=f"text {i}")
+        assert r.output_text
+    metrics = client.metrics.snapshot()
+    assert metrics["succeeded"] == 8 and metrics["failed"] == 0
+    assert metrics["retries"]["rate_limited"] == raw.backend.stats["rate_limited"] > 0
+
+
+def test_async_5xx_are_retried():
+    raw = AsyncFakeOpenAI(latency_ms=0, jitter_ms=0, error_rate=0.5, seed=2)
+    client = rate_limited_client(raw, policy=FAST)
+
+    async def run():
+        return await asyncio.gather(*(client.responses.create(model="m", input=f"t{i}") for i in range(8)))
+
+    assert all(r.output_text for r in asyncio.run(run()))
+    assert client.metrics.snapshot()["retries"]["server_error"] == raw.backend.stats["server_errors"] > 0
+
+
+def test_client_errors_are_not_retried():
+    raw = FakeOpenAI(latency_ms=0, jitter_ms=0)
+    calls = []
+    raw.backend.plan = lambda request: calls.append(request) or (0.0, FakeAPIError(400), None)
+    client = rate_limited_client(raw, policy=FAST)
+    with pytest.raises(FakeAPIError):
+        client.responses.create(model="m", input="x")
+    assert len(calls) == 1
+    assert client.metrics.snapshot()["failed"] == 1
+
+
+def test_gives_up_after_max_attempts():
+    raw = FakeOpenAI(latency_ms=0, jitter_ms=0)
+    always(raw, FakeAPIError(500))
+    client = rate_limited_client(raw, policy=RetryPolicy(max_attempts=3, base_delay=0.001))
+    with pytest.raises(FakeAPIError):
+        client.responses.create(model="m", input="x")
+    assert client.metrics.snapshot()["retries"] == {"server_error": 2}
+
+
+def test_retry_reason():
+    assert retry_reason(FakeAPIError(429)) == "rate_limited"
+    assert retry_reason(FakeAPIError(503)) == "server_error"
+    assert retry_reason(FakeAPIError(401)) is None
+    assert retry_reason(TimeoutError()) == "timeout"
+    assert retry_reason(ValueError()) is None
+
+
+def test_parse_reset():
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("1h2m3.5s") == pytest.approx(3723.5)
+    assert parse_reset("2") == 2
+    assert parse_reset(None) is None
+
+
+def test_limiter_follows_the_servers_headers():
+    limiter = AdaptiveLimiter()
+    assert limiter.reserve(100) == 0  # no limit known yet
+    limiter.observe({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2s",
+    })
+    assert limiter.requests.capacity == 60
+    assert 1.5 < limiter.reserve(100) <= 2.0  # paused until the reset